@@ -0,0 +1,275 @@
+"""Retention policy: cold archival of old documents to date-partitioned Parquet.
+
+Memberships (joined with their post content) and searches older than the
+retention window are written to zstd-compressed Parquet under
+ARCHIVE_DIR/<dataset>/day=YYYY-MM-DD/ and then removed from Mongo. Posts are
+deleted once no membership references them. ArchiveReader reads the archived
+range back for exports and dashboard trends.
+
+A post whose last membership for a user is archived leaves a marker in the
+archived_posts collection, so the dashboard's distinct-post total counts it
+without reading the archive. Storing the post for that user again removes the
+marker.
+
+Every archived row keeps the key of its source document (membership_id, or
+the search id), and rows whose key is already in their day partition are not
+written again. A run interrupted between writing a batch and deleting it
+therefore doesn't duplicate that batch when it is retried.
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pymongo import UpdateOne
+
+from cache import DataVersions
+from columnar import daily_sentiment
+from dates import epoch_seconds_expression, iso_expression, to_datetime
+
+logger = logging.getLogger(__name__)
+
+USER_POSTS_SCHEMA = pa.schema([
+    ("user_id", pa.string()),
+    ("post_id", pa.string()),
+    ("keyword", pa.string()),
+    ("search_ts", pa.string()),
+    ("sentiment_score", pa.float64()),
+    ("title", pa.string()),
+    ("author", pa.string()),
+    ("subreddit", pa.string()),
+    ("upvotes", pa.int64()),
+    ("comments", pa.int64()),
+    ("created_utc", pa.float64()),
+    ("url", pa.string()),
+    ("permalink", pa.string()),
+    ("body", pa.string()),
+    ("membership_id", pa.string()),
+])
+
+# Archived columns backing the export fields, before iter_user_posts renames them
+EXPORT_COLUMNS = ["post_id", "title", "author", "subreddit", "upvotes", "comments", "created_utc", "permalink",
+                  "keyword", "search_ts", "sentiment_score"]
+
+SEARCHES_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("user_id", pa.string()),
+    ("keyword", pa.string()),
+    ("subreddit", pa.string()),
+    ("timestamp", pa.string()),
+    ("post_count", pa.int64()),
+    ("avg_sentiment", pa.float64()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+
+
+def archived_keys(directory: str, schema: pa.Schema, key_field: str, keys: List[str]) -> set:
+    """The given keys already present in one day partition"""
+    if not os.path.isdir(directory):
+        return set()
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".parquet")]
+    if not files:
+        return set()
+    table = ds.dataset(files, schema=schema, format="parquet").to_table(
+        columns=[key_field], filter=ds.field(key_field).isin(keys)
+    )
+    return set(table.column(key_field).to_pylist())
+
+
+def write_partitions(root: str, dataset: str, schema: pa.Schema, rows: List[Dict[str, Any]], day_field: str,
+                     key_field: str):
+    """Append rows to one new zstd Parquet file per day partition, skipping keys already archived"""
+    by_day: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_day.setdefault(row[day_field][:10], []).append(row)
+
+    for day, day_rows in by_day.items():
+        directory = os.path.join(root, dataset, f"day={day}")
+        existing = archived_keys(directory, schema, key_field, [row[key_field] for row in day_rows])
+        day_rows = [row for row in day_rows if row[key_field] not in existing]
+        if not day_rows:
+            continue
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pylist([{name: row.get(name) for name in schema.names} for row in day_rows], schema=schema)
+        # Write under a temporary name first so readers never see a partial file
+        path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+
+
+def mark_archived_posts(db, rows: List[Dict[str, Any]]) -> None:
+    """Mark the (user, post) pairs among archived rows that no live membership references any more"""
+    post_ids_by_user: Dict[str, set] = {}
+    for row in rows:
+        post_ids_by_user.setdefault(row["user_id"], set()).add(row["post_id"])
+
+    operations = []
+    for user_id, post_ids in post_ids_by_user.items():
+        live = set(db["user_posts"].distinct("post_id", {"user_id": user_id, "post_id": {"$in": list(post_ids)}}))
+        operations.extend(
+            UpdateOne({"user_id": user_id, "post_id": post_id},
+                      {"$setOnInsert": {"archived_at": datetime.now(timezone.utc)}}, upsert=True)
+            for post_id in post_ids - live
+        )
+    if operations:
+        # Upserts, so re-archiving a pair or re-running a batch never counts it twice
+        db["archived_posts"].bulk_write(operations, ordered=False)
+
+
+def archive_user_posts(db, cutoff: str, root: str, batch_size: int = 5000) -> int:
+    """Archive memberships searched before `cutoff` with their post content; returns rows archived"""
+    user_posts = db["user_posts"]
+    versions = DataVersions(db["data_versions"])
+    archived = 0
+    while True:
+        rows = list(user_posts.aggregate([
+            # BSON comparisons never cross types, so this also catches rows not yet migrated to dates
+            {"$match": {"$or": [{"search_ts": {"$lt": to_datetime(cutoff)}}, {"search_ts": {"$lt": cutoff}}]}},
+            {"$limit": batch_size},
+            {"$lookup": {"from": "posts", "localField": "post_id", "foreignField": "id", "as": "post"}},
+            {"$unwind": {"path": "$post", "preserveNullAndEmptyArrays": True}},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+                {"$ifNull": ["$post", {}]},
+                {"_id": "$_id", "membership_id": {"$toString": "$_id"},
+                 "user_id": "$user_id", "post_id": "$post_id", "keyword": "$keyword",
+                 "sentiment_score": "$sentiment_score",
+                 # The Parquet schema keeps the API's representations
+                 "search_ts": iso_expression("$search_ts"),
+                 "created_utc": epoch_seconds_expression("$post.created_utc")}
+            ]}}}
+        ]))
+        if not rows:
+            break
+
+        write_partitions(root, "user_posts", USER_POSTS_SCHEMA, rows, "search_ts", "membership_id")
+        user_posts.delete_many({"_id": {"$in": [row["_id"] for row in rows]}})
+        mark_archived_posts(db, rows)
+
+        # Post content is shared; drop it only once no live membership points at it
+        post_ids = list({row["post_id"] for row in rows})
+        still_referenced = set(user_posts.distinct("post_id", {"post_id": {"$in": post_ids}}))
+        orphaned = [post_id for post_id in post_ids if post_id not in still_referenced]
+        if orphaned:
+            db["posts"].delete_many({"id": {"$in": orphaned}})
+
+        archived += len(rows)
+        # Trends, exports and dashboards are validated by the posts version
+        for user_id in {row["user_id"] for row in rows}:
+            versions.bump(user_id, "posts")
+        logger.info(f"Archived {archived} user_posts rows")
+    return archived
+
+
+def archive_searches(db, cutoff: str, root: str, batch_size: int = 5000) -> int:
+    """Archive searches made before `cutoff`; returns documents archived"""
+    searches = db["searches"]
+    versions = DataVersions(db["data_versions"])
+    archived = 0
+    while True:
+        rows = list(searches.find({"timestamp": {"$lt": cutoff}}).limit(batch_size))
+        if not rows:
+            break
+        write_partitions(root, "searches", SEARCHES_SCHEMA, rows, "timestamp", "id")
+        searches.delete_many({"_id": {"$in": [row["_id"] for row in rows]}})
+        archived += len(rows)
+        # Search history pages are validated by the searches version
+        for user_id in {row["user_id"] for row in rows}:
+            versions.bump(user_id, "searches")
+    return archived
+
+
+def apply_retention(db, retention_days: int, root: str) -> Dict[str, int]:
+    """Move everything older than retention_days out of Mongo into the Parquet archive"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    counts = {
+        "user_posts": archive_user_posts(db, cutoff, root),
+        "searches": archive_searches(db, cutoff, root),
+    }
+    logger.info(f"Retention before {cutoff}: archived {counts}")
+    return counts
+
+
+class ArchiveReader:
+    """Query the Parquet archive with the same filters the live endpoints use"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dataset(self, name: str, schema: pa.Schema) -> Optional[ds.Dataset]:
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, schema=schema.append(pa.field("day", pa.string())),
+                          format="parquet", partitioning=PARTITIONING)
+
+    def latest_day(self, name: str) -> Optional[str]:
+        """The newest archived day partition of a dataset, if any"""
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return None
+        days = [entry[4:] for entry in os.listdir(path) if entry.startswith("day=")]
+        return max(days) if days else None
+
+    def covers(self, name: str, start_date: Optional[str]) -> bool:
+        """Whether a range starting at start_date (open if None) reaches into the archive"""
+        latest = self.latest_day(name)
+        return latest is not None and (not start_date or start_date[:10] <= latest)
+
+    @staticmethod
+    def _range_filter(user_id: str, start_date: Optional[str], end_date: Optional[str]):
+        expression = ds.field("user_id") == user_id
+        if start_date:
+            expression &= ds.field("day") >= start_date[:10]
+        if end_date:
+            expression &= ds.field("day") <= end_date[:10]
+        return expression
+
+    def iter_user_posts(self, user_id: str, keyword: Optional[str] = None, start_date: Optional[str] = None,
+                        end_date: Optional[str] = None, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Archived posts for export, as dicts shaped like the live export rows"""
+        dataset = self._dataset("user_posts", USER_POSTS_SCHEMA)
+        if dataset is None:
+            return
+        expression = self._range_filter(user_id, start_date, end_date)
+        if keyword:
+            expression &= ds.field("keyword") == keyword
+        for batch in dataset.to_batches(columns=columns, filter=expression):
+            for row in batch.to_pylist():
+                row["id"] = row.pop("post_id", None)
+                row["keyword_searched"] = row.pop("keyword", None)
+                row["search_timestamp"] = row.pop("search_ts", None)
+                yield row
+
+    def sentiment_trends(self, user_id: str, start_date: Optional[str], end_date: Optional[str]) -> List[Dict[str, Any]]:
+        """Daily sentiment statistics over archived posts, shaped like the live trend pipeline"""
+        dataset = self._dataset("user_posts", USER_POSTS_SCHEMA)
+        if dataset is None:
+            return []
+        table = dataset.to_table(
+            columns=["day", "sentiment_score"],
+            filter=self._range_filter(user_id, start_date, end_date) & ds.field("sentiment_score").is_valid()
+        )
+        if table.num_rows == 0:
+            return []
+        return daily_sentiment(table.column("day").to_numpy(zero_copy_only=False),
+                               table.column("sentiment_score").to_numpy(zero_copy_only=False))
+
+    def iter_memberships(self, batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """user_id and post_id of every archived membership, in batches"""
+        dataset = self._dataset("user_posts", USER_POSTS_SCHEMA)
+        if dataset is None:
+            return
+        for batch in dataset.to_batches(columns=["user_id", "post_id"], batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pylist()
+
+    def count_searches(self, user_id: str) -> int:
+        dataset = self._dataset("searches", SEARCHES_SCHEMA)
+        if dataset is None:
+            return 0
+        return dataset.count_rows(filter=ds.field("user_id") == user_id)
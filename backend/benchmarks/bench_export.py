@@ -0,0 +1,92 @@
+"""Benchmark CSV export memory and throughput at 1M rows.
+
+Compares the previous approach (list every row, build the whole CSV in one
+StringIO, then wrap it in a JSON body) with the chunked csv_chunks stream that
+the export endpoint now returns. Rows come from the SQLite storage backend's
+export cursor, so the database read is part of both measurements.
+
+    cd backend && python -m benchmarks.bench_export --rows 1000000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import csv_chunks
+from storage.base import EXPORT_FIELDS
+from storage.sqlite import SQLiteStorage
+
+USER_ID = "bench-user"
+
+
+def load(storage, rows, batch_size=10000):
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    for offset in range(0, rows, batch_size):
+        posts = [{
+            "id": f"p{i}", "title": f"Benchmark post {i} about python and rust", "author": "someone",
+            "subreddit": random.choice(["python", "rust", "golang"]), "upvotes": random.randint(0, 5000),
+            "url": "https://example.com", "comments": random.randint(0, 300),
+            "created_utc": start.timestamp() + i, "permalink": f"https://reddit.com/r/python/p{i}",
+            "body": "x" * 200, "sentiment_score": round(random.uniform(0, 10), 2), "summary": None,
+        } for i in range(offset, min(offset + batch_size, rows))]
+        search = {"id": str(uuid.uuid4()), "user_id": USER_ID, "keyword": "python", "subreddit": "all",
+                  "timestamp": (start + timedelta(seconds=offset)).isoformat(), "post_count": len(posts),
+                  "avg_sentiment": 5.0}
+        asyncio.run(storage.save_search_results(search, posts))
+
+
+def buffered_export(storage):
+    """The old endpoint body: every row, the whole CSV and the JSON wrapper in memory at once"""
+    posts = list(storage.iter_export_rows(USER_ID))
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for post in posts:
+        post["created_utc"] = datetime.fromtimestamp(post["created_utc"], tz=timezone.utc).isoformat()
+        writer.writerow({k: v for k, v in post.items() if k in writer.fieldnames})
+    return len(json.dumps({"filename": "export.csv", "content": output.getvalue(), "content_type": "text/csv"}))
+
+
+def streamed_export(storage):
+    # Stands in for the ASGI server writing each chunk to the socket
+    return sum(len(chunk) for chunk in csv_chunks(storage.iter_export_rows(USER_ID)))
+
+
+def measure(label, fn, storage):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(storage)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed:8.2f} s   peak {peak / 2**20:8.1f} MiB   {size / 2**20:8.1f} MiB out")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bench.db"))
+        storage.ensure_schema()
+        load(storage, args.rows)
+        print(f"{args.rows} rows")
+        measure("streamed", streamed_export, storage)
+        measure("buffered", buffered_export, storage)
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark SearchFilters evaluation on a large in-memory post set.
+
+Times, end to end over post models like /api/filter-posts receives:
+the endpoint's original per-post loop and filter_rows (what the endpoint runs now).
+
+    cd backend && python -m benchmarks.bench_filter --posts 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+
+from columnar import filter_rows
+from storage.base import parse_filter_dates
+
+FILTERS = {
+    "min_upvotes": 50, "max_upvotes": 5000, "min_comments": 5, "max_comments": None,
+    "subreddit": "python", "start_date": "2024-01-05T00:00:00Z", "end_date": "2024-01-25T00:00:00Z",
+    "min_sentiment": 2.0, "max_sentiment": 9.0,
+}
+
+
+class Post(BaseModel):
+    id: str
+    subreddit: str
+    upvotes: int
+    comments: int
+    created_utc: float
+    sentiment_score: Optional[float] = None
+
+
+def make_posts(count):
+    subreddits = ["python", "learnpython", "rust", "golang", "programming", "datascience", "webdev", "java"]
+    start = 1704067200.0  # 2024-01-01
+    return [
+        Post.model_construct(
+            id=f"p{i}", subreddit=random.choice(subreddits),
+            upvotes=random.randint(0, 10000), comments=random.randint(0, 500),
+            created_utc=start + random.uniform(0, 30 * 86400),
+            sentiment_score=None if i % 20 == 0 else random.uniform(0, 10),
+        )
+        for i in range(count)
+    ]
+
+
+def loop_filter(posts, filters):
+    """The endpoint's original loop"""
+    start_ts, end_ts = parse_filter_dates(filters)
+    kept = []
+    for post in posts:
+        score = post.sentiment_score
+        if filters["min_upvotes"] is not None and post.upvotes < filters["min_upvotes"]:
+            continue
+        if filters["max_upvotes"] is not None and post.upvotes > filters["max_upvotes"]:
+            continue
+        if filters["min_comments"] is not None and post.comments < filters["min_comments"]:
+            continue
+        if filters["max_comments"] is not None and post.comments > filters["max_comments"]:
+            continue
+        if filters["subreddit"] and filters["subreddit"].lower() not in post.subreddit.lower():
+            continue
+        if start_ts and post.created_utc < start_ts:
+            continue
+        if end_ts and post.created_utc > end_ts:
+            continue
+        if filters["min_sentiment"] is not None and (score is None or score < filters["min_sentiment"]):
+            continue
+        if filters["max_sentiment"] is not None and (score is None or score > filters["max_sentiment"]):
+            continue
+        kept.append(post)
+    return kept
+
+
+def timed(label, fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    posts = make_posts(args.posts)
+    print(f"{args.posts} posts")
+
+    expected = timed("original loop", lambda: loop_filter(posts, FILTERS), args.repeat)
+    rows = timed("filter_rows", lambda: filter_rows(posts, FILTERS), args.repeat)
+
+    assert rows == expected, "filters disagree with the original loop"
+    print(f"{len(expected)} posts matched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark the latency of other requests during a login storm.
+
+Fires a burst of concurrent password checks (what /api/login spends its time
+on) while a probe coroutine stands in for a cheap endpoint, awaking every few
+milliseconds and recording how late it ran. With bcrypt inline in the handler
+the probe waits behind every hash in turn; with PasswordHasher the hashes run
+on the bcrypt pool and the probe's latency stays flat.
+
+    cd backend && python -m benchmarks.bench_login_storm --logins 50 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(latencies, stop):
+    """A trivial request handler: how long past its due time does it get to run?"""
+    while not stop.is_set():
+        due = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        latencies.append(time.perf_counter() - due)
+
+
+async def storm(verify, logins):
+    latencies, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(latencies, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 4)
+    started = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return elapsed, latencies
+
+
+def report(label, elapsed, latencies):
+    ms = sorted(latency * 1000 for latency in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{label:<8} storm {elapsed:6.2f} s   probe p50 {statistics.median(ms):8.2f} ms"
+          f"   p99 {p99:8.2f} ms   max {ms[-1]:8.2f} ms   ({len(ms)} probes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(rounds=args.rounds, max_workers=args.workers)
+    hashed = hasher.hash_sync("correct horse battery staple")
+
+    async def inline():
+        # The previous handler: bcrypt called directly inside the coroutine
+        return hasher.verify_sync("correct horse battery staple", hashed)
+
+    async def pooled():
+        return await hasher.verify("correct horse battery staple", hashed)
+
+    print(f"{args.logins} concurrent logins, cost {args.rounds}, {args.workers} bcrypt workers")
+    report("inline", *asyncio.run(storm(inline, args.logins)))
+    report("pooled", *asyncio.run(storm(pooled, args.logins)))
+    hasher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Measure bytes and latency saved by conditional GETs and compression.
+
+Replays the React app's request pattern against /api/saved-keywords,
+/api/search-history and /api/dashboard, backed by SQLite:
+every page load fetches all three, each search refetches the history and each
+saved keyword refetches the keyword list. The client behaves like the
+browser's HTTP cache, sending If-None-Match with the last ETag it saw and
+Accept-Encoding: gzip, deflate, br.
+
+The same trace runs twice: against the old handlers (full JSON every time) and
+against handlers with ETags behind CompressionMiddleware. Latency is server time
+plus the transfer time of headers and body at --mbps.
+
+    cd backend && python -m benchmarks.bench_polling --sessions 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
+
+from cache import etag_matches, make_etag
+from compression import CompressionMiddleware
+from storage.sqlite import SQLiteStorage
+
+USER_ID = "bench-user"
+KEYWORDS = ["python", "rust", "golang", "java", "typescript", "kotlin"]
+
+
+def make_posts(search_index, count):
+    return [{
+        "id": f"s{search_index}p{i}", "title": f"Benchmark post {i} about {KEYWORDS[search_index % len(KEYWORDS)]}",
+        "author": "bench", "subreddit": "benchmark", "upvotes": i, "url": "https://example.com",
+        "comments": i // 2, "created_utc": time.time() - i * 60, "permalink": "https://reddit.com/r/benchmark",
+        "body": None, "sentiment_score": (search_index * 7 + i) % 100 / 10, "summary": None,
+    } for i in range(count)]
+
+
+async def save_search(storage, index, when):
+    search = {
+        "id": str(uuid.uuid4()), "user_id": USER_ID, "keyword": KEYWORDS[index % len(KEYWORDS)],
+        "subreddit": "all", "timestamp": when.isoformat(), "post_count": 25, "avg_sentiment": 5.0,
+    }
+    await storage.save_search_results(search, make_posts(index, 25))
+    storage.bump_versions(USER_ID, "searches", "posts")
+
+
+def save_keyword(storage, index):
+    storage.add_keyword({
+        "id": str(uuid.uuid4()), "user_id": USER_ID, "keyword": f"{KEYWORDS[index % len(KEYWORDS)]} {index}",
+        "subreddit": "all", "created_at": datetime.now(timezone.utc).isoformat(), "active": True
+    })
+    storage.bump_versions(USER_ID, "keywords")
+
+
+def build_app(storage, conditional, minimum_size):
+    """The three polled endpoints, as they were (conditional=False) or with ETags and compression"""
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    def respond(request, key, scopes, build):
+        if not conditional:
+            return ORJSONResponse(build())
+        etag = make_etag(USER_ID, key, storage.get_versions(USER_ID), scopes)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return ORJSONResponse(build(), headers=headers)
+
+    @app.get("/api/saved-keywords")
+    async def saved_keywords(request: Request):
+        return respond(request, ("saved-keywords",), ("keywords",),
+                       lambda: storage.list_active_keywords(USER_ID))
+
+    @app.get("/api/search-history")
+    async def search_history(request: Request, limit: int = 50):
+        return respond(request, ("search-history", limit, None, None), ("searches",),
+                       lambda: {"items": storage.search_history(USER_ID, limit), "next_cursor": None})
+
+    @app.get("/api/dashboard")
+    async def dashboard(request: Request):
+        start_date = (datetime.now(timezone.utc) - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        def build():
+            trends = storage.sentiment_trends(USER_ID, start_date)
+            scored = sum(day["post_count"] for day in trends)
+            return {
+                "recent_searches": storage.search_history(USER_ID, 10),
+                "sentiment_trends": trends,
+                "keyword_stats": storage.keyword_stats(USER_ID, 10),
+                "summary_stats": {
+                    "total_searches": storage.count_searches(USER_ID),
+                    "total_posts": storage.count_user_posts(USER_ID),
+                    "avg_sentiment": round(sum(day["sentiment_sum"] for day in trends) / scored, 2) if scored else None
+                }
+            }
+
+        return respond(request, ("dashboard", start_date, None), ("searches", "posts"), build)
+
+    if conditional:
+        app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return app
+
+
+class BrowserClient:
+    """Sends requests straight into the ASGI app and keeps ETags like an HTTP cache"""
+
+    def __init__(self, app, mbps):
+        self.app = app
+        self.bytes_per_second = mbps * 1_000_000 / 8
+        self.etags = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.wire_bytes = 0
+        self.server_seconds = 0.0
+        self.transfer_seconds = 0.0
+
+    async def get(self, path):
+        headers = [(b"accept-encoding", b"gzip, deflate, br")]
+        if path in self.etags:
+            headers.append((b"if-none-match", self.etags[path].encode("latin-1")))
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "root_path": "", "headers": headers, "server": ("bench", 80), "client": ("bench", 1)}
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await self.app(scope, receive, send)
+        elapsed = time.perf_counter() - started
+
+        start = messages[0]
+        size = sum(len(name) + len(value) + 4 for name, value in start["headers"]) + 17
+        size += sum(len(message.get("body", b"")) for message in messages[1:])
+        for name, value in start["headers"]:
+            if name == b"etag":
+                self.etags[path] = value.decode("latin-1")
+        self.requests += 1
+        self.not_modified += start["status"] == 304
+        self.wire_bytes += size
+        self.server_seconds += elapsed
+        self.transfer_seconds += size / self.bytes_per_second
+
+
+async def replay(args, conditional):
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bench.db"))
+        storage.ensure_schema()
+        now = datetime.now(timezone.utc)
+        for i in range(args.history):
+            await save_search(storage, i, now - timedelta(hours=(args.history - i) * 3))
+        for i in range(args.keywords):
+            save_keyword(storage, i)
+
+        client = BrowserClient(build_app(storage, conditional, args.min_bytes), args.mbps)
+        for session in range(args.sessions):
+            # Page load: the app fetches all three on mount
+            for path in ("/api/saved-keywords", "/api/search-history", "/api/dashboard"):
+                await client.get(path)
+            if session % args.search_every == 0:
+                await save_search(storage, args.history + session, datetime.now(timezone.utc))
+                await client.get("/api/search-history")
+            if session % args.keyword_every == 0:
+                save_keyword(storage, args.keywords + session)
+                await client.get("/api/saved-keywords")
+        storage.close()
+        return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="page loads to replay")
+    parser.add_argument("--history", type=int, default=300, help="searches stored before the replay")
+    parser.add_argument("--keywords", type=int, default=12)
+    parser.add_argument("--search-every", type=int, default=3, help="one search every N page loads")
+    parser.add_argument("--keyword-every", type=int, default=20, help="one saved keyword every N page loads")
+    parser.add_argument("--mbps", type=float, default=10.0, help="client link speed for transfer time")
+    parser.add_argument("--min-bytes", type=int, default=1024, help="compression threshold")
+    args = parser.parse_args()
+
+    results = [("full responses", asyncio.run(replay(args, False))),
+               ("ETag + compression", asyncio.run(replay(args, True)))]
+    baseline = results[0][1]
+    print(f"{args.sessions} page loads, {baseline.requests} requests, {args.mbps:g} Mbit/s")
+    print(f"  {'':<20} {'wire':>9}     {'server':>6}   {'transfer':>8}   {'per request':>11}")
+    for label, client in results:
+        per_request = (client.server_seconds + client.transfer_seconds) / client.requests
+        print(f"  {label:<20} {client.wire_bytes / 1024:6.0f} KiB   {client.server_seconds:6.2f} s   "
+              f"{client.transfer_seconds:6.2f} s   {per_request * 1000:8.2f} ms   {client.not_modified:4d} x 304")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Benchmark search persistence: per-post update_one vs. the bulk write buffer.
+
+Simulates concurrent searches that each store `--posts` results and reports
+per-search latency and write throughput against a local mongod (MONGO_URL,
+default localhost).
+
+With --simulate-rtt-ms the writes go to an in-process stand-in instead, which
+blocks the calling thread for one round trip per call plus --op-us per
+operation. Absolute numbers then only reflect those two parameters; the
+comparison shows what batching across searches saves in round trips and event
+loop time.
+
+    cd backend && python -m benchmarks.bench_search_persist --searches 200 --concurrency 20
+    cd backend && python -m benchmarks.bench_search_persist --simulate-rtt-ms 1.0 --op-us 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient, UpdateOne
+
+from write_buffer import BulkWriteBuffer
+
+
+def make_posts(count):
+    now = time.time()
+    return [{
+        "id": uuid.uuid4().hex[:8],
+        "title": f"Benchmark post {i}",
+        "author": "bench",
+        "subreddit": "benchmark",
+        "upvotes": i,
+        "url": "https://example.com",
+        "comments": i // 2,
+        "created_utc": now - i * 60,
+        "permalink": "https://reddit.com/r/benchmark",
+        "sentiment_score": 5.0,
+    } for i in range(count)]
+
+
+class SimulatedCollection:
+    """Collection stand-in that costs a fixed round trip per call and a fixed server time per operation"""
+
+    name = "posts"
+
+    def __init__(self, rtt_ms, op_us):
+        self.rtt = rtt_ms / 1000
+        self.op = op_us / 1_000_000
+        self.round_trips = 0
+
+    def update_one(self, filter, update, upsert=False):
+        self.round_trips += 1
+        time.sleep(self.rtt + self.op)
+
+    def bulk_write(self, operations, ordered=True):
+        self.round_trips += 1
+        time.sleep(self.rtt + self.op * len(operations))
+        return SimpleNamespace(upserted_ids={})
+
+    def delete_many(self, filter):
+        self.round_trips = 0
+
+
+async def run_update_one(collection, posts):
+    # Original behaviour: one blocking round-trip per post on the event loop
+    for post in posts:
+        collection.update_one({"id": post["id"]}, {"$set": post}, upsert=True)
+
+
+async def run_buffered(buffer, posts):
+    await buffer.submit([UpdateOne({"id": p["id"]}, {"$set": p}, upsert=True) for p in posts])
+
+
+async def measure(label, runner, searches, concurrency, posts_per_search):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_search():
+        async with semaphore:
+            posts = make_posts(posts_per_search)
+            start = time.perf_counter()
+            await runner(posts)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_search() for _ in range(searches)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<12} searches={searches} wall={wall:.2f}s posts/s={searches * posts_per_search / wall:,.0f} "
+          f"p50={statistics.median(latencies):.1f}ms p95={p95:.1f}ms max={latencies[-1]:.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--simulate-rtt-ms", type=float, default=None,
+                        help="write to an in-process stand-in with this round-trip time instead of mongod")
+    parser.add_argument("--op-us", type=float, default=20.0, help="simulated server time per operation")
+    args = parser.parse_args()
+
+    if args.simulate_rtt_ms is not None:
+        collection = SimulatedCollection(args.simulate_rtt_ms, args.op_us)
+        await compare(collection, args)
+        return
+
+    client = MongoClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    db = client["bench_search_persist"]
+    collection = db["posts"]
+    collection.drop()
+    collection.create_index("id", unique=True)
+    try:
+        await compare(collection, args)
+    finally:
+        client.drop_database(db.name)
+
+
+async def compare(collection, args):
+    await measure("update_one", lambda posts: run_update_one(collection, posts),
+                  args.searches, args.concurrency, args.posts)
+    collection.delete_many({})
+    buffer = BulkWriteBuffer(collection)
+    await measure("bulk_write", lambda posts: run_buffered(buffer, posts),
+                  args.searches, args.concurrency, args.posts)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
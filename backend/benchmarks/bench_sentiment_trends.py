@@ -0,0 +1,154 @@
+"""Benchmark dashboard sentiment trends on a synthetic archive.
+
+Loads `--posts` user_posts memberships for one user spread over `--days` days and
+times the trend query against the previous approach of pulling posts into Python
+and grouping by day. The Mongo backend (MONGO_URL, default localhost) times each
+percentile method the server supports; --backend sqlite runs the same workload
+on the embedded backend. Both also time the dashboard's sentiment section, the
+trend rows plus the overall average weighted from them.
+
+    cd backend && python -m benchmarks.bench_sentiment_trends --posts 1000000
+    cd backend && python -m benchmarks.bench_sentiment_trends --posts 1000000 --backend sqlite
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dates import to_datetime
+from indexes import apply_indexes
+from storage.mongo import PERCENTILE_METHODS, MongoStorage, build_sentiment_trend_pipeline
+from storage.sqlite import SQLiteStorage
+
+USER_ID = "bench-user"
+
+
+def synthetic_memberships(posts, days, batch_size=10000):
+    """Batches of memberships with random search times and scores"""
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    batch = []
+    for i in range(posts):
+        ts = start + timedelta(seconds=random.uniform(0, days * 86400))
+        batch.append({
+            "user_id": USER_ID,
+            "post_id": f"p{i}",
+            "keyword": random.choice(["python", "rust", "golang", "java"]),
+            "search_ts": ts,
+            "sentiment_score": round(random.uniform(0, 10), 2),
+        })
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_archive(collection, posts, days):
+    for batch in synthetic_memberships(posts, days):
+        collection.insert_many(batch, ordered=False)
+
+
+def load_sqlite(storage, posts, days):
+    for batch in synthetic_memberships(posts, days):
+        storage.conn.execute("BEGIN")
+        storage.conn.executemany(
+            "INSERT INTO user_posts (user_id, post_id, keyword, search_ts, sentiment_score) VALUES (?, ?, ?, ?, ?)",
+            [(m["user_id"], m["post_id"], m["keyword"], m["search_ts"].isoformat(), m["sentiment_score"])
+             for m in batch]
+        )
+        storage.conn.execute("COMMIT")
+
+
+def python_grouping(collection, start_day):
+    # Previous approach: fetch every scored post and group in Python
+    groups = {}
+    for post in collection.find({"user_id": USER_ID, "search_ts": {"$gte": to_datetime(start_day)}},
+                                {"_id": 0, "sentiment_score": 1, "search_ts": 1}):
+        groups.setdefault(post["search_ts"].strftime("%Y-%m-%d"), []).append(post["sentiment_score"])
+    return [{"_id": day, "avg_sentiment": sum(s) / len(s), "post_count": len(s)} for day, s in groups.items()]
+
+
+def sqlite_python_grouping(storage, start_day):
+    groups = {}
+    for row in storage.conn.execute("SELECT search_ts, sentiment_score FROM user_posts "
+                                    "WHERE user_id = ? AND search_ts >= ?", (USER_ID, start_day)):
+        groups.setdefault(row["search_ts"][:10], []).append(row["sentiment_score"])
+    return [{"_id": day, "avg_sentiment": sum(s) / len(s), "post_count": len(s)} for day, s in groups.items()]
+
+
+def dashboard_sentiment(storage, start_day):
+    """The dashboard's trend rows and the overall average weighted from them"""
+    trends = storage.sentiment_trends(USER_ID, start_day)
+    scored = sum(day["post_count"] for day in trends)
+    return trends, sum(day["sentiment_sum"] for day in trends) / scored if scored else None
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    days = result[0] if isinstance(result, tuple) else result
+    print(f"{label:<28} best of {repeat}: {best * 1000:.0f}ms ({len(days)} days)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--range-days", type=int, default=30)
+    parser.add_argument("--backend", choices=["mongo", "sqlite"], default="mongo")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        with tempfile.TemporaryDirectory() as directory:
+            storage = SQLiteStorage(os.path.join(directory, "bench.db"))
+            storage.ensure_schema()
+            start = time.perf_counter()
+            load_sqlite(storage, args.posts, args.days)
+            print(f"Loaded {args.posts} posts in {time.perf_counter() - start:.1f}s")
+            for range_days in (args.range_days, args.days):
+                start_day = (datetime.now(timezone.utc) - timedelta(days=range_days)).strftime("%Y-%m-%d")
+                print(f"-- range: last {range_days} days")
+                timed("python grouping", lambda: sqlite_python_grouping(storage, start_day))
+                timed("sentiment_trends", lambda: storage.sentiment_trends(USER_ID, start_day))
+                timed("dashboard sentiment", lambda: dashboard_sentiment(storage, start_day))
+            storage.close()
+        return
+
+    storage = MongoStorage(os.getenv("MONGO_URL", "mongodb://localhost:27017"), "bench_sentiment_trends")
+    db = storage.db
+    collection = db["user_posts"]
+    collection.drop()
+    apply_indexes(db)
+
+    try:
+        start = time.perf_counter()
+        load_archive(collection, args.posts, args.days)
+        print(f"Loaded {args.posts} posts in {time.perf_counter() - start:.1f}s")
+
+        version = tuple(storage.client.server_info()["versionArray"][:2])
+        methods = [method for minimum, method in PERCENTILE_METHODS if version >= minimum]
+        for range_days in (args.range_days, args.days):
+            start_day = (datetime.now(timezone.utc) - timedelta(days=range_days)).strftime("%Y-%m-%d")
+            print(f"-- range: last {range_days} days")
+            timed("python grouping", lambda: python_grouping(collection, start_day))
+            for method in methods:
+                timed(f"pipeline ({method})", lambda: list(collection.aggregate(
+                    build_sentiment_trend_pipeline(USER_ID, start_day, percentile_method=method),
+                    allowDiskUse=True
+                )))
+            timed("dashboard sentiment", lambda: dashboard_sentiment(storage, start_day))
+    finally:
+        storage.client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark post-list response serialization at 100, 1k and 10k posts.
+
+Compares what a handler returning List[RedditPost] under response_model costs
+(FastAPI's own serialize_response: validate every post again, dump to Python,
+then render with the stdlib json or with orjson) against ModelJSONResponse,
+which writes the JSON straight from the already-validated models.
+
+    cd backend && python -m benchmarks.bench_serialize
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel, TypeAdapter
+
+from responses import ModelJSONResponse
+
+
+class RedditPost(BaseModel):
+    # Mirrors server.RedditPost; importing server would need every API client installed
+    id: str
+    title: str
+    author: Optional[str]
+    subreddit: str
+    upvotes: int
+    url: str
+    comments: int
+    created_utc: float
+    permalink: str
+    body: Optional[str] = None
+    keyword_searched: Optional[str] = None
+    search_timestamp: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    summary: Optional[str] = None
+
+
+def make_posts(count):
+    return [RedditPost(
+        id=f"p{i}", title=f"Benchmark post {i} about python and rust", author="someone",
+        subreddit=random.choice(["python", "rust", "golang"]), upvotes=random.randint(0, 5000),
+        url="https://example.com", comments=random.randint(0, 300), created_utc=1700000000.0 + i,
+        permalink=f"https://reddit.com/r/python/p{i}", body="x" * 500, keyword_searched="python",
+        search_timestamp="2024-01-01T00:00:00+00:00", sentiment_score=round(random.uniform(0, 10), 2)
+    ) for i in range(count)]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    field = create_response_field(name="Response_search_posts", type_=List[RedditPost])
+    adapter = TypeAdapter(List[RedditPost])
+    loop = asyncio.new_event_loop()
+
+    def response_model(response_class):
+        def run(posts):
+            content = loop.run_until_complete(serialize_response(field=field, response_content=posts))
+            return len(response_class(content).body)
+        return run
+
+    paths = [
+        ("response_model + json", response_model(JSONResponse)),
+        ("response_model + orjson", response_model(ORJSONResponse)),
+        ("ModelJSONResponse", lambda posts: len(ModelJSONResponse(posts, adapter).body)),
+    ]
+
+    for count in args.sizes:
+        posts = make_posts(count)
+        baseline = None
+        print(f"{count} posts")
+        for label, fn in paths:
+            elapsed, size = best_of(lambda: fn(posts), args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {label:<24} {elapsed * 1000:9.2f} ms   {baseline / elapsed:5.1f}x   {size / 1024:8.0f} KiB")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
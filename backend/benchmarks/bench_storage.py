@@ -0,0 +1,108 @@
+"""Benchmark the storage backends on the same workload.
+
+Runs searches that store `--posts` posts each, then times the read paths the
+endpoints use (history pages, dashboard queries, a full export). SQLite always
+runs; MongoDB runs when MONGO_URL points at a reachable server.
+
+    cd backend && python -m benchmarks.bench_storage --searches 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.sqlite import SQLiteStorage
+
+USER_ID = "bench-user"
+KEYWORDS = ["python", "rust", "golang", "java"]
+
+
+def make_posts(search_index, count):
+    return [{
+        "id": f"s{search_index}p{i}", "title": f"Benchmark post {i}", "author": "bench",
+        "subreddit": "benchmark", "upvotes": i, "url": "https://example.com", "comments": i // 2,
+        "created_utc": time.time() - i * 60, "permalink": "https://reddit.com/r/benchmark",
+        "body": None, "sentiment_score": (search_index * 7 + i) % 100 / 10, "summary": None,
+    } for i in range(count)]
+
+
+def timed(label, fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<26} {best * 1000:8.2f}ms")
+
+
+async def write_workload(storage, searches, posts_per_search):
+    start_ts = datetime.now(timezone.utc) - timedelta(hours=searches * 2)
+    started = time.perf_counter()
+    for i in range(searches):
+        search = {
+            "id": str(uuid.uuid4()), "user_id": USER_ID, "keyword": KEYWORDS[i % len(KEYWORDS)],
+            "subreddit": "all", "timestamp": (start_ts + timedelta(hours=i * 2)).isoformat(),
+            "post_count": posts_per_search, "avg_sentiment": 5.0,
+        }
+        await storage.save_search_results(search, make_posts(i, posts_per_search))
+    elapsed = time.perf_counter() - started
+    print(f"  {'save_search_results':<26} {elapsed / searches * 1000:8.2f}ms per search")
+
+
+def run(storage, args):
+    print(f"{storage.name}:")
+    asyncio.run(write_workload(storage, args.searches, args.posts))
+
+    def deep_history():
+        after = None
+        while True:
+            page = storage.search_history(USER_ID, 50, after=after)
+            if not page:
+                break
+            after = (page[-1]["timestamp"], page[-1]["id"])
+
+    start_day = (datetime.now(timezone.utc) - timedelta(days=30)).strftime("%Y-%m-%d")
+    timed("history first page", lambda: storage.search_history(USER_ID, 50))
+    timed("history all pages", deep_history, repeat=1)
+    timed("keyword stats", lambda: storage.keyword_stats(USER_ID))
+    timed("count user posts", lambda: storage.count_user_posts(USER_ID))
+    timed("sentiment trends (30d)", lambda: storage.sentiment_trends(USER_ID, start_day))
+    timed("full export", lambda: sum(1 for _ in storage.iter_export_rows(USER_ID)), repeat=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bench.db"))
+        storage.ensure_schema()
+        run(storage, args)
+        storage.close()
+
+    if os.getenv("MONGO_URL"):
+        from indexes import apply_indexes
+        from storage.mongo import MongoStorage
+        from trending import ensure_metrics_collection
+
+        storage = MongoStorage(os.getenv("MONGO_URL"), "bench_storage")
+        ensure_metrics_collection(storage.db)
+        apply_indexes(storage.db)
+        try:
+            run(storage, args)
+        finally:
+            storage.client.drop_database(storage.db.name)
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Per-user data versions and an in-memory response cache keyed on them.
+
+Writes bump a user's version counters in Mongo, so every worker process sees the
+change. Cached responses are only served while the versions they were built from
+are still current, which makes explicit invalidation unnecessary.
+
+TTLCache covers data without a version counter, where bounded staleness is
+acceptable.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+# Content codings whose representations get their own ETag, e.g. "abc" -> "abc-gzip"
+ETAG_ENCODINGS = ("br", "gzip")
+
+
+class DataVersions:
+    """Monotonic per-user generation counters, one per data scope (searches, posts, ...)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get(self, user_id: str) -> Dict[str, int]:
+        doc = self.collection.find_one({"_id": user_id}, {"_id": 0})
+        return doc or {}
+
+    def bump(self, user_id: str, *scopes: str) -> Dict[str, int]:
+        doc = self.collection.find_one_and_update(
+            {"_id": user_id},
+            {"$inc": {scope: 1 for scope in scopes}},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc or {}
+
+
+def make_etag(user_id: str, key: Iterable[Any], versions: Dict[str, int], scopes: Iterable[str]) -> str:
+    """Strong ETag for a response built from the given scopes of a user's data"""
+    parts = [user_id, *map(str, key), *(f"{scope}={versions.get(scope, 0)}" for scope in scopes)]
+    return '"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Strong ETag of a representation compressed with the given content coding"""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return etag[:-1] + f'-{encoding}"'
+
+
+def strip_etag_suffix(etag: str) -> str:
+    """The handler's ETag behind the tag of a compressed representation"""
+    for encoding in ETAG_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers the given ETag, in any content coding"""
+    if not if_none_match:
+        return False
+    candidates = [strip_etag_suffix(value.strip()) for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Thread-safe LRU of assembled response payloads, validated by ETag"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, etag: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Tuple, etag: str, payload: Any):
+        with self._lock:
+            self._entries[key] = (etag, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class TTLCache:
+    """Thread-safe LRU whose entries expire ttl_seconds after they were set"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Any, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value; ttl_seconds can shorten (never extend) the cache's TTL for this entry"""
+        ttl = self.ttl if ttl_seconds is None else min(ttl_seconds, self.ttl)
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
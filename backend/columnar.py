@@ -0,0 +1,112 @@
+"""In-memory post filtering and columnar sentiment analytics.
+
+/api/filter-posts gets a new post set with every request, so filter_rows makes
+one early-exit pass over it; building NumPy columns would cost more than a
+vectorized mask saves. daily_sentiment computes the archived dashboard trend
+statistics column-wise over (day, score) arrays.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from storage.base import TREND_PERCENTILES, parse_filter_dates
+
+
+def encode_categories(values: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Categorical codes for a string column: (codes per row, categories in ascending order)"""
+    # Hashing each value once is far cheaper than np.unique's sort over Python strings
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32)
+    categories = np.array(list(lookup), dtype=object)
+    order = np.argsort(categories)
+    remap = np.empty(len(order), dtype=np.int32)
+    remap[order] = np.arange(len(order), dtype=np.int32)
+    return remap[codes], categories[order]
+
+
+def filter_rows(posts: Sequence[Any], filters: Dict[str, Any]) -> List[Any]:
+    """The posts (RedditPost models) passing SearchFilters, in order.
+
+    Bounds are resolved once up front, and subreddit matches are remembered per
+    name, so each post costs a few attribute comparisons. Unscored posts never
+    pass a sentiment bound.
+    """
+    start_ts, end_ts = parse_filter_dates(filters)
+    min_upvotes, max_upvotes = filters.get("min_upvotes"), filters.get("max_upvotes")
+    min_comments, max_comments = filters.get("min_comments"), filters.get("max_comments")
+    min_sentiment, max_sentiment = filters.get("min_sentiment"), filters.get("max_sentiment")
+    start_ts, end_ts = start_ts or None, end_ts or None
+    needle = (filters.get("subreddit") or "").lower()
+    subreddit_matches: Dict[str, bool] = {}
+
+    kept = []
+    for post in posts:
+        if min_upvotes is not None and post.upvotes < min_upvotes:
+            continue
+        if max_upvotes is not None and post.upvotes > max_upvotes:
+            continue
+        if min_comments is not None and post.comments < min_comments:
+            continue
+        if max_comments is not None and post.comments > max_comments:
+            continue
+        if start_ts is not None and post.created_utc < start_ts:
+            continue
+        if end_ts is not None and post.created_utc > end_ts:
+            continue
+        score = post.sentiment_score
+        if min_sentiment is not None and (score is None or score < min_sentiment):
+            continue
+        if max_sentiment is not None and (score is None or score > max_sentiment):
+            continue
+        if needle:
+            matches = subreddit_matches.get(post.subreddit)
+            if matches is None:
+                matches = subreddit_matches[post.subreddit] = needle in post.subreddit.lower()
+            if not matches:
+                continue
+        kept.append(post)
+    return kept
+
+
+def daily_sentiment(days: Sequence[str], scores: Iterable[Optional[float]]) -> List[Dict[str, Any]]:
+    """Per-day sentiment average, spread, count and quantiles, newest day first.
+
+    Rows are sorted once by (day, score); every statistic is then read off the
+    group boundaries. Percentiles use the nearest-rank rule of the live trend
+    paths (storage.sqlite.nearest_rank and the Mongo trend pipeline), so
+    archived and live days agree. Output is shaped like the dashboard trend pipeline.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = ~np.isnan(scores)
+    if not valid.any():
+        return []
+    day_codes, day_names = encode_categories(np.asarray(days, dtype=object)[valid].tolist())
+    scores = scores[valid]
+
+    order = np.lexsort((scores, day_codes))
+    day_codes, scores = day_codes[order], scores[order]
+    counts = np.bincount(day_codes, minlength=len(day_names))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    sums = np.bincount(day_codes, weights=scores, minlength=len(day_names))
+    means = sums / counts
+    variances = np.bincount(day_codes, weights=(scores - means[day_codes]) ** 2, minlength=len(day_names)) / counts
+
+    quantile_values = [scores[starts + np.floor(p * (counts - 1)).astype(np.int64)] for p in TREND_PERCENTILES]
+
+    trends = []
+    # encode_categories returns days in ascending order
+    for i in reversed(range(len(day_names))):
+        p25, median, p75, p90 = (round(float(values[i]), 2) for values in quantile_values)
+        trends.append({
+            "_id": day_names[i],
+            "avg_sentiment": round(float(means[i]), 2),
+            "std_sentiment": round(float(np.sqrt(variances[i])), 2),
+            "sentiment_sum": float(sums[i]),
+            "post_count": int(counts[i]),
+            "p25": p25,
+            "median": median,
+            "p75": p75,
+            "p90": p90,
+        })
+    return trends
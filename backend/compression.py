@@ -0,0 +1,184 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Brotli is used when the `brotli` package is installed and the client accepts
+it, gzip otherwise. Only text-like bodies of at least minimum_size bytes are
+compressed; binary formats (Parquet, Arrow) gain little, and responses that
+serve byte ranges (export part downloads) must keep their offsets meaningful,
+so both pass through untouched. Streaming bodies are compressed chunk by chunk
+and flushed, so CSV and NDJSON exports still arrive progressively.
+
+A compressed representation gets its own strong ETag, the handler's tag with an
+encoding suffix ("abc" -> "abc-gzip"). cache.etag_matches strips the suffix, so
+handlers keep comparing against the tag they built; a 304 echoes the suffixed
+tag the client sent back.
+"""
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from cache import encoded_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content coding for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    # Ties go to the first supported encoding, so br wins over gzip at equal weight
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible responses with gzip or brotli"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        responder = _CompressingSend(self, send, encoding, if_none_match)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingSend:
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str, if_none_match: str):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.if_none_match = [value.strip() for value in if_none_match.split(",") if value.strip()]
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = _header_map(message["headers"])
+            if message["status"] == 304:
+                self.passthrough = True
+                await self.send(self._not_modified(message, headers))
+            elif not self._eligible(message["status"], headers):
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(self._varied_start())
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level,
+                                          self.middleware.brotli_quality)
+            compressed = self.compressor.compress(body, final=not more_body)
+            await self.send(self._compressed_start(None if more_body else len(compressed)))
+        else:
+            compressed = self.compressor.compress(body, final=not more_body)
+        if compressed or not more_body:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _eligible(self, status: int, headers: Dict[bytes, bytes]) -> bool:
+        if status < 200 or status == 204:
+            return False
+        if b"content-encoding" in headers or b"content-range" in headers or b"accept-ranges" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+    def _varied_start(self):
+        headers = [(name, value) for name, value in self.start["headers"] if name.lower() != b"vary"]
+        headers.append((b"vary", _vary(_header_map(self.start["headers"]).get(b"vary"))))
+        return {**self.start, "headers": headers}
+
+    def _compressed_start(self, length: Optional[int]):
+        headers = [(name, value) for name, value in self.start["headers"]
+                   if name.lower() not in (b"content-length", b"etag", b"vary")]
+        original = _header_map(self.start["headers"])
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        headers.append((b"vary", _vary(original.get(b"vary"))))
+        if b"etag" in original:
+            etag = encoded_etag(original[b"etag"].decode("latin-1"), self.encoding)
+            headers.append((b"etag", etag.encode("latin-1")))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+        return {**self.start, "headers": headers}
+
+    def _not_modified(self, message, headers: Dict[bytes, bytes]):
+        """A 304 carries the tag of the representation the client holds"""
+        etag = headers.get(b"etag")
+        if etag is None:
+            return message
+        suffixed = encoded_etag(etag.decode("latin-1"), self.encoding)
+        if suffixed not in self.if_none_match:
+            return message
+        rewritten: List[Tuple[bytes, bytes]] = [(name, value) for name, value in message["headers"]
+                                                if name.lower() not in (b"etag", b"vary")]
+        rewritten.append((b"etag", suffixed.encode("latin-1")))
+        rewritten.append((b"vary", _vary(headers.get(b"vary"))))
+        return {**message, "headers": rewritten}
+
+
+def _header_map(headers) -> Dict[bytes, bytes]:
+    return {name.lower(): value for name, value in headers}
+
+
+def _vary(existing: Optional[bytes]) -> bytes:
+    if not existing:
+        return b"Accept-Encoding"
+    if b"accept-encoding" in existing.lower() or existing.strip() == b"*":
+        return existing
+    return existing + b", Accept-Encoding"
@@ -0,0 +1,74 @@
+"""Date handling for MongoDB documents.
+
+posts.created_utc and user_posts.search_ts are stored as BSON datetimes, so
+range filters use the indexes and day bucketing runs server-side. The API keeps
+its existing shapes (created_utc as epoch seconds, search_timestamp as an ISO
+string), so values are converted where they enter and leave MongoDB.
+
+Documents written before the migration still hold floats and strings; the
+aggregation expressions and date_match accept either form so reads stay correct
+while `manage.py migrate-datetimes` works through them.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Union
+
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%L+00:00"
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def to_datetime(value: Union[str, float, int, datetime, None]) -> Optional[datetime]:
+    """UTC datetime from an ISO string, epoch seconds or a (possibly naive) datetime"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    else:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def date_range(start: Optional[str], end: Optional[str]) -> Dict[str, datetime]:
+    """Range operators for user-supplied bounds; a date-only end covers that whole day"""
+    bounds = {}
+    if start:
+        bounds["$gte"] = to_datetime(start)
+    if end:
+        if len(end) == 10:
+            bounds["$lt"] = to_datetime(end) + timedelta(days=1)
+        else:
+            bounds["$lte"] = to_datetime(end)
+    return bounds
+
+
+def legacy_value(field: str, value: datetime) -> Union[str, float]:
+    """A bound in the form the field had before migration: epoch seconds for created_utc, ISO text otherwise"""
+    return value.timestamp() if field.endswith("created_utc") else value.isoformat()
+
+
+def date_match(field: str, bounds: Dict[str, datetime]) -> Dict[str, Any]:
+    """Range filter matching both migrated dates and unmigrated floats or strings.
+
+    BSON comparisons never cross types, so each stored form needs its own branch.
+    Both branches use the same index on the field.
+    """
+    legacy = {op: legacy_value(field, value) for op, value in bounds.items()}
+    return {"$or": [{field: bounds}, {field: legacy}]}
+
+
+def date_expression(field: str) -> Dict[str, Any]:
+    """The field as a BSON date, whether stored as a date, an ISO string or epoch seconds"""
+    return {"$cond": [{"$isNumber": field}, {"$toDate": {"$multiply": [field, 1000]}}, {"$toDate": field}]}
+
+
+def epoch_seconds_expression(field: str) -> Dict[str, Any]:
+    return {"$divide": [{"$toLong": date_expression(field)}, 1000]}
+
+
+def iso_expression(field: str) -> Dict[str, Any]:
+    return {"$dateToString": {"date": date_expression(field), "format": ISO_FORMAT}}
+
+
+def day_expression(field: str) -> Dict[str, Any]:
+    return {"$dateToString": {"date": date_expression(field), "format": DAY_FORMAT}}
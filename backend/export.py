@@ -0,0 +1,165 @@
+"""Streaming export encoders.
+
+Rows arrive from a storage cursor and leave as encoded chunks, so an export
+holds at most one chunk in memory regardless of how many rows it covers.
+CSV and NDJSON are encoded row by row; Parquet and Arrow are built one typed
+record batch at a time (UTC timestamps, floats, dictionary-encoded subreddit and
+keyword) and compressed with zstd.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage.base import EXPORT_FIELDS
+
+CSV_CHUNK_ROWS = 1000
+BATCH_ROWS = 10000
+CREATED_UTC_COLUMN = EXPORT_FIELDS.index("created_utc")
+
+
+def csv_chunks(rows: Iterable[Dict[str, Any]], chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[str]:
+    """Encode rows as CSV, yielding the header and then one string per chunk_rows rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+
+    pending = 0
+    for row in rows:
+        values = [row.get(field) for field in EXPORT_FIELDS]
+        created_utc = row.get("created_utc")
+        if created_utc is not None:
+            values[CREATED_UTC_COLUMN] = datetime.fromtimestamp(created_utc, tz=timezone.utc).isoformat()
+        writer.writerow(values)
+
+        pending += 1
+        if pending == chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("title", pa.string()),
+    ("author", pa.string()),
+    ("subreddit", pa.dictionary(pa.int32(), pa.string())),
+    ("upvotes", pa.int64()),
+    ("comments", pa.int64()),
+    ("created_utc", pa.timestamp("ms", tz="UTC")),
+    ("permalink", pa.string()),
+    ("keyword_searched", pa.dictionary(pa.int32(), pa.string())),
+    ("sentiment_score", pa.float64()),
+    ("search_timestamp", pa.timestamp("us", tz="UTC")),
+])
+
+
+def parse_timestamp(value: Union[str, datetime, None]) -> Union[datetime, None]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def record_batches(rows: Iterable[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator[pa.RecordBatch]:
+    """Typed record batches of export rows, batch_rows at a time"""
+    for batch in batched(rows, batch_rows):
+        columns = {field.name: [row.get(field.name) for row in batch] for field in EXPORT_SCHEMA}
+        # Epoch-second floats become millisecond timestamps without losing the fraction
+        columns["created_utc"] = [None if value is None else round(value * 1000) for value in columns["created_utc"]]
+        columns["search_timestamp"] = [parse_timestamp(value) for value in columns["search_timestamp"]]
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(columns[field.name], type=field.type) for field in EXPORT_SCHEMA], schema=EXPORT_SCHEMA
+        )
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(rows: Iterable[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """zstd Parquet, one row group per record batch, flushed to the client as each group is written"""
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, EXPORT_SCHEMA, compression="zstd") as writer:
+        for batch in record_batches(rows, batch_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    # Closing the writer appends the footer
+    yield sink.drain()
+
+
+def arrow_chunks(rows: Iterable[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """Arrow IPC stream with zstd-compressed record batches"""
+    sink = ChunkSink()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, EXPORT_SCHEMA, options=options) as writer:
+        for batch in record_batches(rows, batch_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, Any]], chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[str]:
+    """One JSON object per line, with created_utc as an ISO-8601 UTC timestamp"""
+    for batch in batched(rows, chunk_rows):
+        lines = []
+        for row in batch:
+            record = {field: row.get(field) for field in EXPORT_SCHEMA.names}
+            if record["created_utc"] is not None:
+                record["created_utc"] = datetime.fromtimestamp(record["created_utc"], tz=timezone.utc).isoformat()
+            if isinstance(record["search_timestamp"], datetime):
+                record["search_timestamp"] = record["search_timestamp"].isoformat()
+            lines.append(json.dumps(record))
+        yield "\n".join(lines) + "\n"
+
+
+class ExportFormat(NamedTuple):
+    encode: Callable[[Iterable[Dict[str, Any]]], Iterator[Union[str, bytes]]]
+    media_type: str
+    extension: str
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat(csv_chunks, "text/csv", "csv"),
+    "ndjson": ExportFormat(ndjson_chunks, "application/x-ndjson", "ndjson"),
+    "parquet": ExportFormat(parquet_chunks, "application/vnd.apache.parquet", "parquet"),
+    "arrow": ExportFormat(arrow_chunks, "application/vnd.apache.arrow.stream", "arrows"),
+}
@@ -0,0 +1,236 @@
+"""Background export jobs written to multi-part files.
+
+Exports too large for one HTTP request run on a worker thread and write their
+rows as a series of self-contained part files (each a complete CSV, NDJSON,
+Parquet or Arrow file) under EXPORT_DIR/<job id>/. A small JSON manifest next to
+the parts records status and progress, so any worker on the host can report on
+a job and serve its finished parts. Part files support HTTP Range requests so
+interrupted downloads can resume, and whole jobs are deleted once they expire.
+A job stopped by a server shutdown is recorded as cancelled rather than left running.
+"""
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from export import EXPORT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "job.json"
+PROGRESS_EVERY_ROWS = 10000
+STALE_AFTER = timedelta(minutes=10)  # a running job whose worker stopped reporting is treated as failed
+READ_CHUNK_BYTES = 64 * 1024
+
+SHUTDOWN_ERROR = "Export was interrupted by a server shutdown"
+
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ExportCancelled(Exception):
+    """Raised inside a running job once its stop event is set"""
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int]:
+    """Inclusive (start, end) byte offsets for a single-range Range header.
+
+    Raises ValueError when the range can't be satisfied; multi-range requests
+    are rejected the same way, which clients handle by retrying without Range.
+    """
+    match = RANGE_HEADER.match(header.strip())
+    if not match or not any(match.groups()):
+        raise ValueError(f"Unsupported range: {header}")
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the final N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, end
+
+
+def iter_file_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class ExportJobs:
+    """Create, run, inspect and expire export jobs under one directory"""
+
+    def __init__(self, root: str, ttl_seconds: float, part_rows: int):
+        self.root = root
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.part_rows = part_rows
+
+    def _directory(self, job_id: str) -> str:
+        # Job ids are generated uuids; anything else can't name a job directory
+        return os.path.join(self.root, str(uuid.UUID(job_id)))
+
+    def _save(self, job: Dict[str, Any]):
+        path = os.path.join(self._directory(job["id"]), MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(job, f)
+        os.replace(path + ".tmp", path)
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self._directory(job_id), MANIFEST)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def create(self, user_id: str, format: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "format": format,
+            "params": params,
+            "status": "pending",
+            "rows_written": 0,
+            "parts": [],
+            "error": None,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+            "expires_at": (now + self.ttl).isoformat(),
+        }
+        os.makedirs(self._directory(job["id"]), exist_ok=True)
+        self._save(job)
+        return job
+
+    def get(self, user_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """A user's job, or None if it doesn't exist, has expired or belongs to someone else"""
+        try:
+            job = self._load(job_id)
+        except ValueError:
+            return None
+        if job is None or job["user_id"] != user_id:
+            return None
+        if datetime.fromisoformat(job["expires_at"]) <= datetime.now(timezone.utc):
+            return None
+        if job["status"] in ("pending", "running"):
+            if datetime.now(timezone.utc) - datetime.fromisoformat(job["updated_at"]) > STALE_AFTER:
+                job["status"] = "failed"
+                job["error"] = "Export worker stopped responding"
+        return job
+
+    def part_path(self, job: Dict[str, Any], number: int) -> Optional[str]:
+        if not any(part["number"] == number for part in job["parts"]):
+            return None
+        extension = EXPORT_FORMATS[job["format"]].extension
+        return os.path.join(self._directory(job["id"]), f"part-{number:04d}.{extension}")
+
+    def run(self, job_id: str, rows_factory: Callable[[], Iterable[Dict[str, Any]]],
+            stop: Optional[threading.Event] = None):
+        """Write the job's rows into parts of at most part_rows rows; blocking, meant for a worker thread.
+
+        A thread can't be interrupted from outside, so the job checks `stop` before each
+        row and ends as cancelled once it is set.
+        """
+        job = self._load(job_id)
+        job["status"] = "running"
+        self._touch(job)
+        export_format = EXPORT_FORMATS[job["format"]]
+
+        def counted(part_rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for row in part_rows:
+                if stop is not None and stop.is_set():
+                    raise ExportCancelled()
+                yield row
+                job["rows_written"] += 1
+                if job["rows_written"] % PROGRESS_EVERY_ROWS == 0:
+                    self._touch(job)
+
+        try:
+            rows = iter(rows_factory())
+            for number in itertools.count(1):
+                first = next(rows, None)
+                if first is None:
+                    break
+                part_rows = itertools.chain([first], itertools.islice(rows, self.part_rows - 1))
+                path = os.path.join(self._directory(job_id), f"part-{number:04d}.{export_format.extension}")
+
+                # Parts only become visible in the manifest once fully written and renamed
+                with open(path + ".tmp", "wb") as f:
+                    for chunk in export_format.encode(counted(part_rows)):
+                        f.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                os.replace(path + ".tmp", path)
+                job["parts"].append({"number": number, "size": os.path.getsize(path)})
+                self._touch(job)
+
+            job["status"] = "completed"
+        except ExportCancelled:
+            logger.info(f"Export job {job_id} cancelled")
+            job["status"] = "cancelled"
+            job["error"] = SHUTDOWN_ERROR
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        self._touch(job)
+
+    def _touch(self, job: Dict[str, Any]):
+        job["updated_at"] = datetime.now(timezone.utc).isoformat()
+        self._save(job)
+
+    def heartbeat(self, job_id: str):
+        """Mark a job that is still waiting to start as alive, so it isn't reported as stale"""
+        job = self._load(job_id)
+        if job is not None:
+            self._touch(job)
+
+    def cancel(self, job_id: str, error: str):
+        """Record a job that will never finish as cancelled; finished jobs are left as they are"""
+        job = self._load(job_id)
+        if job is not None and job["status"] in ("pending", "running"):
+            job["status"] = "cancelled"
+            job["error"] = error
+            self._touch(job)
+
+    def cleanup_expired(self) -> int:
+        """Delete every job past its expiry; returns how many were removed"""
+        if not os.path.isdir(self.root):
+            return 0
+        now = datetime.now(timezone.utc)
+        removed = 0
+        for entry in os.listdir(self.root):
+            try:
+                job = self._load(entry)
+            except ValueError:
+                continue
+            if job is not None and datetime.fromisoformat(job["expires_at"]) > now:
+                continue
+            if job is None:
+                # A directory without a manifest is only garbage once it is older than the TTL
+                directory = os.path.join(self.root, entry)
+                modified = datetime.fromtimestamp(os.path.getmtime(directory), tz=timezone.utc)
+                if now - modified < self.ttl:
+                    continue
+            shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired export jobs")
+        return removed
+
+
+def public_view(job: Dict[str, Any], part_url: Callable[[int], str]) -> Dict[str, Any]:
+    """The job as returned by the API: no owner, with a download URL per finished part"""
+    view = {key: value for key, value in job.items() if key != "user_id"}
+    view["parts"] = [{**part, "url": part_url(part["number"])} for part in job["parts"]]
+    return view
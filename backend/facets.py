@@ -0,0 +1,55 @@
+"""Faceted counts (subreddit, sentiment bucket, day) shown next to result lists.
+
+The same facet definitions serve live searches, where FacetCounter tallies
+posts as they are built, and stored-post queries, where the storage backends
+compute them in one grouped pass alongside the filter.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Sentiment scores run 0-10 (VADER compound rescaled); compound within +/-0.2 counts as neutral
+SENTIMENT_BOUNDARIES = [0, 4, 6, 10.000001]
+SENTIMENT_BUCKETS = ["negative", "neutral", "positive"]
+UNSCORED = "unscored"
+
+
+def sentiment_bucket(score: Optional[float]) -> str:
+    if score is None:
+        return UNSCORED
+    for upper, name in zip(SENTIMENT_BOUNDARIES[1:], SENTIMENT_BUCKETS):
+        if score < upper:
+            return name
+    return UNSCORED
+
+
+def post_day(created_utc: float) -> str:
+    return datetime.fromtimestamp(created_utc, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def format_facets(subreddits: Dict[str, int], sentiments: Dict[str, int], days: Dict[str, int]) -> Dict[str, List[Dict[str, Any]]]:
+    """Facet counts in response order: subreddits by count, sentiment buckets low to high, days ascending"""
+    return {
+        "subreddit": [{"value": name, "count": count}
+                      for name, count in sorted(subreddits.items(), key=lambda item: (-item[1], item[0]))],
+        "sentiment": [{"value": name, "count": sentiments[name]}
+                      for name in SENTIMENT_BUCKETS + [UNSCORED] if sentiments.get(name)],
+        "day": [{"value": day, "count": days[day]} for day in sorted(days)],
+    }
+
+
+class FacetCounter:
+    """Tally facets while posts stream through ingestion"""
+
+    def __init__(self):
+        self.subreddits = Counter()
+        self.sentiments = Counter()
+        self.days = Counter()
+
+    def add(self, subreddit: str, sentiment_score: Optional[float], created_utc: float):
+        self.subreddits[subreddit] += 1
+        self.sentiments[sentiment_bucket(sentiment_score)] += 1
+        self.days[post_day(created_utc)] += 1
+
+    def result(self) -> Dict[str, List[Dict[str, Any]]]:
+        return format_facets(self.subreddits, self.sentiments, self.days)
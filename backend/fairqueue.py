@@ -0,0 +1,203 @@
+"""Weighted fair-share admission for expensive per-user work.
+
+Searches, summaries and exports compete for the same Reddit and Gemini quotas
+and the same worker CPU. A FairQueue holds a fixed number of slots; requests
+wait for one in per-user FIFO queues, and a free slot goes to the waiting
+request with the smallest virtual finish time (start-time fair queuing). A
+request's finish time advances by cost / weight, so a user issuing many or
+heavy requests (a limit=100 search costs more than limit=25) is interleaved with
+everyone else instead of running ahead of them, and a user with weight 2 gets
+twice the share of one with weight 1. Idle users don't bank credit: their next
+request starts from the queue's current virtual time.
+
+Each user is also capped at per_user_concurrency running requests and
+max_queued waiting ones. A request beyond that, or one that waits longer than
+max_wait_seconds, is rejected with QueueFull so the API can answer 429 rather
+than queue forever. Queues are per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Weight of the latest request in the average slot hold time used for Retry-After
+HOLD_TIME_SMOOTHING = 0.2
+# Floor on a request's cost, so no request can move its user's finish time backwards
+MIN_COST = 0.01
+
+
+class QueueFull(Exception):
+    """The request can't be admitted; retry_after is a suggested delay in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Slot:
+    """A request's place in a FairQueue, and then the capacity it holds until released"""
+
+    def __init__(self, queue: "FairQueue", user_id: str, start: float, finish: float):
+        self.queue = queue
+        self.user_id = user_id
+        self.start = start
+        self.finish = finish
+        self.enqueued_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self.released = False
+        self.future = asyncio.get_running_loop().create_future()
+
+    async def wait(self, timeout: Optional[float]) -> "Slot":
+        """Wait until the slot is granted; raises QueueFull after timeout seconds"""
+        try:
+            await asyncio.wait_for(asyncio.shield(self.future), timeout)
+        except asyncio.TimeoutError:
+            if not self.future.done():
+                self.queue._abandon(self)
+                raise QueueFull(f"Timed out waiting for a {self.queue.name} slot",
+                                self.queue._retry_after(self.user_id))
+        except asyncio.CancelledError:
+            # The client went away: give up the place in line, or the slot if it was just granted
+            self.queue._abandon(self)
+            raise
+        return self
+
+    def release(self):
+        """Give the slot back; idempotent, and safe to call from a worker thread"""
+        loop = self.future.get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.queue._release(self)
+        else:
+            loop.call_soon_threadsafe(self.queue._release, self)
+
+
+class UserState:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiting: Deque[Slot] = deque()
+        self.running = 0
+        self.last_finish = 0.0
+        self.served = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class FairQueue:
+    def __init__(self, name: str, slots: int, per_user_concurrency: int, max_queued: int,
+                 max_wait_seconds: Optional[float], weights: Optional[Dict[str, float]] = None,
+                 default_weight: float = 1.0):
+        self.name = name
+        self.slots = slots
+        self.per_user_concurrency = per_user_concurrency
+        self.max_queued = max_queued
+        self.max_wait_seconds = max_wait_seconds
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self.running = 0
+        self.virtual_time = 0.0
+        self.avg_hold_seconds = 1.0
+        self.users: Dict[str, UserState] = {}
+
+    def _user(self, user_id: str) -> UserState:
+        state = self.users.get(user_id)
+        if state is None:
+            state = self.users[user_id] = UserState(self.weights.get(user_id, self.default_weight))
+        return state
+
+    def enqueue(self, user_id: str, cost: float = 1.0) -> Slot:
+        """Join the user's queue without waiting; raises QueueFull if it is already full"""
+        state = self._user(user_id)
+        if len(state.waiting) >= self.max_queued:
+            state.rejected += 1
+            raise QueueFull(f"Too many queued {self.name} requests", self._retry_after(user_id))
+
+        start = max(self.virtual_time, state.last_finish)
+        slot = Slot(self, user_id, start, start + max(cost, MIN_COST) / state.weight)
+        state.last_finish = slot.finish
+        state.waiting.append(slot)
+        self._dispatch()
+        return slot
+
+    async def acquire(self, user_id: str, cost: float = 1.0) -> Slot:
+        """Wait for a slot, at most max_wait_seconds; release it when the work is done"""
+        return await self.enqueue(user_id, cost).wait(self.max_wait_seconds)
+
+    def _dispatch(self):
+        while self.running < self.slots:
+            best = None
+            for state in self.users.values():
+                if state.waiting and state.running < self.per_user_concurrency:
+                    if best is None or state.waiting[0].finish < best.waiting[0].finish:
+                        best = state
+            if best is None:
+                return
+
+            slot = best.waiting.popleft()
+            best.running += 1
+            self.running += 1
+            self.virtual_time = max(self.virtual_time, slot.start)
+            slot.granted_at = time.monotonic()
+            waited = slot.granted_at - slot.enqueued_at
+            best.served += 1
+            best.total_wait += waited
+            best.max_wait = max(best.max_wait, waited)
+            slot.future.set_result(None)
+
+    def _release(self, slot: Slot):
+        if slot.released:
+            return
+        slot.released = True
+        state = self.users[slot.user_id]
+        if slot.granted_at is None:
+            # Released before it was ever granted: just leave the queue
+            state.waiting.remove(slot)
+            slot.future.cancel()
+            return
+        state.running -= 1
+        self.running -= 1
+        held = time.monotonic() - slot.granted_at
+        self.avg_hold_seconds += HOLD_TIME_SMOOTHING * (held - self.avg_hold_seconds)
+        self._dispatch()
+
+    def _abandon(self, slot: Slot):
+        if slot.granted_at is None and not slot.released:
+            self.users[slot.user_id].rejected += 1
+        self._release(slot)
+
+    def _retry_after(self, user_id: str) -> int:
+        ahead = len(self._user(user_id).waiting) + 1
+        return max(1, math.ceil(self.avg_hold_seconds * ahead / self.per_user_concurrency))
+
+    def stats(self, user_id: str) -> Dict[str, Any]:
+        """Queue depth, running requests and observed wait times for one user"""
+        state = self.users.get(user_id) or UserState(self.weights.get(user_id, self.default_weight))
+        now = time.monotonic()
+        return {
+            "weight": state.weight,
+            "queued": len(state.waiting),
+            "running": state.running,
+            "max_concurrency": self.per_user_concurrency,
+            "max_queued": self.max_queued,
+            "oldest_wait_seconds": round(now - state.waiting[0].enqueued_at, 3) if state.waiting else 0.0,
+            "served": state.served,
+            "rejected": state.rejected,
+            "avg_wait_seconds": round(state.total_wait / state.served, 3) if state.served else 0.0,
+            "max_wait_seconds": round(state.max_wait, 3),
+        }
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Weights from "user-id=2,other-id=0.5" (the FAIR_QUEUE_WEIGHTS format)"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        user_id, _, weight = item.partition("=")
+        weights[user_id.strip()] = float(weight)
+        if not weights[user_id.strip()] > 0:
+            raise ValueError(f"Fair queue weight for {user_id.strip()} must be positive")
+    return weights
@@ -0,0 +1,179 @@
+"""Embedded full-text index over every post users have stored.
+
+An SQLite FTS5 table indexes post title and body next to a table of the fields
+SearchFilters constrain, plus the (user, post) memberships that scope results to
+what each user has collected. Posts are indexed as search_posts stores them, so
+the index also covers posts the retention job has since moved to the Parquet
+archive. Matches are ranked with FTS5's built-in BM25, with title hits weighted
+above body hits.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from storage.sqlite import build_filter_clause
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    author TEXT,
+    subreddit TEXT NOT NULL,
+    upvotes INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    comments INTEGER NOT NULL,
+    created_utc REAL NOT NULL,
+    permalink TEXT NOT NULL,
+    body TEXT,
+    sentiment_score REAL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS post_text USING fts5(
+    title, body, content='posts', content_rowid='rowid', tokenize='porter unicode61'
+);
+
+CREATE TABLE IF NOT EXISTS memberships (
+    user_id TEXT NOT NULL,
+    post_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS memberships_post ON memberships (post_id);
+"""
+
+POST_COLUMNS = ["id", "title", "author", "subreddit", "upvotes", "url", "comments",
+                "created_utc", "permalink", "body", "sentiment_score"]
+
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """Turn user input into an FTS5 MATCH expression.
+
+    "Quoted text" becomes a phrase query and every other word a term; all of them
+    must match. Each piece is quoted, so FTS5 operators and punctuation in the
+    input (AND, NEAR, C++, -) are matched literally rather than parsed.
+    """
+    pieces = []
+    for phrase, word in QUERY_TOKEN.findall(text):
+        piece = (phrase or word).strip()
+        if piece:
+            pieces.append('"' + piece.replace('"', '""') + '"')
+    return " ".join(pieces) or None
+
+
+class FullTextIndex:
+    """On-disk FTS5 index; one connection per process, serialized by a lock"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA busy_timeout = 5000")
+        self._lock = threading.RLock()
+
+    def ensure_schema(self):
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def add_posts(self, user_id: str, posts: List[Dict[str, Any]]) -> int:
+        """Index posts for a user; text is only re-tokenized when title or body changed. Returns posts (re)indexed."""
+        if not posts:
+            return 0
+        reindexed = 0
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for post in posts:
+                    existing = self.conn.execute(
+                        "SELECT rowid, title, body FROM posts WHERE id = ?", (post["id"],)
+                    ).fetchone()
+                    values = [post.get(column) for column in POST_COLUMNS]
+
+                    if existing is None:
+                        rowid = self.conn.execute(
+                            f"INSERT INTO posts ({', '.join(POST_COLUMNS)}) VALUES ({', '.join('?' for _ in POST_COLUMNS)})",
+                            values
+                        ).lastrowid
+                        self.conn.execute("INSERT INTO post_text (rowid, title, body) VALUES (?, ?, ?)",
+                                          (rowid, post["title"], post.get("body")))
+                        reindexed += 1
+                    else:
+                        rowid = existing["rowid"]
+                        text_changed = (existing["title"], existing["body"]) != (post["title"], post.get("body"))
+                        if text_changed:
+                            # External-content FTS5 tables are updated by deleting the old tokens explicitly
+                            self.conn.execute(
+                                "INSERT INTO post_text (post_text, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+                                (rowid, existing["title"], existing["body"])
+                            )
+                        self.conn.execute(
+                            f"UPDATE posts SET {', '.join(f'{column} = ?' for column in POST_COLUMNS[1:])} WHERE rowid = ?",
+                            values[1:] + [rowid]
+                        )
+                        if text_changed:
+                            self.conn.execute("INSERT INTO post_text (rowid, title, body) VALUES (?, ?, ?)",
+                                              (rowid, post["title"], post.get("body")))
+                            reindexed += 1
+
+                    self.conn.execute("INSERT OR IGNORE INTO memberships (user_id, post_id) VALUES (?, ?)",
+                                      (user_id, rowid))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return reindexed
+
+    def update_metrics(self, posts: List[Dict[str, Any]]):
+        """Apply refreshed upvote and comment counts; the text is unchanged so nothing is re-tokenized"""
+        if not posts:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE posts SET upvotes = ?, comments = ? WHERE id = ?",
+                [(post["upvotes"], post["comments"], post["id"]) for post in posts]
+            )
+
+    def search(self, user_id: str, text: str, filters: Optional[Dict[str, Any]] = None,
+               limit: int = 25, offset: int = 0) -> List[Dict[str, Any]]:
+        """The user's stored posts matching the query, best BM25 score first"""
+        match = build_match_query(text)
+        if match is None:
+            return []
+
+        clause, params = build_filter_clause(filters or {}, "p", "p.sentiment_score")
+        sql = (
+            f"SELECT {', '.join(f'p.{column}' for column in POST_COLUMNS)}, "
+            f"bm25(post_text, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score "
+            "FROM post_text "
+            "JOIN posts p ON p.rowid = post_text.rowid "
+            "JOIN memberships m ON m.post_id = p.rowid AND m.user_id = ? "
+            f"WHERE post_text MATCH ?{clause} "
+            "ORDER BY score LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self.conn.execute(sql, (user_id, match, *params, limit, offset)).fetchall()
+
+        results = []
+        for row in rows:
+            result = dict(row)
+            # FTS5 reports BM25 as a negative number where lower is better; flip it for callers
+            result["score"] = round(-result["score"], 4)
+            results.append(result)
+        return results
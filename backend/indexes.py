@@ -0,0 +1,112 @@
+"""Declarative index registry.
+
+Every index the API relies on is declared here, grouped by collection. New query
+shapes should add their supporting index to INDEXES and a matching entry to
+tests/test_query_shapes.py so the explain() checks cover it.
+"""
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    keys: List[tuple]
+    unique: bool = False
+    name: Optional[str] = None
+
+    def index_name(self) -> str:
+        return self.name or "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "users": [
+        IndexSpec([("email", 1)], unique=True),
+        IndexSpec([("id", 1)], unique=True),
+    ],
+    "keywords": [
+        IndexSpec([("user_id", 1), ("keyword", 1), ("subreddit", 1)]),
+        IndexSpec([("id", 1)]),
+        # Tracked (user, keyword) pairs for the trending job
+        IndexSpec([("active", 1), ("user_id", 1), ("keyword", 1)]),
+    ],
+    "posts": [
+        IndexSpec([("id", 1)], unique=True),
+        IndexSpec([("metrics_refreshed_at", 1), ("created_utc", 1)]),
+    ],
+    "user_posts": [
+        IndexSpec([("user_id", 1), ("post_id", 1), ("keyword", 1)], unique=True),
+        IndexSpec([("user_id", 1), ("search_ts", -1), ("sentiment_score", 1)]),
+        # (post_id, keyword) closes the keyset sort of stored-post queries, so pages never need
+        # an in-memory sort; with a keyword filter the sort stops at post_id
+        IndexSpec([("user_id", 1), ("search_ts", -1), ("post_id", -1), ("keyword", -1)]),
+        IndexSpec([("user_id", 1), ("keyword", 1), ("search_ts", -1), ("post_id", -1)]),
+        IndexSpec([("user_id", 1), ("sentiment_score", -1), ("post_id", -1), ("keyword", -1)]),
+        IndexSpec([("post_id", 1), ("keyword", 1)]),
+        IndexSpec([("search_ts", 1)]),
+    ],
+    # Posts whose every membership for the user is archived; counted by the dashboard total
+    "archived_posts": [
+        IndexSpec([("user_id", 1), ("post_id", 1)], unique=True),
+    ],
+    "searches": [
+        IndexSpec([("user_id", 1), ("timestamp", -1), ("id", -1)]),
+        IndexSpec([("user_id", 1), ("keyword", 1), ("timestamp", -1), ("id", -1)]),
+        IndexSpec([("timestamp", 1)]),
+    ],
+    # Time-series collection; created by trending.ensure_metrics_collection before indexes are applied
+    "post_metrics": [
+        IndexSpec([("post_id", 1), ("ts", -1)]),
+        IndexSpec([("ts", 1)]),
+    ],
+}
+
+# Indexes superseded by an entry above; apply_indexes drops them once the registry is built
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "user_posts": ["user_id_1_search_ts_-1_post_id_-1", "user_id_1_sentiment_score_-1_post_id_-1",
+                   "keyword_1_search_ts_-1"],
+    "keywords": ["active_1_keyword_1"],
+}
+
+
+def apply_indexes(db) -> int:
+    """Create every registered index. Safe to call repeatedly; returns the number applied."""
+    applied = 0
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        for spec in specs:
+            try:
+                collection.create_index(spec.keys, unique=spec.unique, name=spec.index_name())
+                applied += 1
+            except OperationFailure as e:
+                # An existing index with the same keys but different options; leave it alone
+                logger.warning(f"Could not create index {spec.index_name()} on {collection_name}: {e}")
+            except Exception as e:
+                logger.error(f"Error creating index {spec.index_name()} on {collection_name}: {e}")
+    # Replacements exist by now, so queries never run without a supporting index
+    for collection_name, names in RETIRED_INDEXES.items():
+        existing = set(db[collection_name].index_information())
+        for name in names:
+            if name in existing:
+                db[collection_name].drop_index(name)
+                logger.info(f"Dropped retired index {name} on {collection_name}")
+    logger.info(f"Applied {applied} indexes")
+    return applied
+
+
+def apply_indexes_in_background(db, before: Optional[Callable] = None) -> threading.Thread:
+    """Apply the registry on a daemon thread so startup doesn't wait on index builds.
+
+    `before` runs on the same thread first, for collections that need explicit creation options.
+    """
+    def run():
+        if before is not None:
+            before()
+        apply_indexes(db)
+
+    thread = threading.Thread(target=run, name="apply-indexes", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,52 @@
+"""Periodic background jobs shared by every worker process.
+
+Each run takes a short lease in the job_state collection first, so when several
+workers are running only one of them executes a given job per interval. Jobs
+that manage per-host state (local files) pass no collection and run in every
+worker instead.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+def worker_id() -> str:
+    # Resolved per call: workers forked from a preloaded parent share its import-time state
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(job_state_collection, name: str, ttl_seconds: float) -> bool:
+    """Claim the named job for ttl_seconds unless another worker holds an unexpired lease"""
+    now = datetime.now(timezone.utc)
+    try:
+        job_state_collection.update_one(
+            {"_id": name, "$or": [{"lease_until": {"$lt": now}}, {"lease_until": {"$exists": False}}]},
+            {"$set": {"lease_until": now + timedelta(seconds=ttl_seconds), "lease_owner": worker_id()}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The document exists and its lease hasn't expired
+        return False
+
+
+async def run_periodically(job_state_collection: Optional[object], name: str, interval_seconds: float,
+                           job: Callable[[], object]):
+    """Run a blocking job every interval on a worker thread, for as long as the task lives"""
+    while True:
+        try:
+            if job_state_collection is None or acquire_lease(job_state_collection, name, interval_seconds * 0.9):
+                started = datetime.now(timezone.utc)
+                await asyncio.to_thread(job)
+                logger.info(f"Job {name} finished in {(datetime.now(timezone.utc) - started).total_seconds():.1f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {name} failed: {e}")
+        await asyncio.sleep(interval_seconds)
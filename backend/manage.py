@@ -0,0 +1,238 @@
+"""Maintenance commands for the Reddit Social Listening Tool database.
+
+Usage:
+    cd backend && python manage.py --help
+"""
+import os
+import logging
+import time
+
+import typer
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateMany, UpdateOne
+
+from archive import ArchiveReader, apply_retention, mark_archived_posts
+from dates import date_expression, epoch_seconds_expression, to_datetime
+from fulltext import FullTextIndex
+from indexes import apply_indexes
+from storage.mongo import DENORMALIZED_POST_FIELDS, denormalized_post_fields
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+cli = typer.Typer(help="Database maintenance commands")
+
+
+@cli.callback()
+def main():
+    """Database maintenance commands"""
+
+
+def get_db():
+    mongo_url = os.getenv("MONGO_URL")
+    if not mongo_url:
+        raise typer.BadParameter("MONGO_URL is not set")
+    return MongoClient(mongo_url, tz_aware=True)[os.getenv("DB_NAME", "reddit_social_listener")]
+
+
+@cli.command("apply-indexes")
+def apply_indexes_command():
+    """Create every index in the registry"""
+    apply_indexes(get_db())
+
+
+@cli.command("migrate-user-posts")
+def migrate_user_posts(batch_size: int = typer.Option(1000, help="Posts migrated per bulk write")):
+    """Move per-user fields from posts into the user_posts membership collection"""
+    db = get_db()
+    posts = db["posts"]
+    user_posts = db["user_posts"]
+    apply_indexes(db)
+
+    migrated = 0
+    while True:
+        batch = list(posts.find(
+            {"user_id": {"$exists": True}},
+            {"_id": 1, "id": 1, "user_id": 1, "keyword_searched": 1, "search_timestamp": 1, "sentiment_score": 1}
+        ).limit(batch_size))
+        if not batch:
+            break
+
+        memberships = [
+            UpdateOne(
+                {"user_id": post["user_id"], "post_id": post["id"], "keyword": post.get("keyword_searched")},
+                {"$setOnInsert": {
+                    "search_ts": to_datetime(post.get("search_timestamp")),
+                    "sentiment_score": post.get("sentiment_score")
+                }},
+                upsert=True
+            )
+            for post in batch
+        ]
+        user_posts.bulk_write(memberships, ordered=False)
+        posts.bulk_write([
+            UpdateOne({"_id": post["_id"]}, {"$unset": {"user_id": "", "keyword_searched": "", "search_timestamp": ""}})
+            for post in batch
+        ], ordered=False)
+
+        migrated += len(batch)
+        logger.info(f"Migrated {migrated} posts")
+
+    logger.info(f"Migration complete: {migrated} posts moved to user_posts")
+
+
+@cli.command("archive")
+def archive(
+    retention_days: int = typer.Option(..., help="Archive documents older than this many days"),
+    archive_dir: str = typer.Option(os.getenv("ARCHIVE_DIR", "archive"), help="Parquet archive root")
+):
+    """Move old memberships, orphaned posts and searches into the Parquet archive"""
+    db = get_db()
+    apply_indexes(db)
+    apply_retention(db, retention_days, archive_dir)
+
+
+@cli.command("backfill-archived-posts")
+def backfill_archived_posts(
+    archive_dir: str = typer.Option(os.getenv("ARCHIVE_DIR", "archive"), help="Parquet archive root"),
+    batch_size: int = typer.Option(5000, help="Archived memberships checked per batch")
+):
+    """Mark archived posts with no live membership, for archives written before the markers existed.
+
+    The dashboard's distinct-post total counts these markers instead of reading the
+    archive. Safe to re-run: markers are upserted.
+    """
+    db = get_db()
+    apply_indexes(db)
+    checked = 0
+    for rows in ArchiveReader(archive_dir).iter_memberships(batch_size):
+        mark_archived_posts(db, rows)
+        checked += len(rows)
+        logger.info(f"Checked {checked} archived memberships")
+    logger.info(f"Backfill complete: {db['archived_posts'].count_documents({})} archived posts marked")
+
+
+@cli.command("migrate-datetimes")
+def migrate_datetimes(
+    batch_size: int = typer.Option(1000, help="Documents converted per update"),
+    pause_ms: int = typer.Option(0, help="Pause between batches, to throttle the migration on a live cluster")
+):
+    """Convert user_posts.search_ts (ISO strings) and posts.created_utc (epoch floats) to BSON dates.
+
+    Runs in small batches that each convert server-side with one pipeline update, so it
+    can run alongside the API; reads accept both representations until it finishes.
+    Safe to re-run: converted documents no longer match.
+    """
+    db = get_db()
+    conversions = [
+        ("user_posts", "search_ts", "string"),
+        ("posts", "created_utc", "number"),
+    ]
+    for collection_name, field, legacy_type in conversions:
+        collection = db[collection_name]
+        converted = 0
+        last_id = None
+        while True:
+            query = {field: {"$type": legacy_type}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            ids = [doc["_id"] for doc in collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size)]
+            if not ids:
+                break
+            collection.update_many(
+                {"_id": {"$in": ids}, field: {"$type": legacy_type}},
+                [{"$set": {field: date_expression(f"${field}")}}]
+            )
+            converted += len(ids)
+            last_id = ids[-1]
+            logger.info(f"Converted {converted} {collection_name}.{field} values")
+            if pause_ms:
+                time.sleep(pause_ms / 1000)
+        logger.info(f"{collection_name}.{field}: {converted} documents converted to dates")
+
+
+@cli.command("backfill-post-fields")
+def backfill_post_fields(
+    batch_size: int = typer.Option(1000, help="Memberships updated per bulk write"),
+    pause_ms: int = typer.Option(0, help="Pause between batches, to throttle the backfill on a live cluster")
+):
+    """Copy subreddit, upvotes, comments and created_utc from posts onto user_posts.
+
+    Stored-post queries filter on these copies before joining posts; memberships
+    without them still match through the join, only more slowly. Safe to re-run:
+    backfilled memberships no longer match.
+    """
+    db = get_db()
+    posts = db["posts"]
+    user_posts = db["user_posts"]
+    backfilled = 0
+    last_id = None
+    while True:
+        # Walk _id order so each batch resumes where the last stopped instead of rescanning
+        query = {"subreddit": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(user_posts.find(query, {"_id": 1, "post_id": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        post_ids = list({doc["post_id"] for doc in batch})
+        found = {post["id"]: post for post in posts.find(
+            {"id": {"$in": post_ids}}, {"_id": 0, "id": 1, **{field: 1 for field in DENORMALIZED_POST_FIELDS}}
+        )}
+        # Memberships of posts that no longer exist get empty copies
+        result = user_posts.bulk_write([
+            UpdateMany({"post_id": post_id, "subreddit": {"$exists": False}},
+                       {"$set": denormalized_post_fields(found.get(post_id, {}))})
+            for post_id in post_ids
+        ], ordered=False)
+        backfilled += result.modified_count
+        logger.info(f"Backfilled post fields on {backfilled} memberships")
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+    logger.info(f"Backfill complete: {backfilled} memberships updated")
+
+
+@cli.command("index-fulltext")
+def index_fulltext(
+    index_path: str = typer.Option(os.getenv("FULLTEXT_INDEX_PATH", "fulltext.db"), help="Full-text index file"),
+    batch_size: int = typer.Option(1000, help="Posts indexed per transaction")
+):
+    """Index every stored post for archive search; safe to re-run, unchanged text is skipped"""
+    db = get_db()
+    index = FullTextIndex(index_path)
+    index.ensure_schema()
+
+    rows = db["user_posts"].aggregate([
+        {"$sort": {"user_id": 1}},
+        {"$lookup": {"from": "posts", "localField": "post_id", "foreignField": "id", "as": "post"}},
+        {"$unwind": "$post"},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+            "$post", {"user_id": "$user_id", "sentiment_score": "$sentiment_score",
+                      "created_utc": epoch_seconds_expression("$post.created_utc")}
+        ]}}},
+        {"$project": {"_id": 0}}
+    ], allowDiskUse=True)
+
+    indexed = 0
+    batch = []
+    current_user = None
+    for row in rows:
+        if batch and (row["user_id"] != current_user or len(batch) >= batch_size):
+            index.add_posts(current_user, batch)
+            indexed += len(batch)
+            batch = []
+        current_user = row["user_id"]
+        batch.append(row)
+    if batch:
+        index.add_posts(current_user, batch)
+        indexed += len(batch)
+
+    index.close()
+    logger.info(f"Indexed {indexed} stored posts into {index_path}")
+
+
+if __name__ == "__main__":
+    cli()
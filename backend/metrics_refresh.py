@@ -0,0 +1,95 @@
+"""Keep upvotes and comments current for recent posts without re-running searches.
+
+Stale posts are hydrated through Reddit's info endpoint, 100 fullnames per call,
+and only documents whose counts actually changed are rewritten.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from pymongo import UpdateMany, UpdateOne
+
+from dates import date_match, to_datetime
+from trending import build_snapshots, record_snapshots
+
+logger = logging.getLogger(__name__)
+
+INFO_BATCH_SIZE = 100  # Reddit's limit on fullnames per /api/info call
+
+
+def find_stale_posts(posts_collection, max_age_hours: float, refresh_interval: float, limit: int) -> List[Dict]:
+    """Recent posts whose metrics haven't been refreshed within the interval, least recently refreshed first"""
+    now = time.time()
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=refresh_interval)
+    return list(posts_collection.find(
+        {"$and": [
+            date_match("created_utc", {"$gte": to_datetime(now - max_age_hours * 3600)}),
+            {"$or": [{"metrics_refreshed_at": {"$lt": stale_before}}, {"metrics_refreshed_at": None}]}
+        ]},
+        {"_id": 0, "id": 1, "upvotes": 1, "comments": 1}
+    ).sort("metrics_refreshed_at", 1).limit(limit))
+
+
+def refresh_recent_metrics(db, reddit, max_age_hours: float = 48, refresh_interval: float = 900,
+                           max_posts: int = 10000,
+                           on_changed: Optional[Callable[[List[Dict]], None]] = None) -> Dict[str, int]:
+    """One refresh cycle; returns counts of fetched, changed and unchanged posts.
+
+    `max_posts` caps the Reddit calls per cycle at max_posts / 100, which keeps the
+    job inside the API quota. PRAW sleeps on its own when the rate limit is reached.
+    `on_changed` receives the posts whose counts changed, for secondary indexes.
+    """
+    posts_collection = db["posts"]
+    stale = find_stale_posts(posts_collection, max_age_hours, refresh_interval, max_posts)
+    stored = {post["id"]: post for post in stale}
+
+    fetched = []
+    requested_ids = []
+    ids = list(stored)
+    for start in range(0, len(ids), INFO_BATCH_SIZE):
+        batch_ids = ids[start:start + INFO_BATCH_SIZE]
+        try:
+            for submission in reddit.info(fullnames=[f"t3_{post_id}" for post_id in batch_ids]):
+                fetched.append({"id": submission.id, "upvotes": submission.score, "comments": submission.num_comments})
+            requested_ids.extend(batch_ids)
+        except Exception as e:
+            logger.warning(f"Error fetching metrics for {len(batch_ids)} posts: {e}")
+
+    refreshed_at = datetime.now(timezone.utc)
+    operations = []
+    unchanged_ids = []
+    changed = []
+    for post in fetched:
+        previous = stored.get(post["id"], {})
+        if previous.get("upvotes") == post["upvotes"] and previous.get("comments") == post["comments"]:
+            unchanged_ids.append(post["id"])
+            continue
+        changed.append(post)
+        operations.append(UpdateOne(
+            {"id": post["id"]},
+            {"$set": {"upvotes": post["upvotes"], "comments": post["comments"], "metrics_refreshed_at": refreshed_at}}
+        ))
+
+    # Unchanged posts, and posts Reddit no longer returns, only need their refresh time
+    # moved forward so the next cycle doesn't pick them again; one statement covers them all
+    fetched_ids = {post["id"] for post in fetched}
+    untouched_ids = unchanged_ids + [post_id for post_id in requested_ids if post_id not in fetched_ids]
+    if untouched_ids:
+        operations.append(UpdateMany({"id": {"$in": untouched_ids}}, {"$set": {"metrics_refreshed_at": refreshed_at}}))
+    if operations:
+        posts_collection.bulk_write(operations, ordered=False)
+    if changed:
+        # Memberships carry copies of the counts for filtered stored-post queries
+        db["user_posts"].bulk_write([
+            UpdateMany({"post_id": post["id"]}, {"$set": {"upvotes": post["upvotes"], "comments": post["comments"]}})
+            for post in changed
+        ], ordered=False)
+
+    record_snapshots(db, build_snapshots(fetched, refreshed_at))
+    if on_changed is not None and changed:
+        on_changed(changed)
+
+    counts = {"fetched": len(fetched), "changed": len(fetched) - len(unchanged_ids), "unchanged": len(unchanged_ids)}
+    logger.info(f"Refreshed metrics for {counts['fetched']} posts ({counts['changed']} changed)")
+    return counts
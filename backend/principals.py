@@ -0,0 +1,83 @@
+"""Cached authentication for JWT-guarded endpoints.
+
+The frontend calls protected endpoints constantly, and each call decoded and
+verified its bearer token again. PrincipalCache remembers:
+
+- tokens that verified, mapped to their user id, until the cache TTL or the
+  token's own expiry, whichever comes first;
+- tokens that failed, so a bad or expired token is rejected with one dictionary
+  lookup instead of another signature check;
+- user profiles, so each request can confirm its account still exists and is
+  active without a database read, and /api/me can answer from memory.
+
+invalidate_user takes effect immediately in this process. Account changes made
+elsewhere (another worker, a maintenance script) are picked up once the cached
+profile expires, after at most profile_ttl seconds.
+"""
+import time
+from typing import Any, Callable, Dict, Optional
+
+import jwt
+
+from cache import TTLCache
+
+
+class AuthenticationError(Exception):
+    """The token is invalid or expired, or its account is missing or disabled"""
+
+
+class PrincipalCache:
+    def __init__(self, secret: str, algorithm: str,
+                 load_profile: Optional[Callable[[str], Optional[Dict[str, Any]]]],
+                 token_ttl: float = 300, profile_ttl: float = 60, rejected_ttl: float = 300,
+                 max_entries: int = 10000, clock: Callable[[], float] = time.time):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.load_profile = load_profile
+        self.clock = clock
+        self.tokens = TTLCache(max_entries, token_ttl, clock)
+        # Kept apart from valid tokens so a flood of garbage can't evict them
+        self.rejected = TTLCache(max_entries, rejected_ttl, clock)
+        self.profiles = TTLCache(max_entries, profile_ttl, clock)
+
+    def authenticate(self, token: str) -> str:
+        """The user id a token belongs to; raises AuthenticationError"""
+        user_id = self.tokens.get(token)
+        if user_id is None:
+            user_id = self._decode(token)
+
+        # Without a user store there are no accounts to check, only signatures
+        if self.load_profile is not None:
+            profile = self.profile(user_id)
+            if profile is None or not profile.get("is_active", True):
+                raise AuthenticationError("Account is missing or disabled")
+        return user_id
+
+    def _decode(self, token: str) -> str:
+        if self.rejected.get(token) is not None:
+            raise AuthenticationError("Invalid token")
+        try:
+            payload = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except jwt.PyJWTError:
+            payload = {}
+        user_id = payload.get("sub")
+        if user_id is None:
+            self.rejected.set(token, True)
+            raise AuthenticationError("Invalid token")
+
+        expires_in = payload["exp"] - self.clock() if "exp" in payload else None
+        self.tokens.set(token, user_id, expires_in)
+        return user_id
+
+    def profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The user's profile (no password hash), from cache or the user store"""
+        profile = self.profiles.get(user_id)
+        if profile is None and self.load_profile is not None:
+            profile = self.load_profile(user_id)
+            if profile is not None:
+                self.profiles.set(user_id, profile)
+        return dict(profile) if profile is not None else None
+
+    def invalidate_user(self, user_id: str):
+        """Forget a user's cached profile, so the next request re-reads the account"""
+        self.profiles.pop(user_id)
@@ -0,0 +1,32 @@
+"""JSON responses that serialize validated models once.
+
+When a handler returns models under a response_model, FastAPI validates every
+one of them again and then encodes the result a second time. For post lists
+that is a large share of each request's CPU. Handlers that already hold
+validated models return a ModelJSONResponse instead: pydantic-core writes the
+JSON bytes directly from the models through a TypeAdapter, with no validation
+and no jsonable_encoder pass. The decorator's response_model still documents the
+response shape in OpenAPI.
+
+Everything else goes through ORJSONResponse, the app's default response class.
+"""
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+# Serializes any mix of models, dicts and lists by inspecting values at runtime
+ANY_ADAPTER = TypeAdapter(Any)
+
+
+class ModelJSONResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: Any, adapter: TypeAdapter = ANY_ADAPTER, **kwargs):
+        # render() runs inside Response.__init__, so the adapter must be set first
+        self.adapter = adapter
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return self.adapter.dump_json(content)
+
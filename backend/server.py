@@ -1,25 +1,44 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, EmailStr, TypeAdapter
+from typing import List, Literal, Optional, Dict, Any, Union
 import os
+import asyncio
+from contextlib import asynccontextmanager
 import praw
-import pymongo
-from pymongo import MongoClient
 from datetime import datetime, timezone, timedelta
 import uuid
 from dotenv import load_dotenv
 import logging
 import jwt
-import bcrypt
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from emergentintegrations.llm.chat import LlmChat, UserMessage
-import csv
-import io
+import itertools
+import threading
 import pandas as pd
 import json
+import base64
+from storage import DuplicateEmailError, create_storage
+from storage.base import parse_filter_dates
+from cache import ResponseCache, etag_matches, make_etag
+from jobs import run_periodically
+from metrics_refresh import refresh_recent_metrics
+from archive import EXPORT_COLUMNS as ARCHIVE_EXPORT_COLUMNS, ArchiveReader, apply_retention
+from trending import update_trending
+from columnar import filter_rows
+from fulltext import FullTextIndex
+from facets import FacetCounter
+from export import EXPORT_FORMATS
+from export_jobs import SHUTDOWN_ERROR, ExportJobs, iter_file_range, parse_range, public_view
+from passwords import DEFAULT_ROUNDS, PasswordHasher
+from principals import AuthenticationError, PrincipalCache
+from fairqueue import FairQueue, QueueFull, parse_weights
+from starlette.background import BackgroundTask
+from responses import ModelJSONResponse
+from compression import CompressionMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -34,56 +53,74 @@ JWT_SECRET = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24 * 7  # 1 week
 
-# Initialize VADER sentiment analyzer
-sentiment_analyzer = SentimentIntensityAnalyzer()
+# Assembled dashboard payloads, served while the user's data versions are unchanged
+dashboard_cache = ResponseCache(int(os.getenv("DASHBOARD_CACHE_SIZE", "1024")))
 
-# Initialize MongoDB
-mongo_url = os.getenv("MONGO_URL")
-db_name = os.getenv("DB_NAME", "reddit_social_listener")
+# Cold archive of documents moved out of Mongo by the retention job
+archive_dir = os.getenv("ARCHIVE_DIR", "archive")
+retention_days = int(os.getenv("RETENTION_DAYS", "0"))  # 0 keeps everything in Mongo
+archive_reader = ArchiveReader(archive_dir)
 
-try:
-    mongo_client = MongoClient(mongo_url)
-    db = mongo_client[db_name]
-    
-    # Collections
-    users_collection = db["users"]
-    keywords_collection = db["keywords"]
-    posts_collection = db["posts"]
-    searches_collection = db["searches"]
-    trackers_collection = db["trackers"]
-    
-    # Create indexes for better performance
-    users_collection.create_index("email", unique=True)
-    keywords_collection.create_index([("user_id", 1), ("keyword", 1), ("subreddit", 1)])
-    posts_collection.create_index("id", unique=True)
-    searches_collection.create_index([("user_id", 1), ("timestamp", -1)])
-    
-    logger.info(f"Connected to MongoDB at {mongo_url}")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
-    db = None
-
-# Initialize Reddit API
-reddit_client_id = os.getenv("REDDIT_CLIENT_ID")
-reddit_client_secret = os.getenv("REDDIT_CLIENT_SECRET")
-reddit_user_agent = os.getenv("REDDIT_USER_AGENT")
-
-try:
-    reddit = praw.Reddit(
-        client_id=reddit_client_id,
-        client_secret=reddit_client_secret,
-        user_agent=reddit_user_agent
+# Background export jobs, written as multi-part files and removed after their TTL
+export_jobs = ExportJobs(
+    os.getenv("EXPORT_DIR", "exports"),
+    ttl_seconds=float(os.getenv("EXPORT_TTL_HOURS", "24")) * 3600,
+    part_rows=int(os.getenv("EXPORT_PART_ROWS", "250000"))
+)
+# Running and waiting export jobs of this worker, stopped and marked cancelled on shutdown
+export_job_tasks = set()
+export_jobs_stopping = threading.Event()
+
+# Per-user fair queues in front of the expensive endpoints; FAIR_QUEUE_WEIGHTS is "user-id=2,other-id=0.5"
+fair_queue_weights = parse_weights(os.getenv("FAIR_QUEUE_WEIGHTS", ""))
+
+def fair_queue_from_env(name: str, slots: int, per_user: int, max_queued: int, max_wait: float) -> FairQueue:
+    prefix = f"{name.upper()}_QUEUE"
+    return FairQueue(
+        name,
+        slots=int(os.getenv(f"{prefix}_SLOTS", str(slots))),
+        per_user_concurrency=int(os.getenv(f"{prefix}_PER_USER", str(per_user))),
+        max_queued=int(os.getenv(f"{prefix}_MAX_QUEUED", str(max_queued))),
+        max_wait_seconds=float(os.getenv(f"{prefix}_MAX_WAIT_SECONDS", str(max_wait))),
+        weights=fair_queue_weights
     )
-    logger.info("Reddit API client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Reddit API: {e}")
-    reddit = None
 
-# Initialize Gemini API for summarization
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-summary_chat = None
+fair_queues = {
+    "search": fair_queue_from_env("search", slots=8, per_user=2, max_queued=10, max_wait=30),
+    "summarize": fair_queue_from_env("summarize", slots=4, per_user=2, max_queued=10, max_wait=30),
+    "export": fair_queue_from_env("export", slots=4, per_user=1, max_queued=3, max_wait=60),
+}
 
-if gemini_api_key:
+# Clients that hold sockets, threads or file handles are created per worker process in lifespan()
+# and kept on app.state, so the app can be imported once and forked into several workers.
+def open_storage():
+    """MongoDB, or embedded SQLite when MONGO_URL isn't configured; None if neither is available"""
+    try:
+        storage = create_storage()
+        logger.info(f"Using {storage.name} storage")
+        return storage
+    except Exception as e:
+        logger.error(f"Failed to initialize storage: {e}")
+        return None
+
+def create_reddit_client():
+    try:
+        reddit = praw.Reddit(
+            client_id=os.getenv("REDDIT_CLIENT_ID"),
+            client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+            user_agent=os.getenv("REDDIT_USER_AGENT")
+        )
+        logger.info("Reddit API client initialized successfully")
+        return reddit
+    except Exception as e:
+        logger.error(f"Failed to initialize Reddit API: {e}")
+        return None
+
+def create_summary_chat():
+    """Gemini chat for summarization, or None without GEMINI_API_KEY"""
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_api_key:
+        return None
     try:
         summary_chat = LlmChat(
             api_key=gemini_api_key,
@@ -91,10 +128,92 @@ if gemini_api_key:
             system_message="You are an expert at creating concise summaries of Reddit posts and comments. Provide clear, brief summaries that capture the main points in 2-3 sentences maximum."
         ).with_model("gemini", "gemini-2.0-flash-lite")
         logger.info("Gemini API initialized successfully")
+        return summary_chat
     except Exception as e:
         logger.error(f"Failed to initialize Gemini API: {e}")
+        return None
+
+def start_background_jobs(state) -> List[asyncio.Task]:
+    tasks = []
+    db = state.db
+    if db is not None:
+        tasks.append(asyncio.create_task(run_periodically(
+            db["job_state"], "trending", float(os.getenv("TRENDING_INTERVAL_SECONDS", "300")),
+            lambda: update_trending(db)
+        )))
+    if db is not None and retention_days > 0:
+        tasks.append(asyncio.create_task(run_periodically(
+            db["job_state"], "retention", float(os.getenv("RETENTION_INTERVAL_SECONDS", "86400")),
+            lambda: apply_retention(db, retention_days, archive_dir)
+        )))
+    # Export files live on local disk, so every worker sweeps its host's expired jobs
+    tasks.append(asyncio.create_task(run_periodically(
+        None, "export_cleanup", float(os.getenv("EXPORT_CLEANUP_INTERVAL_SECONDS", "3600")),
+        export_jobs.cleanup_expired
+    )))
+    if db is not None and state.reddit is not None:
+        refresh_interval = float(os.getenv("METRIC_REFRESH_INTERVAL_SECONDS", "900"))
+        tasks.append(asyncio.create_task(run_periodically(
+            db["job_state"], "metric_refresh", refresh_interval,
+            lambda: refresh_recent_metrics(
+                db, state.reddit,
+                max_age_hours=float(os.getenv("METRIC_REFRESH_MAX_AGE_HOURS", "48")),
+                refresh_interval=refresh_interval,
+                max_posts=int(os.getenv("METRIC_REFRESH_MAX_POSTS", "10000")),
+                on_changed=state.fulltext_index.update_metrics
+            )
+        )))
+    return tasks
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create this worker's clients and background jobs, and close them on shutdown"""
+    state = app.state
+    state.sentiment_analyzer = SentimentIntensityAnalyzer()
+    # bcrypt runs on its own small thread pool; existing hashes are upgraded at login when BCRYPT_ROUNDS changes
+    state.password_hasher = PasswordHasher(
+        rounds=int(os.getenv("BCRYPT_ROUNDS", str(DEFAULT_ROUNDS))),
+        max_workers=int(os.getenv("BCRYPT_WORKERS", "2"))
+    )
+    state.storage = open_storage()
+    # The trending, metric refresh and retention jobs work on MongoDB directly
+    state.db = getattr(state.storage, "db", None)
+    # Validated tokens and user profiles, so guarded endpoints skip JWT verification and the users lookup
+    state.principals = PrincipalCache(
+        JWT_SECRET, JWT_ALGORITHM,
+        load_profile=state.storage.get_user_by_id if state.storage is not None else None,
+        token_ttl=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300")),
+        profile_ttl=float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "60"))
+    )
+    # Full-text index over every stored post, kept current as searches store posts
+    state.fulltext_index = FullTextIndex(os.getenv("FULLTEXT_INDEX_PATH", "fulltext.db"))
+    state.reddit = create_reddit_client()
+    state.summary_chat = create_summary_chat()
+    
+    if state.storage is not None:
+        state.storage.ensure_schema()
+    state.fulltext_index.ensure_schema()
+    background_tasks = start_background_jobs(state)
+    
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        # Running jobs stop at their next row; waiting ones are cancelled before they start
+        export_jobs_stopping.set()
+        for task in export_job_tasks:
+            task.cancel()
+        await asyncio.gather(*export_job_tasks, return_exceptions=True)
+        if state.storage is not None:
+            if hasattr(state.storage, "flush"):
+                await state.storage.flush()
+            state.storage.close()
+        state.fulltext_index.close()
+        state.password_hasher.close()
 
-app = FastAPI(title="Reddit Social Listening Tool")
+app = FastAPI(title="Reddit Social Listening Tool", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -106,6 +225,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compress JSON and text bodies the client would otherwise download in full
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
+
 # Pydantic models
 class UserRegister(BaseModel):
     email: EmailStr
@@ -127,6 +249,7 @@ class KeywordRequest(BaseModel):
     keyword: str
     subreddit: Optional[str] = "all"
     limit: Optional[int] = 25
+    include_facets: bool = False
 
 class RedditPost(BaseModel):
     id: str
@@ -155,6 +278,39 @@ class SearchFilters(BaseModel):
     min_sentiment: Optional[float] = None
     max_sentiment: Optional[float] = None
 
+class PostQuery(BaseModel):
+    filters: SearchFilters = SearchFilters()
+    keyword: Optional[str] = None
+    sort: Literal["recent", "sentiment"] = "recent"
+    limit: int = 50
+    cursor: Optional[str] = None
+    include_facets: bool = False
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class Facets(BaseModel):
+    subreddit: List[FacetCount]
+    sentiment: List[FacetCount]
+    day: List[FacetCount]
+
+class FacetedSearchResults(BaseModel):
+    items: List[RedditPost]
+    facets: Facets
+
+class ArchiveSearchRequest(BaseModel):
+    query: str
+    filters: SearchFilters = SearchFilters()
+    limit: int = 25
+    offset: int = 0
+
+class ExportJobRequest(BaseModel):
+    format: Literal["csv", "ndjson", "parquet", "arrow"] = "csv"
+    keyword: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
 class SavedKeyword(BaseModel):
     id: str
     user_id: str
@@ -177,6 +333,10 @@ class TrackerDashboard(BaseModel):
 class SummaryRequest(BaseModel):
     content: str
 
+# Serializers for handlers that return already-validated models (see responses.py)
+post_list_adapter = TypeAdapter(List[RedditPost])
+faceted_results_adapter = TypeAdapter(FacetedSearchResults)
+
 # Authentication functions
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -187,39 +347,43 @@ def create_access_token(data: dict):
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        return user_id
-    except jwt.PyJWTError:
+        return app.state.principals.authenticate(credentials.credentials)
+    except AuthenticationError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    return await app.state.password_hasher.hash(password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await app.state.password_hasher.verify(password, hashed)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def queue_full_response(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def acquire_fair_slot(queue_name: str, user_id: str, cost: float = 1.0):
+    """Wait for the user's turn in a fair queue; release the returned slot when done"""
+    try:
+        return await fair_queues[queue_name].acquire(user_id, cost)
+    except QueueFull as e:
+        raise queue_full_response(e)
+
+def release_after(chunks, slot):
+    """Hold a fair-queue slot until a streamed response has been fully sent"""
+    try:
+        yield from chunks
+    finally:
+        slot.release()
 
 def calculate_sentiment_score(text: str) -> float:
     """Calculate sentiment score using VADER (0-10 scale)"""
     if not text:
         return 5.0  # Neutral
     
-    scores = sentiment_analyzer.polarity_scores(text)
+    scores = app.state.sentiment_analyzer.polarity_scores(text)
     # Convert compound score (-1 to 1) to 0-10 scale
     sentiment_score = ((scores['compound'] + 1) / 2) * 10
     return round(sentiment_score, 2)
 
-def calculate_trending_score(upvotes: int, comments: int, age_hours: float) -> float:
-    """Calculate trending score based on engagement and time"""
-    if age_hours <= 0:
-        age_hours = 0.1
-    
-    # Simple trending formula: (upvotes + comments * 2) / age_hours
-    trending_score = (upvotes + comments * 2) / age_hours
-    return round(trending_score, 2)
-
 # API Routes
 @app.get("/")
 async def root():
@@ -227,28 +391,31 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
+    storage = app.state.storage
     return {
         "status": "healthy",
-        "reddit_api": reddit is not None,
-        "database": db is not None,
-        "gemini_api": summary_chat is not None
+        "reddit_api": app.state.reddit is not None,
+        "database": storage is not None,
+        "storage": storage.name if storage is not None else None,
+        "gemini_api": app.state.summary_chat is not None
     }
 
 # Authentication routes
 @app.post("/api/register")
 async def register(user_data: UserRegister):
-    if db is None:
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
         # Check if user already exists
-        existing_user = users_collection.find_one({"email": user_data.email})
+        existing_user = storage.get_user_by_email(user_data.email)
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create new user
         user_id = str(uuid.uuid4())
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         
         new_user = {
             "id": user_id,
@@ -259,7 +426,10 @@ async def register(user_data: UserRegister):
             "is_active": True
         }
         
-        users_collection.insert_one(new_user)
+        try:
+            storage.create_user(new_user)
+        except DuplicateEmailError:
+            raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create access token
         access_token = create_access_token(data={"sub": user_id})
@@ -283,17 +453,28 @@ async def register(user_data: UserRegister):
 
 @app.post("/api/login")
 async def login(login_data: UserLogin):
-    if db is None:
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
-        user = users_collection.find_one({"email": login_data.email})
-        if not user or not verify_password(login_data.password, user["password"]):
+        user = storage.get_user_by_email(login_data.email)
+        if not user or not await verify_password(login_data.password, user["password"]):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
+        # Login reads the account fresh; drop this worker's cached copy so a disabled account takes effect now
+        app.state.principals.invalidate_user(user["id"])
+        
         if not user.get("is_active", True):
             raise HTTPException(status_code=401, detail="Account is disabled")
         
+        if app.state.password_hasher.needs_rehash(user["password"]):
+            # The password is known only now, so this is where hashes move to the configured cost
+            try:
+                storage.update_password_hash(user["id"], await hash_password(login_data.password))
+            except Exception as e:
+                logger.warning(f"Could not rehash password for user {user['id']}: {e}")
+        
         access_token = create_access_token(data={"sub": user["id"]})
         
         return {
@@ -316,11 +497,11 @@ async def login(login_data: UserLogin):
 
 @app.get("/api/me", response_model=User)
 async def get_current_user_info(current_user: str = Depends(get_current_user)):
-    if db is None:
+    if app.state.storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
-        user = users_collection.find_one({"id": current_user}, {"password": 0, "_id": 0})
+        user = app.state.principals.profile(current_user)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -331,60 +512,71 @@ async def get_current_user_info(current_user: str = Depends(get_current_user)):
         logger.error(f"Error fetching user info: {e}")
         raise HTTPException(status_code=500, detail="Error fetching user info")
 
+@app.get("/api/queue-stats")
+async def get_queue_stats(current_user: str = Depends(get_current_user)):
+    """The current user's depth, running requests and wait times in each fair queue (this worker only)"""
+    return {name: queue.stats(current_user) for name, queue in fair_queues.items()}
+
+def fetch_scored_posts(reddit, keyword: str, subreddit: str, limit: int, search_timestamp: str) -> List[RedditPost]:
+    """Run the Reddit search and score each submission; blocking, so callers run it in a thread"""
+    posts = []
+    for submission in reddit.subreddit(subreddit).search(keyword, limit=limit, sort="new"):
+        try:
+            # Calculate sentiment score
+            text_content = f"{submission.title} {submission.selftext if hasattr(submission, 'selftext') else ''}"
+            sentiment_score = calculate_sentiment_score(text_content)
+            
+            posts.append(RedditPost(
+                id=submission.id,
+                title=submission.title,
+                author=str(submission.author) if submission.author else "[deleted]",
+                subreddit=str(submission.subreddit),
+                upvotes=submission.score,
+                url=submission.url,
+                comments=submission.num_comments,
+                created_utc=submission.created_utc,
+                permalink=f"https://reddit.com{submission.permalink}",
+                body=submission.selftext[:500] if hasattr(submission, 'selftext') and submission.selftext else None,
+                keyword_searched=keyword,
+                search_timestamp=search_timestamp,
+                sentiment_score=sentiment_score
+            ))
+        except Exception as e:
+            logger.warning(f"Error processing submission {submission.id}: {e}")
+            continue
+    return posts
+
 # Enhanced Reddit API routes
-@app.post("/api/search-posts", response_model=List[RedditPost])
+@app.post("/api/search-posts", response_model=Union[List[RedditPost], FacetedSearchResults])
 async def search_posts(request: KeywordRequest, current_user: str = Depends(get_current_user)):
     """Search Reddit for posts containing the specified keyword with sentiment analysis"""
+    storage = app.state.storage
+    reddit = app.state.reddit
     if not reddit:
         raise HTTPException(status_code=500, detail="Reddit API not available")
     
+    limit = max(1, min(request.limit or 25, 100))
+    # Searches are queued fairly per user; a limit=100 search weighs four times a default one
+    slot = await acquire_fair_slot("search", current_user, cost=limit / 25)
     try:
         keyword = request.keyword.strip()
         subreddit = request.subreddit or "all"
-        limit = min(request.limit or 25, 100)
         
         logger.info(f"User {current_user} searching for keyword '{keyword}' in r/{subreddit} (limit: {limit})")
         
-        submissions = reddit.subreddit(subreddit).search(
-            keyword, 
-            limit=limit,
-            sort="new"
-        )
-        
-        posts = []
         search_timestamp = datetime.now(timezone.utc).isoformat()
+        # PRAW and VADER block; off the event loop, other users' requests keep being served
+        # and queued while this one holds its slot
+        posts = await asyncio.to_thread(fetch_scored_posts, reddit, keyword, subreddit, limit, search_timestamp)
         
-        for submission in submissions:
-            try:
-                # Calculate sentiment score
-                text_content = f"{submission.title} {submission.selftext if hasattr(submission, 'selftext') else ''}"
-                sentiment_score = calculate_sentiment_score(text_content)
-                
-                # Calculate age in hours
-                post_age_hours = (datetime.now().timestamp() - submission.created_utc) / 3600
-                
-                post = RedditPost(
-                    id=submission.id,
-                    title=submission.title,
-                    author=str(submission.author) if submission.author else "[deleted]",
-                    subreddit=str(submission.subreddit),
-                    upvotes=submission.score,
-                    url=submission.url,
-                    comments=submission.num_comments,
-                    created_utc=submission.created_utc,
-                    permalink=f"https://reddit.com{submission.permalink}",
-                    body=submission.selftext[:500] if hasattr(submission, 'selftext') and submission.selftext else None,
-                    keyword_searched=keyword,
-                    search_timestamp=search_timestamp,
-                    sentiment_score=sentiment_score
-                )
-                posts.append(post)
-            except Exception as e:
-                logger.warning(f"Error processing submission {submission.id}: {e}")
-                continue
+        facets = None
+        if request.include_facets:
+            facets = FacetCounter()
+            for post in posts:
+                facets.add(post.subreddit, post.sentiment_score, post.created_utc)
         
         # Store search results in database
-        if db is not None:
+        if storage is not None:
             try:
                 search_record = {
                     "id": str(uuid.uuid4()),
@@ -395,33 +587,33 @@ async def search_posts(request: KeywordRequest, current_user: str = Depends(get_
                     "post_count": len(posts),
                     "avg_sentiment": sum(p.sentiment_score for p in posts if p.sentiment_score) / len(posts) if posts else None
                 }
-                searches_collection.insert_one(search_record)
-                
-                # Store individual posts
-                for post in posts:
-                    post_dict = post.model_dump()
-                    post_dict["user_id"] = current_user
-                    posts_collection.update_one(
-                        {"id": post.id},
-                        {"$set": post_dict},
-                        upsert=True
-                    )
+                post_dicts = [post.model_dump() for post in posts]
+                await storage.save_search_results(search_record, post_dicts)
+                storage.bump_versions(current_user, "searches", "posts")
+                await asyncio.to_thread(app.state.fulltext_index.add_posts, current_user, post_dicts)
             except Exception as e:
                 logger.warning(f"Error storing search results: {e}")
         
         logger.info(f"Found {len(posts)} posts for keyword '{keyword}'")
-        return posts
+        if facets is not None:
+            results = FacetedSearchResults.model_construct(items=posts, facets=Facets(**facets.result()))
+            return ModelJSONResponse(results, faceted_results_adapter)
+        return ModelJSONResponse(posts, post_list_adapter)
         
     except Exception as e:
         logger.error(f"Error searching Reddit: {e}")
         raise HTTPException(status_code=500, detail=f"Error searching Reddit: {str(e)}")
+    finally:
+        slot.release()
 
 @app.post("/api/summarize")
 async def summarize_content(request: SummaryRequest, current_user: str = Depends(get_current_user)):
     """Generate AI summary of Reddit content using Gemini"""
+    summary_chat = app.state.summary_chat
     if not summary_chat:
         raise HTTPException(status_code=500, detail="Summarization service not available")
     
+    slot = await acquire_fair_slot("summarize", current_user)
     try:
         content = request.content.strip()
         if not content:
@@ -442,57 +634,22 @@ async def summarize_content(request: SummaryRequest, current_user: str = Depends
     except Exception as e:
         logger.error(f"Error generating summary: {e}")
         raise HTTPException(status_code=500, detail="Error generating summary")
+    finally:
+        slot.release()
 
 @app.post("/api/filter-posts", response_model=List[RedditPost])
 async def filter_posts(posts: List[RedditPost], filters: SearchFilters, current_user: str = Depends(get_current_user)):
     """Filter posts based on various criteria including date range and sentiment"""
-    filtered_posts = []
-    
-    # Parse date filters
-    start_date = None
-    end_date = None
-    if filters.start_date:
-        start_date = datetime.fromisoformat(filters.start_date.replace('Z', '+00:00')).timestamp()
-    if filters.end_date:
-        end_date = datetime.fromisoformat(filters.end_date.replace('Z', '+00:00')).timestamp()
-    
-    for post in posts:
-        # Check upvotes filter
-        if filters.min_upvotes is not None and post.upvotes < filters.min_upvotes:
-            continue
-        if filters.max_upvotes is not None and post.upvotes > filters.max_upvotes:
-            continue
-            
-        # Check comments filter
-        if filters.min_comments is not None and post.comments < filters.min_comments:
-            continue
-        if filters.max_comments is not None and post.comments > filters.max_comments:
-            continue
-            
-        # Check subreddit filter
-        if filters.subreddit and filters.subreddit.lower() not in post.subreddit.lower():
-            continue
-        
-        # Check date range filter
-        if start_date and post.created_utc < start_date:
-            continue
-        if end_date and post.created_utc > end_date:
-            continue
-        
-        # Check sentiment filter
-        if filters.min_sentiment is not None and (post.sentiment_score is None or post.sentiment_score < filters.min_sentiment):
-            continue
-        if filters.max_sentiment is not None and (post.sentiment_score is None or post.sentiment_score > filters.max_sentiment):
-            continue
-            
-        filtered_posts.append(post)
-    
-    return filtered_posts
+    try:
+        return ModelJSONResponse(filter_rows(posts, filters.model_dump()), post_list_adapter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
 
 @app.post("/api/save-keyword", response_model=SavedKeyword)
 async def save_keyword(request: KeywordRequest, current_user: str = Depends(get_current_user)):
     """Save a keyword for tracking"""
-    if db is None:
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
@@ -506,7 +663,8 @@ async def save_keyword(request: KeywordRequest, current_user: str = Depends(get_
             active=True
         )
         
-        keywords_collection.insert_one(saved_keyword.model_dump())
+        storage.add_keyword(saved_keyword.model_dump())
+        storage.bump_versions(current_user, "keywords")
         return saved_keyword
         
     except Exception as e:
@@ -514,17 +672,20 @@ async def save_keyword(request: KeywordRequest, current_user: str = Depends(get_
         raise HTTPException(status_code=500, detail=f"Error saving keyword: {str(e)}")
 
 @app.get("/api/saved-keywords", response_model=List[SavedKeyword])
-async def get_saved_keywords(current_user: str = Depends(get_current_user)):
+async def get_saved_keywords(request: Request, current_user: str = Depends(get_current_user)):
     """Get all saved keywords for the current user"""
-    if db is None:
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
-        keywords = list(keywords_collection.find(
-            {"user_id": current_user, "active": True}, 
-            {"_id": 0}
-        ))
-        return [SavedKeyword(**keyword) for keyword in keywords]
+        etag = make_etag(current_user, ("saved-keywords",), storage.get_versions(current_user), ("keywords",))
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        
+        keywords = storage.list_active_keywords(current_user)
+        return ModelJSONResponse([SavedKeyword(**keyword) for keyword in keywords], headers=cache_headers)
     except Exception as e:
         logger.error(f"Error fetching keywords: {e}")
         return []
@@ -532,17 +693,14 @@ async def get_saved_keywords(current_user: str = Depends(get_current_user)):
 @app.delete("/api/saved-keywords/{keyword_id}")
 async def delete_keyword(keyword_id: str, current_user: str = Depends(get_current_user)):
     """Delete a saved keyword"""
-    if db is None:
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
-        result = keywords_collection.update_one(
-            {"id": keyword_id, "user_id": current_user},
-            {"$set": {"active": False}}
-        )
-        
-        if result.matched_count == 0:
+        if not storage.deactivate_keyword(current_user, keyword_id):
             raise HTTPException(status_code=404, detail="Keyword not found")
+        storage.bump_versions(current_user, "keywords")
             
         return {"message": "Keyword deleted successfully"}
     except HTTPException:
@@ -551,74 +709,149 @@ async def delete_keyword(keyword_id: str, current_user: str = Depends(get_curren
         logger.error(f"Error deleting keyword: {e}")
         raise HTTPException(status_code=500, detail=f"Error deleting keyword: {str(e)}")
 
+def encode_cursor(*values) -> str:
+    """Opaque pagination cursor from the sort key of the last item on a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("unexpected cursor shape")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/search-history")
-async def get_search_history(current_user: str = Depends(get_current_user)):
-    """Get recent search history for the current user"""
-    if db is None:
+async def get_search_history(
+    request: Request,
+    limit: int = 50,
+    cursor: str = None,
+    keyword: str = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Get search history for the current user, newest first, one page at a time"""
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
+    limit = max(1, min(limit, 200))
+    after = tuple(decode_cursor(cursor, 2)) if cursor else None
+    
     try:
-        searches = list(searches_collection.find(
-            {"user_id": current_user},
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(50))
+        etag = make_etag(current_user, ("search-history", limit, cursor, keyword),
+                         storage.get_versions(current_user), ("searches",))
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        
+        # One extra row tells us whether there is a next page
+        searches = storage.search_history(current_user, limit + 1, keyword, after)
         
-        return searches
+        next_cursor = None
+        if len(searches) > limit:
+            searches = searches[:limit]
+            next_cursor = encode_cursor(searches[-1]["timestamp"], searches[-1]["id"])
+        
+        return ORJSONResponse({"items": searches, "next_cursor": next_cursor}, headers=cache_headers)
     except Exception as e:
         logger.error(f"Error fetching search history: {e}")
-        return []
+        return {"items": [], "next_cursor": None}
+
+@app.post("/api/posts/query")
+async def query_stored_posts(query: PostQuery, current_user: str = Depends(get_current_user)):
+    """Filter the user's stored posts in the database, one page at a time"""
+    storage = app.state.storage
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database not available")
+    
+    limit = max(1, min(query.limit, 200))
+    after = tuple(decode_cursor(query.cursor, 3)) if query.cursor else None
+    sort_field = "search_timestamp" if query.sort == "recent" else "sentiment_score"
+    
+    try:
+        filters = query.filters.model_dump()
+        posts = storage.query_posts(current_user, filters, query.keyword, query.sort, limit + 1, after)
+        
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = encode_cursor(posts[-1][sort_field], posts[-1]["id"], posts[-1]["keyword_searched"])
+        
+        response = {"items": [RedditPost(**post) for post in posts], "next_cursor": next_cursor}
+        if query.include_facets:
+            # Facets describe the whole result set, not the page, so they ignore the cursor
+            response["facets"] = storage.post_facets(current_user, filters, query.keyword)
+        return ModelJSONResponse(response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+    except Exception as e:
+        logger.error(f"Error querying stored posts: {e}")
+        raise HTTPException(status_code=500, detail="Error querying stored posts")
+
+@app.post("/api/archive/search")
+async def search_archive(request: ArchiveSearchRequest, current_user: str = Depends(get_current_user)):
+    """Full-text search over the posts the user has already stored, best match first"""
+    limit = max(1, min(request.limit, 100))
+    offset = max(0, request.offset)
+    
+    try:
+        rows = await asyncio.to_thread(
+            app.state.fulltext_index.search, current_user, request.query, request.filters.model_dump(), limit + 1, offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+    except Exception as e:
+        logger.error(f"Error searching archive: {e}")
+        raise HTTPException(status_code=500, detail="Error searching archive")
+    
+    next_offset = offset + limit if len(rows) > limit else None
+    return {
+        "items": [{**RedditPost(**row).model_dump(), "score": row["score"]} for row in rows[:limit]],
+        "next_offset": next_offset
+    }
 
 @app.get("/api/dashboard")
-async def get_dashboard_data(current_user: str = Depends(get_current_user)):
+async def get_dashboard_data(
+    request: Request,
+    start_date: str = None,
+    end_date: str = None,
+    current_user: str = Depends(get_current_user)
+):
     """Get dashboard analytics for the current user"""
-    if db is None:
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
+        if not start_date:
+            start_date = (datetime.now(timezone.utc) - timedelta(days=30)).strftime("%Y-%m-%d")
+        
+        # Serve unchanged dashboards without touching the posts or searches collections
+        cache_key = (current_user, "dashboard", start_date, end_date)
+        etag = make_etag(current_user, cache_key[1:], storage.get_versions(current_user), ("searches", "posts"))
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        cached = dashboard_cache.get(cache_key, etag)
+        if cached is not None:
+            return ORJSONResponse(cached, headers=cache_headers)
+        
         logger.info(f"Fetching dashboard data for user: {current_user}")
         
         # Get recent searches
-        recent_searches = list(searches_collection.find(
-            {"user_id": current_user},
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(10))
+        recent_searches = storage.search_history(current_user, 10)
         
         logger.info(f"Found {len(recent_searches)} recent searches")
         
-        # Get sentiment trends (simplified)
+        # Get daily sentiment trends over every post in the range (last 30 days by default)
         sentiment_data = []
         try:
-            posts_with_sentiment = list(posts_collection.find(
-                {"user_id": current_user, "sentiment_score": {"$exists": True, "$ne": None}},
-                {"sentiment_score": 1, "search_timestamp": 1}
-            ).limit(100))
-            
-            # Group by date manually
-            date_groups = {}
-            for post in posts_with_sentiment:
-                if post.get("search_timestamp"):
-                    try:
-                        date_key = post["search_timestamp"][:10]  # Get YYYY-MM-DD
-                        if date_key not in date_groups:
-                            date_groups[date_key] = {"scores": [], "count": 0}
-                        date_groups[date_key]["scores"].append(post["sentiment_score"])
-                        date_groups[date_key]["count"] += 1
-                    except Exception as e:
-                        logger.warning(f"Error parsing date: {e}")
-                        continue
-            
-            # Convert to list format
-            for date_key, data in date_groups.items():
-                avg_sentiment = sum(data["scores"]) / len(data["scores"]) if data["scores"] else 5.0
-                sentiment_data.append({
-                    "_id": date_key,
-                    "avg_sentiment": round(avg_sentiment, 2),
-                    "post_count": data["count"]
-                })
-            
-            # Sort by date descending
-            sentiment_data.sort(key=lambda x: x["_id"], reverse=True)
-            sentiment_data = sentiment_data[:30]  # Keep last 30 days
+            sentiment_data = storage.sentiment_trends(current_user, start_date, end_date)
+            # Archived days never overlap live ones, since retention cuts on whole days
+            if archive_reader.covers("user_posts", start_date):
+                sentiment_data.extend(archive_reader.sentiment_trends(current_user, start_date, end_date))
+                sentiment_data.sort(key=lambda x: x["_id"], reverse=True)
             
         except Exception as e:
             logger.error(f"Error calculating sentiment trends: {e}")
@@ -629,46 +862,20 @@ async def get_dashboard_data(current_user: str = Depends(get_current_user)):
         # Get keyword performance (simplified)
         keyword_stats = []
         try:
-            keyword_aggregation = list(searches_collection.aggregate([
-                {"$match": {"user_id": current_user}},
-                {"$group": {
-                    "_id": "$keyword",
-                    "search_count": {"$sum": 1},
-                    "total_posts": {"$sum": "$post_count"},
-                    "avg_sentiment": {"$avg": "$avg_sentiment"},
-                    "last_search": {"$max": "$timestamp"}
-                }},
-                {"$sort": {"search_count": -1}},
-                {"$limit": 10}
-            ]))
-            keyword_stats = keyword_aggregation
+            keyword_stats = storage.keyword_stats(current_user, 10)
         except Exception as e:
             logger.error(f"Error calculating keyword stats: {e}")
-            # Fallback: get keyword stats manually
-            search_docs = list(searches_collection.find({"user_id": current_user}))
-            keyword_counts = {}
-            for search in search_docs:
-                keyword = search.get("keyword", "unknown")
-                if keyword not in keyword_counts:
-                    keyword_counts[keyword] = {
-                        "_id": keyword,
-                        "search_count": 0,
-                        "total_posts": 0,
-                        "avg_sentiment": None,
-                        "last_search": search.get("timestamp")
-                    }
-                keyword_counts[keyword]["search_count"] += 1
-                keyword_counts[keyword]["total_posts"] += search.get("post_count", 0)
-                if search.get("timestamp") and (not keyword_counts[keyword]["last_search"] or search.get("timestamp") > keyword_counts[keyword]["last_search"]):
-                    keyword_counts[keyword]["last_search"] = search.get("timestamp")
-            
-            keyword_stats = sorted(keyword_counts.values(), key=lambda x: x["search_count"], reverse=True)[:10]
         
         logger.info(f"Found {len(keyword_stats)} keyword stats")
         
-        # Calculate summary stats
-        total_searches = len(recent_searches) if len(recent_searches) < 10 else searches_collection.count_documents({"user_id": current_user})
-        total_posts = posts_collection.count_documents({"user_id": current_user})
+        # Calculate summary stats; the overall average comes from the same rows as the trends,
+        # weighted by post count, so the two never disagree
+        scored_posts = sum(day["post_count"] for day in sentiment_data)
+        avg_sentiment = round(sum(day["sentiment_sum"] for day in sentiment_data) / scored_posts, 2) if scored_posts else None
+        total_searches = len(recent_searches) if len(recent_searches) < 10 else storage.count_searches(current_user)
+        total_searches += archive_reader.count_searches(current_user)
+        # Archived memberships count too, once per post, like the archived searches above
+        total_posts = storage.count_user_posts(current_user)
         
         result = {
             "recent_searches": recent_searches,
@@ -677,12 +884,14 @@ async def get_dashboard_data(current_user: str = Depends(get_current_user)):
             "summary_stats": {
                 "total_searches": total_searches,
                 "total_posts": total_posts,
-                "avg_sentiment": sum(item["avg_sentiment"] for item in sentiment_data if item.get("avg_sentiment")) / len(sentiment_data) if sentiment_data else None
+                "avg_sentiment": avg_sentiment
             }
         }
         
         logger.info(f"Dashboard data prepared successfully")
-        return result
+        result = jsonable_encoder(result)
+        dashboard_cache.set(cache_key, etag, result)
+        return ORJSONResponse(result, headers=cache_headers)
         
     except Exception as e:
         logger.error(f"Error fetching dashboard data: {e}")
@@ -702,6 +911,58 @@ async def get_dashboard_data(current_user: str = Depends(get_current_user)):
         logger.error(f"Error fetching dashboard data: {e}")
         return {"recent_searches": [], "sentiment_trends": [], "keyword_stats": []}
 
+def validate_export_dates(start_date: Optional[str], end_date: Optional[str]) -> None:
+    """Reject unparseable export bounds up front, so every backend answers 400 rather than failing mid-query"""
+    try:
+        parse_filter_dates({"start_date": start_date, "end_date": end_date})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date range: {e}")
+
+@app.get("/api/export")
+async def export_data(
+    format: Literal["csv", "ndjson", "parquet", "arrow"] = "csv",
+    keyword: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Export stored posts as CSV, NDJSON, Parquet or Arrow, streamed in chunks straight from the database cursor"""
+    storage = app.state.storage
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database not available")
+    validate_export_dates(start_date, end_date)
+    
+    slot = await acquire_fair_slot("export", current_user)
+    try:
+        rows = storage.iter_export_rows(current_user, keyword, start_date, end_date)
+        if archive_reader.covers("user_posts", start_date):
+            rows = itertools.chain(rows, archive_reader.iter_user_posts(
+                current_user, keyword, start_date, end_date, columns=ARCHIVE_EXPORT_COLUMNS
+            ))
+        
+        # Pull the first row before the response starts so an empty export can still 404
+        first = next(rows, None)
+        if first is None:
+            raise HTTPException(status_code=404, detail="No data found for export")
+        
+        export_format = EXPORT_FORMATS[format]
+        filename = f"reddit_posts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format.extension}"
+        # The slot is held while the body streams; the background task covers a client that never reads it
+        return StreamingResponse(
+            release_after(export_format.encode(itertools.chain([first], rows)), slot),
+            media_type=export_format.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            background=BackgroundTask(slot.release)
+        )
+        
+    except HTTPException:
+        slot.release()
+        raise
+    except Exception as e:
+        slot.release()
+        logger.error(f"Error exporting data: {e}")
+        raise HTTPException(status_code=500, detail="Error exporting data")
+
 @app.get("/api/export/csv")
 async def export_to_csv(
     keyword: str = None,
@@ -710,57 +971,136 @@ async def export_to_csv(
     current_user: str = Depends(get_current_user)
 ):
     """Export search results to CSV"""
-    if db is None:
+    return await export_data("csv", keyword, start_date, end_date, current_user)
+
+def export_job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    return public_view(job, lambda number: f"/api/export/jobs/{job['id']}/parts/{number}")
+
+@app.post("/api/export/jobs", status_code=202)
+async def create_export_job(request: ExportJobRequest, current_user: str = Depends(get_current_user)):
+    """Start a background export; poll the job for progress and download its parts as they finish"""
+    storage = app.state.storage
+    if storage is None:
         raise HTTPException(status_code=500, detail="Database not available")
+    validate_export_dates(request.start_date, request.end_date)
     
+    # Take a place in the export queue now, so a user with too many exports pending gets a 429
     try:
-        # Build query
-        query = {"user_id": current_user}
+        slot = fair_queues["export"].enqueue(current_user)
+    except QueueFull as e:
+        raise queue_full_response(e)
+    
+    params = request.model_dump(exclude={"format"})
+    job = export_jobs.create(current_user, request.format, params)
+    
+    def rows():
+        rows = storage.iter_export_rows(current_user, request.keyword, request.start_date, request.end_date)
+        if archive_reader.covers("user_posts", request.start_date):
+            rows = itertools.chain(rows, archive_reader.iter_user_posts(
+                current_user, request.keyword, request.start_date, request.end_date, columns=ARCHIVE_EXPORT_COLUMNS
+            ))
+        return rows
+    
+    async def run_when_admitted():
+        # Background jobs wait as long as it takes (only the queue depth is limited), heartbeating meanwhile
+        try:
+            while not slot.future.done():
+                await asyncio.wait([slot.future], timeout=60)
+                export_jobs.heartbeat(job["id"])
+            run = asyncio.ensure_future(asyncio.to_thread(export_jobs.run, job["id"], rows, export_jobs_stopping))
+            try:
+                await asyncio.shield(run)
+            except asyncio.CancelledError:
+                # The thread can't be interrupted; wait for it to see export_jobs_stopping and stop
+                await run
+                raise
+        finally:
+            slot.release()
+    
+    # Keep a reference so the task isn't garbage collected while the thread runs
+    task = asyncio.create_task(run_when_admitted())
+    export_job_tasks.add(task)
+    task.add_done_callback(export_job_tasks.discard)
+    # Covers jobs cancelled while still waiting, or before the task ever started
+    task.add_done_callback(lambda done: done.cancelled() and export_jobs.cancel(job["id"], SHUTDOWN_ERROR))
+    
+    return export_job_view(job)
+
+@app.get("/api/export/jobs/{job_id}")
+async def get_export_job(job_id: str, current_user: str = Depends(get_current_user)):
+    """Status, progress and finished parts of an export job"""
+    job = export_jobs.get(current_user, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return export_job_view(job)
+
+@app.get("/api/export/jobs/{job_id}/parts/{number}")
+async def download_export_part(
+    job_id: str,
+    number: int,
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """Download one finished part; honours single Range requests so interrupted downloads can resume"""
+    job = export_jobs.get(current_user, job_id)
+    path = export_jobs.part_path(job, number) if job else None
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Export part not found")
+    
+    size = os.path.getsize(path)
+    # Parts never change once written, so size and mtime identify the content
+    etag = f'"{job_id}-{number}-{size}-{int(os.path.getmtime(path))}"'
+    export_format = EXPORT_FORMATS[job["format"]]
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="export-{job_id[:8]}-part{number:04d}.{export_format.extension}"'
+    }
+    
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            start, end = parse_range(range_header, size)
+        except ValueError:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                                headers={"Content-Range": f"bytes */{size}"})
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_file_range(path, start, end), status_code=status_code,
+                             media_type=export_format.media_type, headers=headers)
+
+@app.get("/api/trending")
+async def get_trending(
+    keyword: str = None,
+    limit: int = 10,
+    current_user: str = Depends(get_current_user)
+):
+    """Get the precomputed top trending posts for the user's tracked keywords"""
+    storage = app.state.storage
+    if storage is None:
+        raise HTTPException(status_code=500, detail="Database not available")
+    
+    try:
+        keywords = {k["keyword"] for k in storage.list_active_keywords(current_user)}
         if keyword:
-            query["keyword_searched"] = keyword
-        if start_date or end_date:
-            date_filter = {}
-            if start_date:
-                date_filter["$gte"] = start_date
-            if end_date:
-                date_filter["$lte"] = end_date
-            query["search_timestamp"] = date_filter
-        
-        # Get posts
-        posts = list(posts_collection.find(query, {"_id": 0}))
-        
-        if not posts:
-            raise HTTPException(status_code=404, detail="No data found for export")
-        
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=[
-            'id', 'title', 'author', 'subreddit', 'upvotes', 'comments',
-            'created_utc', 'permalink', 'keyword_searched', 'sentiment_score'
-        ])
-        writer.writeheader()
-        
-        for post in posts:
-            # Convert timestamp to readable date
-            if 'created_utc' in post:
-                post['created_utc'] = datetime.fromtimestamp(post['created_utc']).isoformat()
-            writer.writerow({k: v for k, v in post.items() if k in writer.fieldnames})
-        
-        # Return CSV file
-        csv_content = output.getvalue()
-        output.close()
+            keywords = {k for k in keywords if k == keyword}
         
+        rankings = storage.trending_rankings(current_user, sorted(keywords))
+        limit = max(1, min(limit, 25))
         return {
-            "filename": f"reddit_posts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            "content": csv_content,
-            "content_type": "text/csv"
+            ranking["keyword"]: {
+                "posts": ranking.get("posts", [])[:limit],
+                "updated_at": ranking["updated_at"].isoformat() if ranking.get("updated_at") else None
+            }
+            for ranking in rankings
         }
-        
-    except HTTPException:
-        raise
     except Exception as e:
-        logger.error(f"Error exporting to CSV: {e}")
-        raise HTTPException(status_code=500, detail="Error exporting data")
+        logger.error(f"Error fetching trending posts: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching trending posts")
 
 @app.get("/debug")
 async def debug_page():
@@ -0,0 +1,27 @@
+"""Storage backends behind a common repository interface.
+
+STORAGE_BACKEND selects "mongo" or "sqlite"; when unset, MongoDB is used if
+MONGO_URL is configured and the embedded SQLite backend otherwise.
+"""
+import os
+
+from .base import DuplicateEmailError, Storage
+
+
+def create_storage() -> Storage:
+    backend = os.getenv("STORAGE_BACKEND") or ("mongo" if os.getenv("MONGO_URL") else "sqlite")
+
+    if backend == "mongo":
+        # Imported lazily so SQLite deployments don't need a reachable MongoDB driver setup
+        from .mongo import MongoStorage
+        return MongoStorage(
+            os.getenv("MONGO_URL"),
+            os.getenv("DB_NAME", "reddit_social_listener"),
+            write_batch_size=int(os.getenv("POST_WRITE_BATCH_SIZE", "500")),
+            write_flush_interval=float(os.getenv("POST_WRITE_FLUSH_MS", "50")) / 1000
+        )
+    if backend == "sqlite":
+        from .sqlite import SQLiteStorage
+        return SQLiteStorage(os.getenv("SQLITE_PATH", "reddit_social_listener.db"))
+
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
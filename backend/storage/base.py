@@ -0,0 +1,146 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Fields that describe a user's relationship to a post rather than the post itself.
+# They live in the membership table so that a post found by several users is stored once.
+MEMBERSHIP_FIELDS = {"keyword_searched", "search_timestamp", "user_id"}
+
+# Columns returned for exports, in CSV column order
+EXPORT_FIELDS = [
+    "id", "title", "author", "subreddit", "upvotes", "comments",
+    "created_utc", "permalink", "keyword_searched", "sentiment_score"
+]
+
+TREND_PERCENTILES = [0.25, 0.5, 0.75, 0.9]
+
+# Sort orders for stored-post queries: name -> membership field, always descending with post_id as tie-break
+POST_QUERY_SORTS = {"recent": "search_ts", "sentiment": "sentiment_score"}
+
+
+class Storage(ABC):
+    """Repository interface shared by the MongoDB and SQLite backends.
+
+    Timestamps cross this boundary as ISO-8601 strings and days as YYYY-MM-DD,
+    whatever the backend stores internally.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def ensure_schema(self):
+        """Create tables, collections and indexes; idempotent"""
+
+    def close(self):
+        pass
+
+    # Users
+    @abstractmethod
+    def create_user(self, user: Dict[str, Any]):
+        """Insert a user; raises DuplicateEmailError if the email is taken"""
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """The full user record, including the password hash"""
+
+    @abstractmethod
+    def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The user record without the password hash"""
+
+    @abstractmethod
+    def update_password_hash(self, user_id: str, password_hash: str):
+        """Replace a user's password hash, e.g. after rehashing at a new cost factor"""
+
+    # Saved keywords
+    @abstractmethod
+    def add_keyword(self, keyword: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def list_active_keywords(self, user_id: str) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def deactivate_keyword(self, user_id: str, keyword_id: str) -> bool:
+        """Mark a keyword inactive; False if the user has no such keyword"""
+
+    # Searches and their posts
+    @abstractmethod
+    async def save_search_results(self, search: Dict[str, Any], posts: List[Dict[str, Any]]):
+        """Record a search and store its posts with the user's membership of each.
+
+        `posts` are RedditPost dumps; per-post storage failures are logged, not raised.
+        """
+
+    @abstractmethod
+    def search_history(self, user_id: str, limit: int, keyword: Optional[str] = None,
+                       after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Searches newest first, continuing after the (timestamp, id) keyset if given"""
+
+    @abstractmethod
+    def count_searches(self, user_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def keyword_stats(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Per-keyword search count, post total, average sentiment and last search time"""
+
+    @abstractmethod
+    def count_user_posts(self, user_id: str) -> int:
+        """Distinct posts a user has found, across all keywords, including archived ones"""
+
+    @abstractmethod
+    def sentiment_trends(self, user_id: str, start_day: str, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Daily sentiment avg, std, count and p25/median/p75/p90 of the user's posts, newest day first"""
+
+    @abstractmethod
+    def iter_export_rows(self, user_id: str, keyword: Optional[str] = None, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """The user's stored posts for export, newest search first, streamed from the backend"""
+
+    @abstractmethod
+    def query_posts(self, user_id: str, filters: Dict[str, Any], keyword: Optional[str] = None,
+                    sort: str = "recent", limit: int = 50,
+                    after: Optional[Tuple[Any, str, str]] = None) -> List[Dict[str, Any]]:
+        """The user's stored posts matching SearchFilters, one keyset page at a time.
+
+        Rows are shaped like RedditPost. `after` is the (sort value, post id, keyword)
+        of the last row of the previous page; a post stored under two keywords appears
+        once per keyword.
+        """
+
+    @abstractmethod
+    def post_facets(self, user_id: str, filters: Dict[str, Any],
+                    keyword: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Subreddit, sentiment bucket and day counts over everything query_posts would return"""
+
+    def trending_rankings(self, user_id: str, keywords: List[str]) -> List[Dict[str, Any]]:
+        """The user's precomputed trending rankings; only backends with the trending job provide them"""
+        return []
+
+    # Per-user data versions, bumped on every write that changes what a user sees
+    @abstractmethod
+    def get_versions(self, user_id: str) -> Dict[str, int]:
+        pass
+
+    @abstractmethod
+    def bump_versions(self, user_id: str, *scopes: str) -> Dict[str, int]:
+        pass
+
+
+class DuplicateEmailError(Exception):
+    pass
+
+
+def next_day(day: str) -> str:
+    """The YYYY-MM-DD day after the given one, for exclusive upper bounds on timestamps"""
+    return (datetime.strptime(day[:10], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def parse_filter_dates(filters: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """SearchFilters start/end dates as created_utc bounds"""
+    bounds = []
+    for key in ("start_date", "end_date"):
+        value = filters.get(key)
+        bounds.append(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() if value else None)
+    return bounds[0], bounds[1]
@@ -0,0 +1,469 @@
+import asyncio
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import MongoClient, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from cache import DataVersions
+from dates import date_match, date_range, day_expression, epoch_seconds_expression, iso_expression, to_datetime
+from facets import SENTIMENT_BOUNDARIES, SENTIMENT_BUCKETS, UNSCORED, format_facets
+from indexes import apply_indexes_in_background
+from trending import RANKINGS_COLLECTION, build_snapshots, ensure_metrics_collection, ranking_key, record_snapshots
+from write_buffer import BulkWriteBuffer
+
+from .base import (
+    EXPORT_FIELDS, MEMBERSHIP_FIELDS, POST_QUERY_SORTS, TREND_PERCENTILES, DuplicateEmailError, Storage, next_day,
+    parse_filter_dates
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 1000
+
+# Trend percentile methods by the minimum server version that supports them, newest first. Both
+# pick exact nearest-rank values; $percentile (7.0+) is left out because it only approximates.
+PERCENTILE_METHODS = (((5, 2), "sort_array"), ((0, 0), "presorted"))
+
+# Post fields copied onto each membership so filtered stored-post queries can drop
+# non-matching memberships before the join; kept current on save and metrics refresh
+DENORMALIZED_POST_FIELDS = ("subreddit", "upvotes", "comments", "created_utc")
+
+
+def denormalized_post_fields(post: Dict[str, Any]) -> Dict[str, Any]:
+    """The membership copy of a post's filterable fields"""
+    copy = {field: post.get(field) for field in DENORMALIZED_POST_FIELDS}
+    copy["created_utc"] = to_datetime(copy["created_utc"])
+    return copy
+
+
+def build_export_pipeline(user_id: str, keyword: Optional[str] = None,
+                          start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Build the user_posts pipeline that joins memberships back to post content for export.
+
+    Only the export columns leave the server: the join projects the post fields
+    it needs, so body text and other large fields never cross the wire.
+    """
+    match = {"user_id": user_id}
+    if keyword:
+        match["keyword"] = keyword
+    if start_date or end_date:
+        match.update(date_match("search_ts", date_range(start_date, end_date)))
+
+    return [
+        {"$match": match},
+        {"$sort": {"search_ts": -1}},
+        {"$lookup": {"from": "posts", "localField": "post_id", "foreignField": "id", "as": "post", "pipeline": [
+            {"$project": {
+                "_id": 0,
+                **{field: 1 for field in EXPORT_FIELDS if field not in MEMBERSHIP_FIELDS},
+                "created_utc": epoch_seconds_expression("$created_utc")
+            }}
+        ]}},
+        {"$unwind": "$post"},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+            "$post",
+            {"keyword_searched": "$keyword", "search_timestamp": iso_expression("$search_ts")}
+        ]}}}
+    ]
+
+
+def build_sentiment_trend_pipeline(user_id: str, start_day: str, end_day: Optional[str] = None,
+                                   percentile_method: str = "sort_array") -> List[Dict[str, Any]]:
+    """Daily sentiment average, spread and percentiles over every post in the range.
+
+    The match and projection only touch fields in the (user_id, search_ts, sentiment_score)
+    index, so the scan is covered. Each day's scores are collected and percentiles
+    picked by nearest rank, like storage.sqlite and columnar.daily_sentiment.
+    `percentile_method` (see PERCENTILE_METHODS) picks how they are sorted: with
+    $sortArray on 5.2+, and by a $sort ahead of the $group before that.
+    """
+    ts_filter = {"$gte": to_datetime(start_day[:10])}
+    if end_day:
+        ts_filter["$lt"] = to_datetime(next_day(end_day))
+
+    group = {
+        "_id": day_expression("$search_ts"),
+        "avg_sentiment": {"$avg": "$sentiment_score"},
+        "std_sentiment": {"$stdDevPop": "$sentiment_score"},
+        # Unrounded, so callers can weight days exactly when combining them
+        "sentiment_sum": {"$sum": "$sentiment_score"},
+        "post_count": {"$sum": {"$cond": [{"$isNumber": "$sentiment_score"}, 1, 0]}}
+    }
+    presort: List[Dict[str, Any]] = []
+    group["scores"] = {"$push": "$sentiment_score"}
+    scores = {"$filter": {"input": "$scores", "cond": {"$isNumber": "$$this"}}}
+    if percentile_method == "sort_array":
+        scores = {"$sortArray": {"input": scores, "sortBy": 1}}
+    else:
+        # $push keeps input order, so sorting first leaves every day's scores sorted
+        presort = [{"$sort": {"sentiment_score": 1}}]
+    percentiles = {"$let": {
+        "vars": {"sorted": scores},
+        "in": [
+            {"$arrayElemAt": ["$$sorted", {"$floor": {"$multiply": [p, {"$subtract": [{"$size": "$$sorted"}, 1]}]}}]}
+            for p in TREND_PERCENTILES
+        ]
+    }}
+
+    return [
+        {"$match": {"user_id": user_id, **date_match("search_ts", ts_filter)}},
+        {"$project": {"_id": 0, "search_ts": 1, "sentiment_score": 1}},
+        *presort,
+        {"$group": group},
+        {"$match": {"post_count": {"$gt": 0}}},
+        {"$project": {
+            "avg_sentiment": {"$round": ["$avg_sentiment", 2]},
+            "std_sentiment": {"$round": ["$std_sentiment", 2]},
+            "sentiment_sum": 1,
+            "post_count": 1,
+            "p25": {"$round": [{"$arrayElemAt": [percentiles, 0]}, 2]},
+            "median": {"$round": [{"$arrayElemAt": [percentiles, 1]}, 2]},
+            "p75": {"$round": [{"$arrayElemAt": [percentiles, 2]}, 2]},
+            "p90": {"$round": [{"$arrayElemAt": [percentiles, 3]}, 2]}
+        }},
+        {"$sort": {"_id": -1}}
+    ]
+
+
+def build_post_query_stages(user_id: str, filters: Dict[str, Any], keyword: Optional[str] = None,
+                            sort: str = "recent") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """The user_posts $match and the posts $match for a stored-post query"""
+    sort_field = POST_QUERY_SORTS[sort]
+    match: Dict[str, Any] = {"user_id": user_id}
+    if keyword:
+        match["keyword"] = keyword
+
+    sentiment = {}
+    if filters.get("min_sentiment") is not None:
+        sentiment["$gte"] = filters["min_sentiment"]
+    if filters.get("max_sentiment") is not None:
+        sentiment["$lte"] = filters["max_sentiment"]
+    if sort_field == "sentiment_score":
+        sentiment.setdefault("$ne", None)
+    if sentiment:
+        match["sentiment_score"] = sentiment
+
+    post_match: Dict[str, Any] = {}
+    for field, low, high in (("upvotes", "min_upvotes", "max_upvotes"), ("comments", "min_comments", "max_comments")):
+        bounds = {}
+        if filters.get(low):
+            bounds["$gte"] = filters[low]
+        if filters.get(high) is not None:
+            bounds["$lte"] = filters[high]
+        if bounds:
+            post_match[field] = bounds
+    if filters.get("subreddit"):
+        post_match["subreddit"] = {"$regex": re.escape(filters["subreddit"]), "$options": "i"}
+    start_ts, end_ts = parse_filter_dates(filters)
+    if start_ts or end_ts:
+        post_match.update(date_match(
+            "created_utc", {k: to_datetime(v) for k, v in (("$gte", start_ts), ("$lte", end_ts)) if v}
+        ))
+
+    if post_match:
+        # The same filters run first on the membership copies (DENORMALIZED_POST_FIELDS), so
+        # only matching memberships reach the join. Memberships stored before the copies
+        # existed have no subreddit and fall through to the authoritative check on posts.
+        match["$and"] = [{"$or": [{"subreddit": {"$exists": False}}, post_match]}]
+
+    return match, post_match
+
+
+def build_post_query_pipeline(user_id: str, filters: Dict[str, Any], keyword: Optional[str] = None,
+                              sort: str = "recent", limit: int = 50,
+                              after: Optional[Tuple[Any, str, str]] = None) -> List[Dict[str, Any]]:
+    """Push SearchFilters down into an indexed user_posts scan joined to post content.
+
+    Membership filters (keyword, sentiment) and the keyset sort run on user_posts
+    indexes, and the post filters run on the membership copies before the $lookup,
+    so a page joins only rows that match. The lookup re-checks them against posts,
+    which guards against copies a concurrent refresh hasn't reached yet. A selective
+    post filter still walks the user's memberships in sort order, but without a join
+    per row.
+
+    A post stored under two keywords has two memberships with the same sort value and
+    post id, so keyword closes the keyset.
+
+    For the recent sort, `after` carries search_ts as stored on the last row (see
+    MongoStorage.query_posts). BSON sorts every date before every string, so pages
+    walk the migrated memberships newest first and then any unmigrated ones.
+    """
+    sort_field = POST_QUERY_SORTS[sort]
+    match, post_match = build_post_query_stages(user_id, filters, keyword, sort)
+    if after:
+        last_value, last_id, last_keyword = after
+        keyset = [
+            {sort_field: {"$lt": last_value}},
+            {sort_field: last_value, "post_id": {"$lt": last_id}},
+            {sort_field: last_value, "post_id": last_id, "keyword": {"$lt": last_keyword}},
+        ]
+        if isinstance(last_value, datetime):
+            # Comparisons never cross types, so the legacy strings after the dates need their own branch
+            keyset.append({sort_field: {"$type": "string"}})
+        match.setdefault("$and", []).append({"$or": keyset})
+    sort_keys = {sort_field: -1, "post_id": -1}
+    if not keyword:
+        # With a keyword filter every row shares it, and the keyword index covers the sort as is
+        sort_keys["keyword"] = -1
+
+    lookup_pipeline: List[Dict[str, Any]] = [{"$match": post_match}] if post_match else []
+    lookup_pipeline.append({"$project": {"_id": 0, "id": 1, "title": 1, "author": 1, "subreddit": 1, "upvotes": 1,
+                                         "url": 1, "comments": 1, "created_utc": epoch_seconds_expression("$created_utc"),
+                                         "permalink": 1, "body": 1, "summary": 1}})
+
+    return [
+        {"$match": match},
+        {"$sort": sort_keys},
+        {"$lookup": {"from": "posts", "localField": "post_id", "foreignField": "id",
+                     "pipeline": lookup_pipeline, "as": "post"}},
+        {"$unwind": "$post"},
+        {"$limit": limit},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+            "$post",
+            {"keyword_searched": "$keyword", "search_timestamp": iso_expression("$search_ts"),
+             "sentiment_score": "$sentiment_score"}
+        ]}}}
+    ]
+
+
+def build_post_facet_pipeline(user_id: str, filters: Dict[str, Any],
+                              keyword: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Subreddit, sentiment bucket and day counts over a stored-post query in one $facet pass.
+
+    The join only projects the two post fields the facets need, and $facet fans the
+    single filtered stream out to the three groupings.
+    """
+    match, post_match = build_post_query_stages(user_id, filters, keyword)
+    lookup_pipeline: List[Dict[str, Any]] = [{"$match": post_match}] if post_match else []
+    lookup_pipeline.append({"$project": {"_id": 0, "subreddit": 1, "created_utc": 1}})
+
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "post_id": 1, "sentiment_score": 1}},
+        {"$lookup": {"from": "posts", "localField": "post_id", "foreignField": "id",
+                     "pipeline": lookup_pipeline, "as": "post"}},
+        {"$unwind": "$post"},
+        {"$facet": {
+            "subreddit": [{"$group": {"_id": "$post.subreddit", "count": {"$sum": 1}}}],
+            "sentiment": [{"$bucket": {
+                "groupBy": "$sentiment_score", "boundaries": SENTIMENT_BOUNDARIES, "default": UNSCORED
+            }}],
+            "day": [{"$group": {
+                "_id": day_expression("$post.created_utc"),
+                "count": {"$sum": 1}
+            }}],
+        }}
+    ]
+
+
+class MongoStorage(Storage):
+    """MongoDB backend: normalized posts, user_posts memberships and metric snapshots"""
+
+    name = "mongo"
+
+    def __init__(self, mongo_url: str, db_name: str, write_batch_size: int = 500, write_flush_interval: float = 0.05):
+        self.client = MongoClient(mongo_url, tz_aware=True)
+        self.db = self.client[db_name]
+
+        self.users = self.db["users"]
+        self.keywords = self.db["keywords"]
+        self.posts = self.db["posts"]
+        self.user_posts = self.db["user_posts"]
+        self.searches = self.db["searches"]
+        self.archived_posts = self.db["archived_posts"]
+        self.versions = DataVersions(self.db["data_versions"])
+
+        # Coalesce post upserts from concurrent searches into unordered bulk writes
+        self.post_write_buffer = BulkWriteBuffer(self.posts, write_batch_size, write_flush_interval)
+        self.user_post_write_buffer = BulkWriteBuffer(self.user_posts, write_batch_size, write_flush_interval)
+
+        self._percentile_method = None
+
+    def ensure_schema(self):
+        # Index builds run in the background; the registry is idempotent across restarts
+        apply_indexes_in_background(self.db, before=lambda: ensure_metrics_collection(self.db))
+
+    async def flush(self):
+        await self.post_write_buffer.flush()
+        await self.user_post_write_buffer.flush()
+
+    def close(self):
+        self.client.close()
+
+    def percentile_method(self) -> str:
+        """The fastest trend percentile method the connected server supports"""
+        if self._percentile_method is None:
+            try:
+                version = tuple(self.client.server_info()["versionArray"][:2])
+            except Exception as e:
+                logger.warning(f"Could not determine MongoDB version: {e}")
+                return PERCENTILE_METHODS[-1][1]
+            self._percentile_method = next(method for minimum, method in PERCENTILE_METHODS if version >= minimum)
+        return self._percentile_method
+
+    # Users
+    def create_user(self, user: Dict[str, Any]):
+        try:
+            self.users.insert_one(dict(user))
+        except DuplicateKeyError:
+            raise DuplicateEmailError(user["email"])
+
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.users.find_one({"email": email}, {"_id": 0})
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.users.find_one({"id": user_id}, {"password": 0, "_id": 0})
+
+    def update_password_hash(self, user_id: str, password_hash: str):
+        self.users.update_one({"id": user_id}, {"$set": {"password": password_hash}})
+
+    # Saved keywords
+    def add_keyword(self, keyword: Dict[str, Any]):
+        self.keywords.insert_one(dict(keyword))
+
+    def list_active_keywords(self, user_id: str) -> List[Dict[str, Any]]:
+        return list(self.keywords.find({"user_id": user_id, "active": True}, {"_id": 0}))
+
+    def deactivate_keyword(self, user_id: str, keyword_id: str) -> bool:
+        result = self.keywords.update_one({"id": keyword_id, "user_id": user_id}, {"$set": {"active": False}})
+        return result.matched_count > 0
+
+    # Searches and their posts
+    async def save_search_results(self, search: Dict[str, Any], posts: List[Dict[str, Any]]):
+        self.searches.insert_one(dict(search))
+        user_id, keyword, search_timestamp = search["user_id"], search["keyword"], search["timestamp"]
+        search_ts = to_datetime(search_timestamp)
+
+        # Store post content once, and the user's membership separately
+        post_operations = []
+        membership_operations = []
+        copy_operations = []
+        for post in posts:
+            copy = denormalized_post_fields(post)
+            post_operations.append(UpdateOne(
+                {"id": post["id"]},
+                {"$set": {
+                    **{k: v for k, v in post.items() if k not in MEMBERSHIP_FIELDS},
+                    "created_utc": to_datetime(post["created_utc"])
+                }},
+                upsert=True
+            ))
+            membership_operations.append(UpdateOne(
+                {"user_id": user_id, "post_id": post["id"], "keyword": keyword},
+                {"$setOnInsert": {"search_ts": search_ts, "sentiment_score": post.get("sentiment_score"), **copy}},
+                upsert=True
+            ))
+            # Every user's membership copies follow the post's latest observed values
+            copy_operations.append(UpdateMany({"post_id": post["id"]}, {"$set": copy}))
+
+        post_outcomes, membership_outcomes, copy_outcomes = await asyncio.gather(
+            self.post_write_buffer.submit(post_operations),
+            self.user_post_write_buffer.submit(membership_operations),
+            self.user_post_write_buffer.submit(copy_operations)
+        )
+        for post, *outcomes in zip(posts, post_outcomes, membership_outcomes, copy_outcomes):
+            for outcome in outcomes:
+                if not outcome.ok:
+                    logger.warning(f"Error storing post {post['id']}: {outcome.error}")
+
+        if posts:
+            # A post found again is live, so its archived marker would count it twice
+            self.archived_posts.delete_many({"user_id": user_id, "post_id": {"$in": [post["id"] for post in posts]}})
+
+        # Every search is also an observation of each post's engagement
+        await asyncio.to_thread(record_snapshots, self.db, build_snapshots(posts))
+
+    def search_history(self, user_id: str, limit: int, keyword: Optional[str] = None,
+                       after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        query = {"user_id": user_id}
+        if keyword:
+            query["keyword"] = keyword
+        if after:
+            # Keyset on (timestamp, id): every page is a bounded index range, however deep
+            last_timestamp, last_id = after
+            query["timestamp"] = {"$lte": last_timestamp}
+            query["$or"] = [{"timestamp": {"$lt": last_timestamp}}, {"id": {"$lt": last_id}}]
+        return list(self.searches.find(query, {"_id": 0}).sort([("timestamp", -1), ("id", -1)]).limit(limit))
+
+    def count_searches(self, user_id: str) -> int:
+        return self.searches.count_documents({"user_id": user_id})
+
+    def keyword_stats(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return list(self.searches.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {
+                "_id": "$keyword",
+                "search_count": {"$sum": 1},
+                "total_posts": {"$sum": "$post_count"},
+                "avg_sentiment": {"$avg": "$avg_sentiment"},
+                "last_search": {"$max": "$timestamp"}
+            }},
+            {"$sort": {"search_count": -1}},
+            {"$limit": limit}
+        ]))
+
+    def count_user_posts(self, user_id: str) -> int:
+        result = list(self.user_posts.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": "$post_id"}},
+            {"$count": "total"}
+        ]))
+        total = result[0]["total"] if result else 0
+        # Retention leaves a marker for each post with no live membership left (archive.mark_archived_posts)
+        return total + self.archived_posts.count_documents({"user_id": user_id})
+
+    def sentiment_trends(self, user_id: str, start_day: str, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        return list(self.user_posts.aggregate(
+            build_sentiment_trend_pipeline(user_id, start_day, end_day, self.percentile_method()),
+            allowDiskUse=True
+        ))
+
+    def iter_export_rows(self, user_id: str, keyword: Optional[str] = None, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        return self.user_posts.aggregate(build_export_pipeline(user_id, keyword, start_date, end_date),
+                                         batchSize=EXPORT_BATCH_SIZE)
+
+    def query_posts(self, user_id: str, filters: Dict[str, Any], keyword: Optional[str] = None,
+                    sort: str = "recent", limit: int = 50,
+                    after: Optional[Tuple[Any, str, str]] = None) -> List[Dict[str, Any]]:
+        if after and POST_QUERY_SORTS[sort] == "search_ts":
+            after = (self._stored_search_ts(user_id, *after), after[1], after[2])
+        return list(self.user_posts.aggregate(build_post_query_pipeline(user_id, filters, keyword, sort, limit, after)))
+
+    def _stored_search_ts(self, user_id: str, search_timestamp: str, post_id: str, keyword: str) -> Any:
+        """search_ts of a cursor's row as stored: a date, or the ISO string of an unmigrated row.
+
+        Cursors carry the formatted timestamp the API returned, which can't tell the two
+        apart, so the row is read back through the unique membership index.
+        """
+        row = self.user_posts.find_one({"user_id": user_id, "post_id": post_id, "keyword": keyword},
+                                       {"_id": 0, "search_ts": 1})
+        if row is None or row.get("search_ts") is None:
+            return to_datetime(search_timestamp)
+        return to_datetime(row["search_ts"]) if isinstance(row["search_ts"], datetime) else row["search_ts"]
+
+    def post_facets(self, user_id: str, filters: Dict[str, Any],
+                    keyword: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        result = next(self.user_posts.aggregate(build_post_facet_pipeline(user_id, filters, keyword)))
+        # $bucket labels buckets by their lower boundary
+        bucket_names = dict(zip(SENTIMENT_BOUNDARIES, SENTIMENT_BUCKETS))
+        return format_facets(
+            {row["_id"]: row["count"] for row in result["subreddit"]},
+            {bucket_names.get(row["_id"], UNSCORED): row["count"] for row in result["sentiment"]},
+            {row["_id"]: row["count"] for row in result["day"]},
+        )
+
+    def trending_rankings(self, user_id: str, keywords: List[str]) -> List[Dict[str, Any]]:
+        ids = [ranking_key(user_id, keyword) for keyword in keywords]
+        return [{**ranking, "keyword": ranking["_id"]["keyword"]}
+                for ranking in self.db[RANKINGS_COLLECTION].find({"_id": {"$in": ids}})]
+
+    # Per-user data versions
+    def get_versions(self, user_id: str) -> Dict[str, int]:
+        return self.versions.get(user_id)
+
+    def bump_versions(self, user_id: str, *scopes: str) -> Dict[str, int]:
+        return self.versions.bump(user_id, *scopes)
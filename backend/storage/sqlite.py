@@ -0,0 +1,419 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from facets import SENTIMENT_BOUNDARIES, SENTIMENT_BUCKETS, UNSCORED, format_facets
+
+from .base import (
+    EXPORT_FIELDS, MEMBERSHIP_FIELDS, POST_QUERY_SORTS, TREND_PERCENTILES, DuplicateEmailError, Storage, next_day,
+    parse_filter_dates
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS keywords (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS keywords_user_keyword ON keywords (user_id, keyword, subreddit);
+
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT,
+    subreddit TEXT NOT NULL,
+    upvotes INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    comments INTEGER NOT NULL,
+    created_utc REAL NOT NULL,
+    permalink TEXT NOT NULL,
+    body TEXT,
+    sentiment_score REAL,
+    summary TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_posts (
+    user_id TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    search_ts TEXT NOT NULL,
+    sentiment_score REAL,
+    PRIMARY KEY (user_id, post_id, keyword)
+) WITHOUT ROWID;
+-- Superseded by the keyword-terminated keyset indexes below
+DROP INDEX IF EXISTS user_posts_user_ts_post;
+DROP INDEX IF EXISTS user_posts_user_sentiment;
+CREATE INDEX IF NOT EXISTS user_posts_user_ts ON user_posts (user_id, search_ts DESC, sentiment_score);
+CREATE INDEX IF NOT EXISTS user_posts_user_ts_post_keyword ON user_posts (user_id, search_ts DESC, post_id DESC, keyword DESC);
+CREATE INDEX IF NOT EXISTS user_posts_user_keyword_ts ON user_posts (user_id, keyword, search_ts DESC, post_id DESC);
+CREATE INDEX IF NOT EXISTS user_posts_user_sentiment_keyword ON user_posts (user_id, sentiment_score DESC, post_id DESC, keyword DESC);
+
+CREATE TABLE IF NOT EXISTS searches (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    post_count INTEGER NOT NULL,
+    avg_sentiment REAL
+);
+CREATE INDEX IF NOT EXISTS searches_user_ts ON searches (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS searches_user_keyword_ts ON searches (user_id, keyword, timestamp DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (user_id, scope)
+) WITHOUT ROWID;
+"""
+
+POST_COLUMNS = ["id", "title", "author", "subreddit", "upvotes", "url", "comments",
+                "created_utc", "permalink", "body", "sentiment_score", "summary"]
+
+UPSERT_POST = (
+    f"INSERT INTO posts ({', '.join(POST_COLUMNS)}) VALUES ({', '.join('?' for _ in POST_COLUMNS)}) "
+    "ON CONFLICT (id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in POST_COLUMNS[1:])
+)
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def nearest_rank(sorted_scores: List[float], p: float) -> float:
+    # Same rule as the Mongo trend pipeline, so both backends agree
+    return sorted_scores[int(p * (len(sorted_scores) - 1))]
+
+
+def build_filter_clause(filters: Dict[str, Any], post_alias: str, sentiment_column: str) -> Tuple[str, list]:
+    """SearchFilters as " AND ..." SQL conditions over a posts-shaped table, with their parameters"""
+    start_ts, end_ts = parse_filter_dates(filters)
+    conditions = [
+        (f"{post_alias}.upvotes >= ?", filters.get("min_upvotes") or None),
+        (f"{post_alias}.upvotes <= ?", filters.get("max_upvotes")),
+        (f"{post_alias}.comments >= ?", filters.get("min_comments") or None),
+        (f"{post_alias}.comments <= ?", filters.get("max_comments")),
+        (f"{post_alias}.created_utc >= ?", start_ts),
+        (f"{post_alias}.created_utc <= ?", end_ts),
+        (f"{sentiment_column} >= ?", filters.get("min_sentiment")),
+        (f"{sentiment_column} <= ?", filters.get("max_sentiment")),
+    ]
+    sql = ""
+    params = []
+    for condition, value in conditions:
+        if value is not None:
+            sql += f" AND {condition}"
+            params.append(value)
+    if filters.get("subreddit"):
+        sql += f" AND {post_alias}.subreddit LIKE ? ESCAPE '\\'"
+        escaped = filters["subreddit"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    return sql, params
+
+
+class SQLiteStorage(Storage):
+    """Embedded SQLite backend for small deployments and CI.
+
+    One connection per process in WAL mode, so readers in other worker processes
+    never block on the writer. Statements are parameterized constants, which lets
+    sqlite3's statement cache reuse the prepared forms; post batches go through
+    executemany inside a single transaction.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA busy_timeout = 5000")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self._lock = threading.RLock()
+
+    def ensure_schema(self):
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self.conn.execute(sql, params)
+
+    # Users
+    def create_user(self, user: Dict[str, Any]):
+        try:
+            self._execute(
+                "INSERT INTO users (id, email, password, full_name, created_at, is_active) VALUES (?, ?, ?, ?, ?, ?)",
+                (user["id"], user["email"], user["password"], user["full_name"], user["created_at"],
+                 int(user.get("is_active", True)))
+            )
+        except sqlite3.IntegrityError:
+            raise DuplicateEmailError(user["email"])
+
+    @staticmethod
+    def _user(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if row is not None:
+            row["is_active"] = bool(row["is_active"])
+        return row
+
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM users WHERE email = ?", (email,))
+        return self._user(rows[0]) if rows else None
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT id, email, full_name, created_at, is_active FROM users WHERE id = ?", (user_id,)
+        )
+        return self._user(rows[0]) if rows else None
+
+    def update_password_hash(self, user_id: str, password_hash: str):
+        self._execute("UPDATE users SET password = ? WHERE id = ?", (password_hash, user_id))
+
+    # Saved keywords
+    def add_keyword(self, keyword: Dict[str, Any]):
+        self._execute(
+            "INSERT INTO keywords (id, user_id, keyword, subreddit, created_at, active) VALUES (?, ?, ?, ?, ?, ?)",
+            (keyword["id"], keyword["user_id"], keyword["keyword"], keyword["subreddit"], keyword["created_at"],
+             int(keyword.get("active", True)))
+        )
+
+    def list_active_keywords(self, user_id: str) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT id, user_id, keyword, subreddit, created_at, active FROM keywords WHERE user_id = ? AND active = 1",
+            (user_id,)
+        )
+        for row in rows:
+            row["active"] = bool(row["active"])
+        return rows
+
+    def deactivate_keyword(self, user_id: str, keyword_id: str) -> bool:
+        cursor = self._execute("UPDATE keywords SET active = 0 WHERE id = ? AND user_id = ?", (keyword_id, user_id))
+        return cursor.rowcount > 0
+
+    # Searches and their posts
+    def _save_search_results(self, search: Dict[str, Any], posts: List[Dict[str, Any]]):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "INSERT INTO searches (id, user_id, keyword, subreddit, timestamp, post_count, avg_sentiment) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (search["id"], search["user_id"], search["keyword"], search["subreddit"], search["timestamp"],
+                     search["post_count"], search.get("avg_sentiment"))
+                )
+                self.conn.executemany(UPSERT_POST, [tuple(post.get(column) for column in POST_COLUMNS) for post in posts])
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO user_posts (user_id, post_id, keyword, search_ts, sentiment_score) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(search["user_id"], post["id"], search["keyword"], search["timestamp"], post.get("sentiment_score"))
+                     for post in posts]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    async def save_search_results(self, search: Dict[str, Any], posts: List[Dict[str, Any]]):
+        try:
+            await asyncio.to_thread(self._save_search_results, search, posts)
+        except Exception as e:
+            logger.warning(f"Error storing {len(posts)} posts for search {search['id']}: {e}")
+
+    def search_history(self, user_id: str, limit: int, keyword: Optional[str] = None,
+                       after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT id, user_id, keyword, subreddit, timestamp, post_count, avg_sentiment FROM searches WHERE user_id = ?"
+        params: list = [user_id]
+        if keyword:
+            sql += " AND keyword = ?"
+            params.append(keyword)
+        if after:
+            sql += " AND (timestamp, id) < (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def count_searches(self, user_id: str) -> int:
+        return self._query("SELECT COUNT(*) AS total FROM searches WHERE user_id = ?", (user_id,))[0]["total"]
+
+    def keyword_stats(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT keyword AS _id, COUNT(*) AS search_count, SUM(post_count) AS total_posts, "
+            "AVG(avg_sentiment) AS avg_sentiment, MAX(timestamp) AS last_search "
+            "FROM searches WHERE user_id = ? GROUP BY keyword ORDER BY search_count DESC LIMIT ?",
+            (user_id, limit)
+        )
+
+    def count_user_posts(self, user_id: str) -> int:
+        return self._query(
+            "SELECT COUNT(DISTINCT post_id) AS total FROM user_posts WHERE user_id = ?", (user_id,)
+        )[0]["total"]
+
+    def _range(self, start_day: str, end_day: Optional[str]) -> Tuple[str, str]:
+        # search_ts is ISO text, so day bounds compare lexicographically
+        return start_day[:10], next_day(end_day) if end_day else "9999-12-31"
+
+    def sentiment_trends(self, user_id: str, start_day: str, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        start, end = self._range(start_day, end_day)
+        rows = self._query(
+            "SELECT substr(search_ts, 1, 10) AS day, sentiment_score FROM user_posts "
+            "WHERE user_id = ? AND search_ts >= ? AND search_ts < ? AND sentiment_score IS NOT NULL "
+            "ORDER BY day DESC, sentiment_score",
+            (user_id, start, end)
+        )
+        days: Dict[str, List[float]] = {}
+        for row in rows:
+            days.setdefault(row["day"], []).append(row["sentiment_score"])
+
+        trends = []
+        for day, scores in days.items():
+            mean = sum(scores) / len(scores)
+            variance = sum((score - mean) ** 2 for score in scores) / len(scores)
+            percentiles = [round(nearest_rank(scores, p), 2) for p in TREND_PERCENTILES]
+            trends.append({
+                "_id": day,
+                "avg_sentiment": round(mean, 2),
+                "std_sentiment": round(variance ** 0.5, 2),
+                "sentiment_sum": sum(scores),
+                "post_count": len(scores),
+                "p25": percentiles[0],
+                "median": percentiles[1],
+                "p75": percentiles[2],
+                "p90": percentiles[3]
+            })
+        return trends
+
+    def iter_export_rows(self, user_id: str, keyword: Optional[str] = None, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        sql = (
+            f"SELECT {', '.join(f'p.{field}' for field in EXPORT_FIELDS if field not in MEMBERSHIP_FIELDS)}, "
+            "up.keyword AS keyword_searched, up.search_ts AS search_timestamp "
+            "FROM user_posts up JOIN posts p ON p.id = up.post_id WHERE up.user_id = ?"
+        )
+        params: list = [user_id]
+        if keyword:
+            sql += " AND up.keyword = ?"
+            params.append(keyword)
+        if start_date:
+            sql += " AND up.search_ts >= ?"
+            params.append(start_date)
+        if end_date and len(end_date) == 10:
+            # A date-only end covers that whole day, as date_range does for MongoDB
+            sql += " AND up.search_ts < ?"
+            params.append(next_day(end_date))
+        elif end_date:
+            sql += " AND up.search_ts <= ?"
+            params.append(end_date)
+        sql += " ORDER BY up.search_ts DESC"
+
+        # A dedicated cursor, fetched in chunks so the shared connection isn't held for the whole export
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, tuple(params))
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+
+    def query_posts(self, user_id: str, filters: Dict[str, Any], keyword: Optional[str] = None,
+                    sort: str = "recent", limit: int = 50,
+                    after: Optional[Tuple[Any, str, str]] = None) -> List[Dict[str, Any]]:
+        sort_field = f"up.{POST_QUERY_SORTS[sort]}"
+        sql = (
+            "SELECT p.id, p.title, p.author, p.subreddit, p.upvotes, p.url, p.comments, p.created_utc, "
+            "p.permalink, p.body, p.summary, up.sentiment_score, up.keyword AS keyword_searched, "
+            "up.search_ts AS search_timestamp "
+            "FROM user_posts up JOIN posts p ON p.id = up.post_id WHERE up.user_id = ?"
+        )
+        params: list = [user_id]
+        if keyword:
+            sql += " AND up.keyword = ?"
+            params.append(keyword)
+
+        clause, clause_params = build_filter_clause(filters, "p", "up.sentiment_score")
+        sql += clause
+        params.extend(clause_params)
+        if sort == "sentiment":
+            sql += " AND up.sentiment_score IS NOT NULL"
+        if after:
+            sql += f" AND ({sort_field}, up.post_id, up.keyword) < (?, ?, ?)"
+            params.extend(after)
+
+        sql += f" ORDER BY {sort_field} DESC, up.post_id DESC, up.keyword DESC LIMIT ?"
+        params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def post_facets(self, user_id: str, filters: Dict[str, Any],
+                    keyword: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        # One grouped scan over the filtered join; the three facets are folded from its groups
+        sql = (
+            "SELECT p.subreddit, CASE " + " ".join(
+                f"WHEN up.sentiment_score < {upper} THEN '{name}'"
+                for upper, name in zip(SENTIMENT_BOUNDARIES[1:], SENTIMENT_BUCKETS)
+            ) + f" ELSE '{UNSCORED}' END AS bucket, "  # NULL scores fall through to unscored
+            "strftime('%Y-%m-%d', p.created_utc, 'unixepoch') AS day, COUNT(*) AS count "
+            "FROM user_posts up JOIN posts p ON p.id = up.post_id WHERE up.user_id = ?"
+        )
+        params: list = [user_id]
+        if keyword:
+            sql += " AND up.keyword = ?"
+            params.append(keyword)
+        clause, clause_params = build_filter_clause(filters, "p", "up.sentiment_score")
+        sql += clause + " GROUP BY 1, 2, 3"
+        params.extend(clause_params)
+
+        subreddits: Dict[str, int] = {}
+        sentiments: Dict[str, int] = {}
+        days: Dict[str, int] = {}
+        for row in self._query(sql, tuple(params)):
+            for counts, value in ((subreddits, row["subreddit"]), (sentiments, row["bucket"]), (days, row["day"])):
+                counts[value] = counts.get(value, 0) + row["count"]
+        return format_facets(subreddits, sentiments, days)
+
+    # Per-user data versions
+    def get_versions(self, user_id: str) -> Dict[str, int]:
+        rows = self._query("SELECT scope, version FROM data_versions WHERE user_id = ?", (user_id,))
+        return {row["scope"]: row["version"] for row in rows}
+
+    def bump_versions(self, user_id: str, *scopes: str) -> Dict[str, int]:
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO data_versions (user_id, scope, version) VALUES (?, ?, 1) "
+                "ON CONFLICT (user_id, scope) DO UPDATE SET version = version + 1",
+                [(user_id, scope) for scope in scopes]
+            )
+        return self.get_versions(user_id)
@@ -0,0 +1,160 @@
+"""Post metric snapshots and velocity-based trending rankings.
+
+Every time we observe a post's upvotes and comments (at search time, or from the
+metric refresh job) a snapshot goes into the post_metrics time-series collection.
+The ranking job then rescores only posts with new snapshots since its last run and
+rebuilds the precomputed top-N for the tracked keywords those posts belong to.
+Rankings are kept per (user, keyword) from that user's own memberships, so no
+user is served posts another user's searches stored.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid
+
+from dates import date_match, epoch_seconds_expression, to_datetime
+
+logger = logging.getLogger(__name__)
+
+METRICS_COLLECTION = "post_metrics"
+RANKINGS_COLLECTION = "trending_rankings"
+TRENDING_WINDOW_HOURS = 48
+
+
+def calculate_trending_score(upvotes: int, comments: int, age_hours: float) -> float:
+    """Calculate trending score based on engagement and time"""
+    if age_hours <= 0:
+        age_hours = 0.1
+
+    # Simple trending formula: (upvotes + comments * 2) / age_hours
+    trending_score = (upvotes + comments * 2) / age_hours
+    return round(trending_score, 2)
+
+
+def calculate_velocity_score(previous: Dict[str, Any], latest: Dict[str, Any]) -> float:
+    """Engagement gained per hour between two snapshots of the same post"""
+    hours = (latest["ts"] - previous["ts"]).total_seconds() / 3600
+    if hours <= 0:
+        hours = 0.1
+    gained = (latest["upvotes"] + latest["comments"] * 2) - (previous["upvotes"] + previous["comments"] * 2)
+    return round(max(gained, 0) / hours, 2)
+
+
+def ensure_metrics_collection(db, retention_days: int = 14):
+    """Create the post_metrics time-series collection if it doesn't exist yet"""
+    try:
+        db.create_collection(
+            METRICS_COLLECTION,
+            timeseries={"timeField": "ts", "metaField": "post_id", "granularity": "minutes"},
+            expireAfterSeconds=retention_days * 86400
+        )
+        logger.info(f"Created time-series collection {METRICS_COLLECTION}")
+    except CollectionInvalid:
+        pass
+
+
+def build_snapshots(posts: Iterable[Dict[str, Any]], observed_at: datetime = None) -> List[Dict[str, Any]]:
+    """Snapshot documents for posts given as dicts with id, upvotes and comments"""
+    observed_at = observed_at or datetime.now(timezone.utc)
+    return [
+        {"ts": observed_at, "post_id": post["id"], "upvotes": post["upvotes"], "comments": post["comments"]}
+        for post in posts
+    ]
+
+
+def record_snapshots(db, snapshots: List[Dict[str, Any]]):
+    if snapshots:
+        db[METRICS_COLLECTION].insert_many(snapshots, ordered=False)
+
+
+def rescore_posts(db, since: datetime, now: datetime) -> List[str]:
+    """Recompute trending scores for posts with snapshots newer than `since`; returns their ids"""
+    metrics = db[METRICS_COLLECTION]
+    changed_ids = metrics.distinct("post_id", {"ts": {"$gt": since}})
+    if not changed_ids:
+        return []
+
+    window_start = now - timedelta(hours=TRENDING_WINDOW_HOURS)
+    latest_snapshots = list(metrics.aggregate([
+        {"$match": {"post_id": {"$in": changed_ids}, "ts": {"$gte": window_start}}},
+        {"$sort": {"post_id": 1, "ts": -1}},
+        {"$group": {"_id": "$post_id", "snapshots": {"$push": {"ts": "$ts", "upvotes": "$upvotes", "comments": "$comments"}}}},
+        {"$project": {"snapshots": {"$slice": ["$snapshots", 2]}}}
+    ], allowDiskUse=True))
+
+    # Posts observed only once fall back to engagement over the post's age
+    single_ids = [doc["_id"] for doc in latest_snapshots if len(doc["snapshots"]) == 1]
+    created_at = {
+        post["id"]: post.get("created_utc")
+        for post in db["posts"].find({"id": {"$in": single_ids}}, {"_id": 0, "id": 1, "created_utc": 1})
+    } if single_ids else {}
+
+    operations = []
+    for doc in latest_snapshots:
+        snapshots = doc["snapshots"]
+        latest = snapshots[0]
+        if len(snapshots) > 1:
+            score = calculate_velocity_score(snapshots[1], latest)
+        else:
+            created = to_datetime(created_at.get(doc["_id"]))
+            age_hours = (now - created).total_seconds() / 3600 if created else TRENDING_WINDOW_HOURS
+            score = calculate_trending_score(latest["upvotes"], latest["comments"], age_hours)
+        operations.append(UpdateOne(
+            {"id": doc["_id"]},
+            {"$set": {"trending_score": score, "trending_updated_at": now}}
+        ))
+
+    if operations:
+        db["posts"].bulk_write(operations, ordered=False)
+    return changed_ids
+
+
+def ranking_key(user_id: str, keyword: str) -> Dict[str, str]:
+    """_id of a user's ranking for a keyword; embedded _ids match by field order, so always build them here"""
+    return {"user_id": user_id, "keyword": keyword}
+
+
+def rebuild_rankings(db, tracked: Iterable[Tuple[str, str]], now: datetime, top_n: int = 25):
+    """Store the top-N trending posts of the trending window for each (user_id, keyword)"""
+    window_start = now - timedelta(hours=TRENDING_WINDOW_HOURS)
+    for user_id, keyword in tracked:
+        post_ids = db["user_posts"].distinct("post_id", {
+            "user_id": user_id, "keyword": keyword, **date_match("search_ts", {"$gte": to_datetime(window_start)})
+        })
+        top_posts = list(db["posts"].find(
+            {"id": {"$in": post_ids}, "trending_score": {"$ne": None}},
+            {"_id": 0, "id": 1, "title": 1, "subreddit": 1, "permalink": 1,
+             "upvotes": 1, "comments": 1, "created_utc": epoch_seconds_expression("$created_utc"), "trending_score": 1}
+        ).sort("trending_score", -1).limit(top_n))
+        ranking_id = ranking_key(user_id, keyword)
+        db[RANKINGS_COLLECTION].replace_one(
+            {"_id": ranking_id}, {"_id": ranking_id, "posts": top_posts, "updated_at": now}, upsert=True
+        )
+
+
+def update_trending(db, top_n: int = 25):
+    """One incremental ranking pass: rescore changed posts and rebuild affected rankings"""
+    now = datetime.now(timezone.utc)
+    state = db["job_state"].find_one({"_id": "trending"}) or {}
+    since = state.get("last_run") or (now - timedelta(hours=TRENDING_WINDOW_HOURS))
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Overlap the previous run slightly so snapshots committed late aren't skipped; rescoring is idempotent
+    since -= timedelta(minutes=1)
+
+    changed_ids = rescore_posts(db, since, now)
+    if changed_ids:
+        tracked = {(doc["_id"]["user_id"], doc["_id"]["keyword"]) for doc in db["keywords"].aggregate([
+            {"$match": {"active": True}},
+            {"$group": {"_id": {"user_id": "$user_id", "keyword": "$keyword"}}}
+        ])}
+        affected = {(doc["_id"]["user_id"], doc["_id"]["keyword"]) for doc in db["user_posts"].aggregate([
+            {"$match": {"post_id": {"$in": changed_ids}}},
+            {"$group": {"_id": {"user_id": "$user_id", "keyword": "$keyword"}}}
+        ])}
+        rebuild_rankings(db, tracked & affected, now, top_n)
+        logger.info(f"Rescored {len(changed_ids)} posts, rebuilt {len(tracked & affected)} trending rankings")
+
+    db["job_state"].update_one({"_id": "trending"}, {"$set": {"last_run": now}}, upsert=True)
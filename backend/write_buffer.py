@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteOutcome:
+    """Result of a single buffered write operation"""
+    ok: bool
+    upserted: bool = False
+    error: Optional[str] = None
+
+
+class BulkWriteBuffer:
+    """Write-behind buffer that coalesces write operations into unordered bulk_write calls.
+
+    Operations submitted by concurrent requests are queued and flushed together,
+    either when `max_ops` operations are pending or `flush_interval` seconds after
+    the first pending operation arrived, whichever comes first. Every caller gets
+    back one WriteOutcome per submitted operation.
+    """
+
+    def __init__(self, collection, max_ops: int = 500, flush_interval: float = 0.05):
+        self.collection = collection
+        self.max_ops = max_ops
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+
+    async def submit(self, operations: List[Any]) -> List[WriteOutcome]:
+        """Queue operations and wait until the batch containing them is written"""
+        if not operations:
+            return []
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in operations]
+        self._pending.extend(zip(operations, futures))
+
+        if len(self._pending) >= self.max_ops:
+            # Flush in the background: flush() drains whatever keeps arriving, and this
+            # caller only needs to wait for its own operations
+            self._cancel_timer()
+            asyncio.ensure_future(self.flush())
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, lambda: asyncio.ensure_future(self.flush()))
+
+        return list(await asyncio.gather(*futures))
+
+    async def flush(self):
+        """Write every pending operation in one or more bulk_write calls"""
+        self._cancel_timer()
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.max_ops]
+                self._pending = self._pending[self.max_ops:]
+                outcomes = await asyncio.to_thread(self._write, [op for op, _ in batch])
+                for (_, future), outcome in zip(batch, outcomes):
+                    if not future.done():
+                        future.set_result(outcome)
+
+    def _write(self, operations: List[Any]) -> List[WriteOutcome]:
+        outcomes = [WriteOutcome(ok=True) for _ in operations]
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            upserted_indexes = result.upserted_ids.keys()
+        except BulkWriteError as e:
+            details = e.details or {}
+            upserted_indexes = [item["index"] for item in details.get("upserted", [])]
+            for error in details.get("writeErrors", []):
+                outcomes[error["index"]] = WriteOutcome(ok=False, error=error.get("errmsg", "write error"))
+        except Exception as e:
+            logger.error(f"Bulk write to {self.collection.name} failed: {e}")
+            return [WriteOutcome(ok=False, error=str(e)) for _ in operations]
+
+        for index in upserted_indexes:
+            outcomes[index].upserted = True
+        return outcomes
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
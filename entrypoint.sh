@@ -4,9 +4,9 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
-echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+echo "Starting FastAPI backend with ${WEB_CONCURRENCY:-1} worker(s)"
+# Start Uvicorn with proper host binding; each worker process opens its own clients
+uvicorn server:app --host 0.0.0.0 --port 8001 --workers "${WEB_CONCURRENCY:-1}" &
 BACKEND_PID=$!
 
 echo "Waiting for backend to start..."
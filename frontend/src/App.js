@@ -263,7 +263,7 @@ function App() {
       const response = await makeAuthenticatedRequest('/api/search-history');
       if (response.ok) {
         const data = await response.json();
-        setSearchHistory(data || []);
+        setSearchHistory(data.items || []);
       }
     } catch (error) {
       console.error('Error fetching search history:', error);
@@ -418,14 +418,14 @@ function App() {
       const response = await makeAuthenticatedRequest(`/api/export/csv?${params.toString()}`);
 
       if (response.ok) {
-        const data = await response.json();
-        
-        // Create and download CSV file
-        const blob = new Blob([data.content], { type: 'text/csv' });
+        // The CSV is streamed as a file download; the filename comes from Content-Disposition
+        const blob = await response.blob();
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="([^"]+)"/);
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
-        a.download = data.filename;
+        a.download = match ? match[1] : 'reddit_posts.csv';
         document.body.appendChild(a);
         a.click();
         window.URL.revokeObjectURL(url);
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend is run from its own directory (see Procfile), so its modules are imported top-level
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from archive import SEARCHES_SCHEMA, USER_POSTS_SCHEMA, ArchiveReader, write_partitions
+
+
+def membership(i, day="2024-01-05", user_id="u1"):
+    return {"membership_id": f"m{i}", "user_id": user_id, "post_id": f"p{i}", "keyword": "python",
+            "search_ts": f"{day}T10:00:00+00:00", "sentiment_score": float(i % 10), "title": f"Post {i}",
+            "subreddit": "python", "upvotes": i, "comments": 0, "created_utc": 1704067200.0 + i}
+
+
+def test_rerun_after_interrupted_batch_is_idempotent(tmp_path):
+    rows = [membership(i) for i in range(5)] + [membership(i, day="2024-01-06") for i in range(5, 8)]
+    write_partitions(str(tmp_path), "user_posts", USER_POSTS_SCHEMA, rows, "search_ts", "membership_id")
+    # The deletes never ran, so the next run sees the same rows again plus newer ones
+    rerun = rows + [membership(8), membership(9, day="2024-01-07")]
+    write_partitions(str(tmp_path), "user_posts", USER_POSTS_SCHEMA, rerun, "search_ts", "membership_id")
+
+    reader = ArchiveReader(str(tmp_path))
+    ids = sorted(row["id"] for row in reader.iter_user_posts("u1"))
+    assert ids == [f"p{i}" for i in range(10)]
+    assert sum(day["post_count"] for day in reader.sentiment_trends("u1", None, None)) == 10
+    memberships = [row for rows in reader.iter_memberships(batch_size=4) for row in rows]
+    assert sorted(row["post_id"] for row in memberships) == [f"p{i}" for i in range(10)]
+
+
+def test_searches_are_keyed_by_id(tmp_path):
+    search = {"id": "s1", "user_id": "u1", "keyword": "python", "subreddit": "all",
+              "timestamp": "2024-01-05T10:00:00+00:00", "post_count": 3, "avg_sentiment": 5.0}
+    for _ in range(2):
+        write_partitions(str(tmp_path), "searches", SEARCHES_SCHEMA, [search], "timestamp", "id")
+    assert ArchiveReader(str(tmp_path)).count_searches("u1") == 1
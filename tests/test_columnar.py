@@ -0,0 +1,84 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from columnar import daily_sentiment, filter_rows
+
+
+def make_posts(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"p{i}", "subreddit": rng.choice(["python", "learnpython", "rust", "golang"]),
+            "upvotes": rng.randint(0, 500), "comments": rng.randint(0, 80),
+            "created_utc": 1700000000.0 + rng.uniform(0, 30 * 86400),
+            "sentiment_score": None if i % 11 == 0 else round(rng.uniform(0, 10), 2),
+        }
+        for i in range(count)
+    ]
+
+
+def reference_filter(posts, filters, start_ts=None, end_ts=None):
+    """The per-post loop the endpoint used before, over dicts"""
+    kept = []
+    for post in posts:
+        score = post["sentiment_score"]
+        if filters.get("min_upvotes") is not None and post["upvotes"] < filters["min_upvotes"]:
+            continue
+        if filters.get("max_upvotes") is not None and post["upvotes"] > filters["max_upvotes"]:
+            continue
+        if filters.get("min_comments") is not None and post["comments"] < filters["min_comments"]:
+            continue
+        if filters.get("subreddit") and filters["subreddit"].lower() not in post["subreddit"].lower():
+            continue
+        if start_ts and post["created_utc"] < start_ts:
+            continue
+        if end_ts and post["created_utc"] > end_ts:
+            continue
+        if filters.get("min_sentiment") is not None and (score is None or score < filters["min_sentiment"]):
+            continue
+        if filters.get("max_sentiment") is not None and (score is None or score > filters["max_sentiment"]):
+            continue
+        kept.append(post)
+    return kept
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"min_upvotes": 100, "max_upvotes": 300},
+    {"min_comments": 10, "subreddit": "PYTHON"},
+    {"min_sentiment": 2.5, "max_sentiment": 7.5},
+    {"start_date": "2023-11-20T00:00:00Z", "end_date": "2023-12-01T00:00:00+00:00", "subreddit": "rust"},
+])
+def test_filter_rows_matches_reference_loop(filters):
+    posts = make_posts(2000)
+    start_ts = 1700438400.0 if filters.get("start_date") else None
+    end_ts = 1701388800.0 if filters.get("end_date") else None
+
+    models = [SimpleNamespace(**post) for post in posts]
+    expected = reference_filter(posts, filters, start_ts, end_ts)
+    assert [post.id for post in filter_rows(models, filters)] == [post["id"] for post in expected]
+
+
+def test_filter_rows_empty():
+    assert filter_rows([], {"subreddit": "python", "min_sentiment": 1}) == []
+
+
+def test_daily_sentiment_matches_live_trends():
+    days = ["2024-01-01"] * 5 + ["2024-01-02"] * 4 + ["2024-01-03"]
+    scores = [1.0, 5.0, 2.0, 4.0, 3.0, 9.0, None, 7.0, 8.0, None]
+
+    trends = daily_sentiment(days, [np.nan if s is None else s for s in scores])
+    assert [t["_id"] for t in trends] == ["2024-01-02", "2024-01-01"]
+
+    first = trends[1]
+    expected = np.array([1.0, 5.0, 2.0, 4.0, 3.0])
+    assert first["post_count"] == 5 and first["avg_sentiment"] == 3.0 and first["sentiment_sum"] == 15.0
+    assert first["std_sentiment"] == round(float(expected.std()), 2)
+    # Nearest rank, like storage.sqlite and the Mongo trend pipeline: no interpolation
+    assert [first["p25"], first["median"], first["p75"], first["p90"]] == [2.0, 3.0, 4.0, 4.0]
+    assert trends[0]["post_count"] == 3 and trends[0]["median"] == 8.0
+    assert [trends[0]["p25"], trends[0]["p90"]] == [7.0, 8.0]
@@ -0,0 +1,128 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import compression
+from cache import etag_matches
+from compression import CompressionMiddleware, choose_encoding
+
+PAYLOAD = json.dumps([{"id": f"p{i}", "title": "post about python"} for i in range(200)]).encode("utf-8")
+
+
+def respond(body=PAYLOAD, status=200, content_type=b"application/json", headers=(), chunks=1):
+    """Plain ASGI app sending body in `chunks` pieces with the given headers"""
+
+    async def app(scope, receive, send):
+        response_headers = [(b"content-type", content_type), *headers]
+        if chunks == 1:
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        size = -(-len(body) // chunks) or 1
+        pieces = [body[i:i + size] for i in range(0, len(body), size)] or [b""]
+        for index, piece in enumerate(pieces):
+            await send({"type": "http.response.body", "body": piece, "more_body": index < len(pieces) - 1})
+
+    return app
+
+
+def call(app, **request_headers):
+    """(status, headers, body messages) of one GET through the middleware"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/",
+             "headers": [(name.replace("_", "-").encode("latin-1"), value.encode("latin-1"))
+                         for name, value in request_headers.items()]}
+    asyncio.run(app(scope, receive, send))
+    start, bodies = messages[0], messages[1:]
+    headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in start["headers"]}
+    return start["status"], headers, bodies
+
+
+def test_choose_encoding():
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("*") == compression.ENCODINGS[0]
+
+
+def test_gzip_large_json():
+    app = CompressionMiddleware(respond(headers=[(b"etag", b'"abc"')]), minimum_size=1024)
+    status, headers, bodies = call(app, accept_encoding="gzip")
+    body = b"".join(message["body"] for message in bodies)
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == '"abc-gzip"'
+    assert int(headers["content-length"]) == len(body) < len(PAYLOAD)
+    assert gzip.decompress(body) == PAYLOAD
+
+
+def test_brotli_preferred_when_installed():
+    brotli = pytest.importorskip("brotli")
+    app = CompressionMiddleware(respond(), minimum_size=1024)
+    status, headers, bodies = call(app, accept_encoding="gzip, deflate, br")
+    assert headers["content-encoding"] == "br"
+    assert brotli.decompress(b"".join(message["body"] for message in bodies)) == PAYLOAD
+
+
+def test_streaming_body_is_flushed_per_chunk():
+    app = CompressionMiddleware(respond(content_type=b"text/csv", chunks=4), minimum_size=1024)
+    status, headers, bodies = call(app, accept_encoding="gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Every chunk is sync-flushed rather than buffered until the end
+    assert len(bodies) == 4 and all(message["body"] for message in bodies)
+    assert gzip.decompress(b"".join(message["body"] for message in bodies)) == PAYLOAD
+
+
+@pytest.mark.parametrize("body, app", [
+    (b'{"items": []}', respond(body=b'{"items": []}')),
+    (PAYLOAD, respond(content_type=b"application/vnd.apache.parquet")),
+    (PAYLOAD, respond(headers=[(b"accept-ranges", b"bytes")])),
+    (PAYLOAD, respond(status=206, headers=[(b"content-range", b"bytes 0-9/100")])),
+])
+def test_passes_through_ineligible_responses(body, app):
+    status, headers, bodies = call(CompressionMiddleware(app, minimum_size=1024), accept_encoding="gzip")
+    assert "content-encoding" not in headers
+    assert b"".join(message["body"] for message in bodies) == body
+
+
+def test_already_encoded_response_is_not_compressed_again():
+    app = CompressionMiddleware(respond(headers=[(b"content-encoding", b"gzip")]), minimum_size=1024)
+    status, headers, bodies = call(app, accept_encoding="gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert bodies[0]["body"] == PAYLOAD
+
+
+def test_no_accept_encoding_leaves_response_alone():
+    status, headers, bodies = call(CompressionMiddleware(respond(headers=[(b"etag", b'"abc"')])))
+    assert "content-encoding" not in headers and headers["etag"] == '"abc"'
+    assert bodies[0]["body"] == PAYLOAD
+
+
+def test_not_modified_echoes_encoded_etag():
+    async def not_modified(scope, receive, send):
+        await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", b'"abc"')]})
+        await send({"type": "http.response.body", "body": b""})
+
+    app = CompressionMiddleware(not_modified)
+    status, headers, _ = call(app, accept_encoding="gzip", if_none_match='"abc-gzip"')
+    assert status == 304 and headers["etag"] == '"abc-gzip"' and headers["vary"] == "Accept-Encoding"
+    status, headers, _ = call(app, accept_encoding="gzip", if_none_match='"abc"')
+    assert status == 304 and headers["etag"] == '"abc"'
+
+
+def test_etag_matches_any_content_coding():
+    assert etag_matches('"abc-gzip"', '"abc"')
+    assert etag_matches('"other", "abc-br"', '"abc"')
+    assert not etag_matches('"abcd-gzip"', '"abc"')
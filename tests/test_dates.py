@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from dates import date_match, date_range, to_datetime
+
+
+def test_to_datetime_accepts_stored_forms():
+    expected = datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc)
+    assert to_datetime(1700000000.0) == expected
+    assert to_datetime("2023-11-14T22:13:20") == expected
+    assert to_datetime("2023-11-14T22:13:20Z") == expected
+    assert to_datetime(datetime(2023, 11, 14, 22, 13, 20)) == expected
+    assert to_datetime(None) is None
+
+
+def test_date_only_end_covers_the_whole_day():
+    assert date_range("2024-01-01", "2024-01-31") == {
+        "$gte": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "$lt": datetime(2024, 2, 1, tzinfo=timezone.utc),
+    }
+    assert date_range(None, "2024-01-31T12:00:00") == {"$lte": datetime(2024, 1, 31, 12, tzinfo=timezone.utc)}
+    assert date_range(None, None) == {}
+
+
+def test_date_match_covers_unmigrated_forms():
+    bounds = date_range("2024-01-01", "2024-01-31")
+    assert date_match("search_ts", bounds) == {"$or": [
+        {"search_ts": bounds},
+        {"search_ts": {"$gte": "2024-01-01T00:00:00+00:00", "$lt": "2024-02-01T00:00:00+00:00"}},
+    ]}
+    legacy = date_match("search_ts", bounds)["$or"][1]["search_ts"]
+    # ISO strings written by isoformat() order correctly against the bounds, fractions included
+    assert legacy["$gte"] <= "2024-01-01T00:00:00.250000+00:00" < "2024-01-31T23:59:59.999999+00:00" < legacy["$lt"]
+
+    assert date_match("post.created_utc", {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}) == {"$or": [
+        {"post.created_utc": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+        {"post.created_utc": {"$gte": 1704067200.0}},
+    ]}
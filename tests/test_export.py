@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import pyarrow.parquet as pq
+
+from export import arrow_chunks, csv_chunks, ndjson_chunks, parquet_chunks
+from storage.base import EXPORT_FIELDS
+
+
+def make_row(i):
+    return {"id": f"p{i}", "title": f"Post, \"{i}\"", "author": "someone", "subreddit": "python", "upvotes": i,
+            "comments": 2, "created_utc": 1700000000.0, "permalink": f"/r/python/{i}",
+            "keyword_searched": "python", "sentiment_score": None, "search_timestamp": "2024-01-01T00:00:00"}
+
+
+def test_csv_chunks_stream_in_fixed_row_counts():
+    chunks = list(csv_chunks((make_row(i) for i in range(25)), chunk_rows=10))
+    # Header and first ten rows, then ten more, then the remaining five
+    assert len(chunks) == 3
+
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(rows) == 25 and list(rows[0]) == EXPORT_FIELDS
+    assert rows[3]["title"] == 'Post, "3"'
+    assert rows[3]["created_utc"] == "2023-11-14T22:13:20+00:00"
+    assert rows[3]["sentiment_score"] == ""
+
+
+def test_csv_chunks_header_only_for_no_rows():
+    assert "".join(csv_chunks([])).strip() == ",".join(EXPORT_FIELDS)
+
+
+def test_columnar_exports_are_typed_and_compressed():
+    rows = [make_row(i) for i in range(25)]
+    parquet = b"".join(parquet_chunks(rows, batch_rows=10))
+    table = pq.read_table(io.BytesIO(parquet))
+    metadata = pq.ParquetFile(io.BytesIO(parquet)).metadata
+
+    assert table.num_rows == 25 and metadata.num_row_groups == 3
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    assert pa.types.is_dictionary(table.schema.field("subreddit").type)
+    assert table.column("created_utc")[0].as_py() == datetime.fromtimestamp(1700000000.0, tz=timezone.utc)
+    assert table.column("sentiment_score").null_count == 25
+
+    stream = pa.ipc.open_stream(b"".join(arrow_chunks(rows, batch_rows=10))).read_all()
+    assert stream.equals(table)
+
+
+def test_ndjson_lines():
+    lines = "".join(ndjson_chunks(make_row(i) for i in range(3))).splitlines()
+    assert len(lines) == 3
+    record = json.loads(lines[1])
+    assert record["id"] == "p1" and record["created_utc"].endswith("+00:00")
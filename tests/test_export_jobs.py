@@ -0,0 +1,100 @@
+import csv
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from export_jobs import SHUTDOWN_ERROR, ExportJobs, iter_file_range, parse_range
+
+
+def make_row(i):
+    return {"id": f"p{i}", "title": f"Post {i}", "author": "someone", "subreddit": "python", "upvotes": i,
+            "comments": 2, "created_utc": 1700000000.0, "permalink": f"/r/python/{i}",
+            "keyword_searched": "python", "sentiment_score": 5.0, "search_timestamp": "2024-01-01T00:00:00+00:00"}
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return ExportJobs(str(tmp_path / "exports"), ttl_seconds=3600, part_rows=10)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    for header in ("bytes=1000-", "bytes=5-2", "bytes=0-1,5-6", "items=0-1", "bytes=-"):
+        with pytest.raises(ValueError):
+            parse_range(header, 1000)
+
+
+def test_job_writes_parts_and_resumes_by_range(jobs, tmp_path):
+    job = jobs.create("u1", "csv", {"keyword": "python"})
+    jobs.run(job["id"], lambda: (make_row(i) for i in range(25)))
+
+    job = jobs.get("u1", job["id"])
+    assert job["status"] == "completed" and job["rows_written"] == 25
+    assert [part["number"] for part in job["parts"]] == [1, 2, 3]
+    assert jobs.get("u2", job["id"]) is None
+    assert jobs.get("u1", "not-a-job-id") is None
+
+    # Every part is a complete CSV file with its own header
+    path = jobs.part_path(job, 3)
+    with open(path) as f:
+        assert [row["id"] for row in csv.DictReader(f)] == [f"p{i}" for i in range(20, 25)]
+
+    size = os.path.getsize(path)
+    head = b"".join(iter_file_range(path, 0, 19))
+    tail = b"".join(iter_file_range(path, *parse_range("bytes=20-", size)))
+    with open(path, "rb") as f:
+        assert head + tail == f.read()
+    assert jobs.part_path(job, 4) is None
+
+
+def test_failed_job_reports_error(jobs):
+    def rows():
+        yield make_row(0)
+        raise RuntimeError("cursor died")
+
+    job = jobs.create("u1", "parquet", {})
+    jobs.run(job["id"], rows)
+    job = jobs.get("u1", job["id"])
+    assert job["status"] == "failed" and "cursor died" in job["error"]
+
+
+def test_cleanup_removes_expired_jobs(jobs):
+    kept = jobs.create("u1", "ndjson", {})
+    expired = jobs.create("u1", "ndjson", {})
+    expired["expires_at"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    jobs._save(expired)
+
+    assert jobs.get("u1", expired["id"]) is None
+    assert jobs.cleanup_expired() == 1
+    assert sorted(os.listdir(jobs.root)) == [kept["id"]]
+
+
+def test_stopped_job_is_recorded_as_cancelled(jobs):
+    stop = threading.Event()
+
+    def rows():
+        for i in range(25):
+            if i == 12:
+                stop.set()
+            yield make_row(i)
+
+    job = jobs.create("u1", "csv", {})
+    jobs.run(job["id"], rows, stop)
+    job = jobs.get("u1", job["id"])
+    assert job["status"] == "cancelled" and job["error"] == SHUTDOWN_ERROR
+    # The part finished before the stop stays downloadable
+    assert [part["number"] for part in job["parts"]] == [1]
+
+    waiting = jobs.create("u1", "csv", {})
+    jobs.cancel(waiting["id"], SHUTDOWN_ERROR)
+    assert jobs.get("u1", waiting["id"])["status"] == "cancelled"
+    # A finished job keeps its status
+    jobs.cancel(job["id"], "later")
+    assert jobs.get("u1", job["id"])["error"] == SHUTDOWN_ERROR
@@ -0,0 +1,21 @@
+from facets import FacetCounter, sentiment_bucket
+
+
+def test_sentiment_buckets():
+    assert [sentiment_bucket(score) for score in (0.0, 3.99, 4.0, 5.99, 6.0, 10.0, None)] == [
+        "negative", "negative", "neutral", "neutral", "positive", "positive", "unscored"
+    ]
+
+
+def test_counter_orders_facets():
+    counter = FacetCounter()
+    for subreddit, score, created in [("rust", 8.0, 1700000000.0), ("python", 2.0, 1700000000.0),
+                                      ("python", None, 1700100000.0)]:
+        counter.add(subreddit, score, created)
+
+    assert counter.result() == {
+        "subreddit": [{"value": "python", "count": 2}, {"value": "rust", "count": 1}],
+        "sentiment": [{"value": "negative", "count": 1}, {"value": "positive", "count": 1},
+                      {"value": "unscored", "count": 1}],
+        "day": [{"value": "2023-11-14", "count": 2}, {"value": "2023-11-16", "count": 1}],
+    }
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from fairqueue import FairQueue, QueueFull, parse_weights
+
+
+def run_order(queue, requests):
+    """Grant order of (user, cost) requests queued behind one busy slot"""
+
+    async def scenario():
+        blocker = await queue.acquire("blocker")
+        order = []
+
+        async def request(user_id, cost):
+            slot = await queue.acquire(user_id, cost)
+            order.append(user_id)
+            slot.release()
+
+        tasks = [asyncio.create_task(request(user_id, cost)) for user_id, cost in requests]
+        await asyncio.sleep(0)
+        blocker.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    return asyncio.run(scenario())
+
+
+def test_heavy_user_is_interleaved():
+    queue = FairQueue("search", slots=1, per_user_concurrency=1, max_queued=10, max_wait_seconds=5)
+    order = run_order(queue, [("heavy", 1)] * 4 + [("light", 1)] * 2)
+    assert order == ["heavy", "light", "heavy", "light", "heavy", "heavy"]
+
+
+def test_weights_and_costs_set_the_share():
+    queue = FairQueue("search", slots=1, per_user_concurrency=1, max_queued=10, max_wait_seconds=5,
+                      weights={"gold": 2})
+    order = run_order(queue, [("gold", 1)] * 4 + [("basic", 1)] * 2)
+    assert order == ["gold", "gold", "basic", "gold", "gold", "basic"]
+
+    queue = FairQueue("search", slots=1, per_user_concurrency=1, max_queued=10, max_wait_seconds=5)
+    order = run_order(queue, [("big", 4)] * 2 + [("small", 1)] * 4)
+    assert order == ["small", "small", "small", "big", "small", "big"]
+
+
+def test_non_positive_costs_are_floored():
+    queue = FairQueue("search", slots=1, per_user_concurrency=1, max_queued=10, max_wait_seconds=5)
+
+    async def scenario():
+        first = queue.enqueue("u1", cost=-100)
+        second = queue.enqueue("u1", cost=0)
+        # A bad cost can't move the user's finish time backwards
+        assert first.start < first.finish <= second.start < second.finish
+        first.release()
+        second.release()
+
+    asyncio.run(scenario())
+
+
+def test_over_limit_requests_are_rejected():
+    queue = FairQueue("export", slots=4, per_user_concurrency=1, max_queued=1, max_wait_seconds=0.05)
+
+    async def scenario():
+        running = await queue.acquire("u1")
+        waiting = queue.enqueue("u1")
+        with pytest.raises(QueueFull) as full:
+            queue.enqueue("u1")
+        assert full.value.retry_after >= 1
+        with pytest.raises(QueueFull):
+            await waiting.wait(queue.max_wait_seconds)
+
+        stats = queue.stats("u1")
+        assert (stats["running"], stats["queued"], stats["rejected"], stats["served"]) == (1, 0, 2, 1)
+        # Another user isn't held back by u1's cap
+        other = await queue.acquire("u2")
+        other.release()
+        running.release()
+        assert queue.running == 0
+
+    asyncio.run(scenario())
+
+
+def test_parse_weights():
+    assert parse_weights("a=2, b=0.5,") == {"a": 2.0, "b": 0.5}
+    assert parse_weights("") == {}
+    with pytest.raises(ValueError):
+        parse_weights("a=0")
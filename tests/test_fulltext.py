@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from fulltext import FullTextIndex, build_match_query
+
+
+def fts5_available():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not fts5_available(), reason="SQLite built without FTS5")
+
+
+def make_post(post_id, title, body=None, subreddit="python", upvotes=10, sentiment=5.0):
+    return {
+        "id": post_id, "title": title, "author": "someone", "subreddit": subreddit, "upvotes": upvotes,
+        "url": "https://example.com", "comments": 3, "created_utc": 1700000000.0,
+        "permalink": f"https://reddit.com/r/{subreddit}/{post_id}", "body": body, "sentiment_score": sentiment,
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FullTextIndex(str(tmp_path / "fulltext.db"))
+    index.ensure_schema()
+    yield index
+    index.close()
+
+
+def test_match_query_quotes_input():
+    assert build_match_query('rust "async runtime" C++') == '"rust" "async runtime" "C++"'
+    assert build_match_query('say "hi') == '"say" """hi"'
+    assert build_match_query("   ") is None
+
+
+def test_ranking_phrases_and_scope(index):
+    index.add_posts("u1", [
+        make_post("p1", "Async runtime comparison", "tokio versus async-std"),
+        make_post("p2", "Weekly thread", "which async runtime should I pick for my project"),
+        make_post("p3", "Runtime errors in async code"),
+    ] + [make_post(f"filler{i}", f"Unrelated discussion {i}", "nothing to see here") for i in range(10)])
+    index.add_posts("u2", [make_post("p4", "Async runtime internals")])
+
+    ranked = [row["id"] for row in index.search("u1", "async runtime")]
+    # Title matches outrank a body-only match
+    assert set(ranked) == {"p1", "p2", "p3"} and ranked[-1] == "p2"
+    assert all(row["score"] > 0 for row in index.search("u1", "async runtime"))
+
+    assert {row["id"] for row in index.search("u1", '"async runtime"')} == {"p1", "p2"}
+    assert [row["id"] for row in index.search("u2", "async")] == ["p4"]
+    assert index.search("u1", "golang") == []
+
+
+def test_filters_and_incremental_updates(index):
+    index.add_posts("u1", [
+        make_post("p1", "Learning rust", upvotes=5, subreddit="rust"),
+        make_post("p2", "Rust in production", upvotes=500, subreddit="programming", sentiment=8.0),
+    ])
+    assert [row["id"] for row in index.search("u1", "rust", {"min_upvotes": 100})] == ["p2"]
+    assert [row["id"] for row in index.search("u1", "rust", {"subreddit": "RUST"})] == ["p1"]
+    assert [row["id"] for row in index.search("u1", "rust", {"min_sentiment": 7.5})] == ["p2"]
+
+    # Re-observing a post with new text replaces its tokens; a new user just gains a membership
+    assert index.add_posts("u2", [make_post("p1", "Learning zig", upvotes=5, subreddit="rust")]) == 1
+    assert [row["id"] for row in index.search("u1", "rust")] == ["p2"]
+    assert [row["id"] for row in index.search("u1", "zig")] == ["p1"]
+    assert index.add_posts("u2", [make_post("p2", "Rust in production", upvotes=600)]) == 0
+
+    index.update_metrics([{"id": "p1", "upvotes": 900, "comments": 40}])
+    assert [row["id"] for row in index.search("u1", "zig", {"min_upvotes": 800})] == ["p1"]
@@ -0,0 +1,158 @@
+"""Run the API as several uvicorn worker processes against a local mongod.
+
+Each worker must open its own clients in the lifespan, serve requests for
+accounts created through any other worker, and run the periodic jobs under
+their shared lease. Skipped when no mongod is reachable (MONGO_TEST_URL, default
+localhost) or the server's dependencies aren't installed.
+"""
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+SERVER_MODULES = ["fastapi", "uvicorn", "praw", "vaderSentiment", "emergentintegrations"]
+WORKERS = 3
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def call(base, method, path, body=None, token=None):
+    """(status, JSON body) of one request on a fresh connection"""
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(base + path, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+def child_pids(pid):
+    """Direct children of a process, or None where /proc doesn't list them"""
+    path = f"/proc/{pid}/task/{pid}/children"
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return [int(child) for child in f.read().split()]
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    missing = [module for module in SERVER_MODULES if importlib.util.find_spec(module) is None]
+    if missing:
+        pytest.skip(f"Server dependencies not installed: {', '.join(missing)}")
+
+    mongo_url = os.getenv("MONGO_TEST_URL", "mongodb://localhost:27017")
+    client = pymongo.MongoClient(mongo_url, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except Exception:
+        pytest.skip("No local mongod available")
+
+    directory = tmp_path_factory.mktemp("multiworker")
+    db_name = f"multiworker_{uuid.uuid4().hex[:8]}"
+    port = free_port()
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": "mongo",
+        "MONGO_URL": mongo_url,
+        "DB_NAME": db_name,
+        "JWT_SECRET_KEY": "multiworker-test-secret-0123456789abcdef",
+        "FULLTEXT_INDEX_PATH": str(directory / "fulltext.db"),
+        "EXPORT_DIR": str(directory / "exports"),
+        "BCRYPT_ROUNDS": "4",
+    }
+    log_path = directory / "server.log"
+    log = open(log_path, "wb")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(WORKERS)],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 60
+    while True:
+        if process.poll() is not None:
+            pytest.fail(f"Server exited on startup:\n{log_path.read_text(errors='replace')}")
+        try:
+            if call(base, "GET", "/api/health")[0] == 200:
+                break
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            process.kill()
+            pytest.fail("Server didn't become healthy within 60s")
+        time.sleep(0.5)
+
+    yield base, process, client[db_name]
+
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    finally:
+        log.close()
+        client.drop_database(db_name)
+        client.close()
+
+
+def test_workers_share_accounts(server):
+    base, process, _ = server
+    children = child_pids(process.pid)
+    if children is not None:
+        assert len(children) >= WORKERS
+
+    email = f"{uuid.uuid4().hex[:8]}@example.com"
+    status, body = call(base, "POST", "/api/register",
+                        {"email": email, "password": "correct horse", "full_name": "Multi Worker"})
+    assert status == 200
+
+    # Fresh connections are spread over the workers; every one must see the account
+    def login_and_fetch(_):
+        status, body = call(base, "POST", "/api/login", {"email": email, "password": "correct horse"})
+        assert status == 200
+        status, me = call(base, "GET", "/api/me", token=body["access_token"])
+        return status, me["email"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(login_and_fetch, range(24)))
+    assert results == [(200, email)] * 24
+
+    status, health = call(base, "GET", "/api/health")
+    assert status == 200 and health["database"] is True and health["storage"] == "mongo"
+
+
+def test_periodic_jobs_run_under_one_lease(server):
+    _, _, db = server
+    deadline = time.monotonic() + 15
+    lease = None
+    while lease is None and time.monotonic() < deadline:
+        lease = db["job_state"].find_one({"_id": "trending"})
+        time.sleep(0.5)
+    # Every worker starts the job, but only the lease holder runs it each interval
+    assert lease is not None and lease["lease_owner"]
+
+
+def test_clean_shutdown(server):
+    _, process, _ = server
+    process.terminate()
+    assert process.wait(timeout=30) == 0
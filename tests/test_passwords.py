@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("bcrypt")
+
+from passwords import PasswordHasher, hash_rounds
+
+
+def test_hash_and_verify_off_the_loop():
+    hasher = PasswordHasher(rounds=4)
+
+    async def scenario():
+        hashed = await hasher.hash("correct horse")
+        return hashed, await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, good, bad = asyncio.run(scenario())
+    hasher.close()
+    assert hash_rounds(hashed) == 4
+    assert good is True and bad is False
+
+
+def test_needs_rehash_when_cost_changes():
+    old = PasswordHasher(rounds=4)
+    new = PasswordHasher(rounds=5)
+    hashed = old.hash_sync("secret")
+    assert not old.needs_rehash(hashed)
+    assert new.needs_rehash(hashed)
+    assert new.needs_rehash("not-a-bcrypt-hash")
+    old.close()
+    new.close()
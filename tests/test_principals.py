@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+pytest.importorskip("pymongo")
+
+from cache import TTLCache
+from principals import AuthenticationError, PrincipalCache
+
+SECRET = "principal-cache-test-secret-0123456789"
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def make_token(user_id, expires_at):
+    return jwt.encode({"sub": user_id, "exp": int(expires_at)}, SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def setup():
+    clock = Clock()
+    users = {"u1": {"id": "u1", "email": "a@example.com", "is_active": True}}
+    loads = []
+
+    def load_profile(user_id):
+        loads.append(user_id)
+        return dict(users[user_id]) if user_id in users else None
+
+    cache = PrincipalCache(SECRET, "HS256", load_profile, token_ttl=300, profile_ttl=60, clock=clock)
+    return cache, clock, users, loads
+
+
+def test_ttl_cache_expires_and_evicts():
+    clock = Clock()
+    cache = TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=1)
+    cache.set("c", 3)
+    assert cache.get("a") is None  # evicted as least recently used
+    clock.now += 5
+    assert cache.get("b") is None and cache.get("c") == 3
+    clock.now += 10
+    assert cache.get("c") is None
+
+
+def test_valid_tokens_are_decoded_once(setup, monkeypatch):
+    cache, clock, _, loads = setup
+    token = make_token("u1", clock.now + 3600)
+    assert cache.authenticate(token) == "u1"
+
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: pytest.fail("token decoded again"))
+    assert cache.authenticate(token) == "u1"
+    assert loads == ["u1"]
+
+
+def test_bad_tokens_are_rejected_without_crypto(setup, monkeypatch):
+    cache, clock, _, _ = setup
+    forged = jwt.encode({"sub": "u1", "exp": int(clock.now + 3600)}, "forged-secret-forged-secret-0123456789", algorithm="HS256")
+    with pytest.raises(AuthenticationError):
+        cache.authenticate(forged)
+
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: pytest.fail("bad token decoded again"))
+    with pytest.raises(AuthenticationError):
+        cache.authenticate(forged)
+
+
+def test_cached_token_stops_at_its_expiry(setup):
+    cache, clock, _, _ = setup
+    token = make_token("u1", clock.now + 30)
+    assert cache.authenticate(token) == "u1"
+    clock.now += 28
+    assert cache.tokens.get(token) == "u1"
+    clock.now += 3
+    assert cache.tokens.get(token) is None
+
+
+def test_disabled_account_is_rejected_after_invalidation(setup):
+    cache, clock, users, loads = setup
+    token = make_token("u1", clock.now + 3600)
+    cache.authenticate(token)
+
+    users["u1"]["is_active"] = False
+    assert cache.authenticate(token) == "u1"  # still cached
+    cache.invalidate_user("u1")
+    with pytest.raises(AuthenticationError):
+        cache.authenticate(token)
+    assert loads == ["u1", "u1"]
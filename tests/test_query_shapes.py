@@ -0,0 +1,192 @@
+"""Verify that every query shape the API issues is served by an index.
+
+The shapes are not written out here. Each entry runs the real code (MongoStorage
+methods, the pipeline builders, the trending and metric refresh jobs) against a
+local mongod (MONGO_TEST_URL, default localhost) while a command listener records
+what it sends; every recorded read and write is then explained, and the test fails
+if any winning plan contains a COLLSCAN. Skipped when no server is reachable.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from pymongo import monitoring
+
+from indexes import apply_indexes
+from metrics_refresh import find_stale_posts
+from trending import METRICS_COLLECTION, ensure_metrics_collection, rebuild_rankings, update_trending
+
+USER_ID = "shape-user"
+FILTERS = {"subreddit": "python", "min_upvotes": 5, "max_sentiment": 9.0, "start_date": "2024-01-01",
+           "end_date": "2024-01-31"}
+# Commands that explain() accepts; inserts and getMores have no plan to check
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Time-series collections plan against their internal buckets collection
+UNPLANNED_COLLECTIONS = {METRICS_COLLECTION}
+
+
+def make_posts(keyword):
+    return [{
+        "id": f"{keyword}-{i}", "title": f"Post {i}", "author": "someone", "subreddit": "python", "upvotes": i,
+        "url": "https://example.com", "comments": i, "created_utc": 1704100000.0 + i, "permalink": "/r/python",
+        "body": None, "sentiment_score": float(i % 10), "summary": None,
+    } for i in range(5)]
+
+
+def save_search(storage, keyword, timestamp="2024-01-05T10:00:00+00:00"):
+    search = {"id": str(uuid.uuid4()), "user_id": USER_ID, "keyword": keyword, "subreddit": "all",
+              "timestamp": timestamp, "post_count": 5, "avg_sentiment": 2.0}
+    asyncio.run(storage.save_search_results(search, make_posts(keyword)))
+
+
+# name -> callable running the code path against a MongoStorage
+QUERY_SHAPES = {
+    "login: users by email": lambda s: s.get_user_by_email("a@example.com"),
+    "me: users by id": lambda s: s.get_user_by_id(USER_ID),
+    "login: password rehash": lambda s: s.update_password_hash(USER_ID, "hash"),
+    "saved-keywords: active keywords": lambda s: s.list_active_keywords(USER_ID),
+    "delete-keyword: keyword by id": lambda s: s.deactivate_keyword(USER_ID, "k1"),
+    "search-posts: store results": lambda s: save_search(s, "python", "2024-01-06T10:00:00+00:00"),
+    "search-history: first page": lambda s: s.search_history(USER_ID, 10),
+    "search-history: next page by keyword": lambda s: s.search_history(
+        USER_ID, 10, "python", after=("2024-01-05T10:00:00+00:00", "abc")
+    ),
+    "dashboard: search count": lambda s: s.count_searches(USER_ID),
+    "dashboard: keyword stats": lambda s: s.keyword_stats(USER_ID),
+    "dashboard: total posts": lambda s: s.count_user_posts(USER_ID),
+    "dashboard: sentiment trends": lambda s: s.sentiment_trends(USER_ID, "2024-01-01", "2024-01-31"),
+    "data versions: read and bump": lambda s: (s.get_versions(USER_ID), s.bump_versions(USER_ID, "posts")),
+    "export: keyword and date range": lambda s: list(s.iter_export_rows(USER_ID, "python", "2024-01-01", "2024-01-31")),
+    "export: all keywords": lambda s: list(s.iter_export_rows(USER_ID)),
+    "posts-query: recent page": lambda s: s.query_posts(USER_ID, {"min_sentiment": 0.2}),
+    "posts-query: recent next page": lambda s: s.query_posts(
+        USER_ID, {}, after=("2024-01-05T10:00:00+00:00", "python-3", "python")
+    ),
+    "posts-query: keyword page": lambda s: s.query_posts(USER_ID, {}, keyword="python"),
+    "posts-query: filtered page": lambda s: s.query_posts(USER_ID, FILTERS),
+    "posts-query: by sentiment": lambda s: s.query_posts(
+        USER_ID, {"max_sentiment": 9.0}, sort="sentiment", after=(4.0, "python-4", "python")
+    ),
+    "posts-query: facets": lambda s: s.post_facets(USER_ID, FILTERS, keyword="python"),
+    "trending: rankings": lambda s: s.trending_rankings(USER_ID, ["python"]),
+    "trending: incremental pass": lambda s: update_trending(s.db),
+    "trending: keyword window posts": lambda s: rebuild_rankings(
+        s.db, [(USER_ID, "python")], datetime.now(timezone.utc)
+    ),
+    "metric refresh: stale recent posts": lambda s: find_stale_posts(s.posts, 48, 900, 100),
+}
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Keeps the explainable commands sent to one database"""
+
+    def __init__(self, database_name):
+        self.database_name = database_name
+        self.commands = []
+
+    def started(self, event):
+        if event.database_name == self.database_name and event.command_name in EXPLAINABLE:
+            self.commands.append(event.command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.fixture(scope="module")
+def storage():
+    url = os.getenv("MONGO_TEST_URL", "mongodb://localhost:27017")
+    try:
+        pymongo.MongoClient(url, serverSelectionTimeoutMS=2000).admin.command("ping")
+    except Exception:
+        pytest.skip("No local mongod available")
+
+    from storage.mongo import MongoStorage
+
+    database_name = f"query_shapes_{uuid.uuid4().hex[:8]}"
+    recorder = CommandRecorder(database_name)
+    # Global listeners apply to clients created afterwards, including the one MongoStorage opens
+    monitoring.register(recorder)
+    backend = MongoStorage(url, database_name, write_flush_interval=0.001)
+    ensure_metrics_collection(backend.db)
+    apply_indexes(backend.db)
+    # Data in every collection, so the planner has real collections to plan against
+    backend.create_user({"id": USER_ID, "email": "a@example.com", "password": "hash"})
+    backend.add_keyword({"id": "k1", "user_id": USER_ID, "keyword": "python", "subreddit": "all", "active": True})
+    save_search(backend, "python")
+    save_search(backend, "rust")
+    backend.recorder = recorder
+    yield backend
+    backend.client.drop_database(database_name)
+    backend.close()
+
+
+def collect_stages(plan):
+    """Yield every stage name found in a plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from collect_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from collect_stages(item)
+
+
+def winning_plans(explain_output):
+    """Yield the winning plans of an explain document, ignoring rejected candidates"""
+    if isinstance(explain_output, dict):
+        for key, value in explain_output.items():
+            if key == "winningPlan":
+                yield value
+            elif key != "rejectedPlans":
+                yield from winning_plans(value)
+    elif isinstance(explain_output, list):
+        for item in explain_output:
+            yield from winning_plans(item)
+
+
+def explainable(command):
+    """The recorded command as explain() accepts it: one statement each, without session fields"""
+    name = next(iter(command))
+    body = {key: value for key, value in command.items()
+            if not key.startswith("$") and key not in ("lsid", "txnNumber", "writeConcern", "readConcern")}
+    statements = {"update": "updates", "delete": "deletes"}.get(name)
+    if statements is None:
+        return [body]
+    return [{**body, statements: [statement]} for statement in body[statements]]
+
+
+@pytest.mark.parametrize("shape", sorted(QUERY_SHAPES))
+def test_query_shape_uses_index(storage, shape):
+    storage.recorder.commands.clear()
+    QUERY_SHAPES[shape](storage)
+    asyncio.run(storage.flush())
+
+    commands = [command for command in storage.recorder.commands
+                if command[next(iter(command))] not in UNPLANNED_COLLECTIONS]
+    # A code path that stopped querying would otherwise pass vacuously
+    assert commands, f"{shape} issued no queries"
+    for command in commands:
+        for statement in explainable(command):
+            plan = storage.db.command("explain", statement, verbosity="queryPlanner")
+            stages = set(collect_stages(list(winning_plans(plan))))
+            assert "COLLSCAN" not in stages, f"{shape} runs a collection scan for {statement}: {sorted(stages)}"
+
+
+@pytest.mark.parametrize("method", ["sort_array", "presorted"])
+def test_every_sentiment_trend_method_uses_index(storage, method):
+    # sentiment_trends picks one pipeline by server version; check each of them explicitly
+    from storage.mongo import build_sentiment_trend_pipeline
+
+    pipeline = build_sentiment_trend_pipeline(USER_ID, "2024-01-01", "2024-01-31", method)
+    plan = storage.db.command("explain", {"aggregate": "user_posts", "pipeline": pipeline, "cursor": {}},
+                              verbosity="queryPlanner")
+    assert "COLLSCAN" not in set(collect_stages(list(winning_plans(plan))))
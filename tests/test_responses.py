@@ -0,0 +1,37 @@
+import json
+from typing import List, Optional
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from pydantic import BaseModel, TypeAdapter
+
+from responses import ModelJSONResponse
+
+
+class Post(BaseModel):
+    id: str
+    upvotes: int
+    sentiment_score: Optional[float] = None
+
+
+def test_serializes_models_without_validating_again():
+    posts = [Post(id="p1", upvotes=3, sentiment_score=7.5), Post(id="p2", upvotes=1)]
+    # Nothing re-validates the models, so one built with model_construct goes through unchanged
+    posts.append(Post.model_construct(id="p3", upvotes=2, sentiment_score=None))
+
+    response = ModelJSONResponse(posts, TypeAdapter(List[Post]))
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == [
+        {"id": "p1", "upvotes": 3, "sentiment_score": 7.5},
+        {"id": "p2", "upvotes": 1, "sentiment_score": None},
+        {"id": "p3", "upvotes": 2, "sentiment_score": None},
+    ]
+
+
+def test_default_adapter_handles_models_inside_dicts():
+    response = ModelJSONResponse({"items": [Post(id="p1", upvotes=3)], "next_cursor": None}, status_code=201)
+    assert response.status_code == 201
+    assert json.loads(response.body) == {"items": [{"id": "p1", "upvotes": 3, "sentiment_score": None}],
+                                         "next_cursor": None}
@@ -0,0 +1,299 @@
+"""Conformance suite run against every storage backend.
+
+SQLite always runs; MongoDB runs when a server is reachable at MONGO_TEST_URL
+(default localhost).
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from storage import DuplicateEmailError
+from storage.sqlite import SQLiteStorage
+
+
+def mongo_storage():
+    pymongo = pytest.importorskip("pymongo")
+    url = os.getenv("MONGO_TEST_URL", "mongodb://localhost:27017")
+    try:
+        pymongo.MongoClient(url, serverSelectionTimeoutMS=1000).admin.command("ping")
+    except Exception:
+        pytest.skip("No local mongod available")
+
+    from indexes import apply_indexes
+    from storage.mongo import MongoStorage
+    from trending import ensure_metrics_collection
+
+    backend = MongoStorage(url, f"conformance_{uuid.uuid4().hex[:8]}", write_flush_interval=0.001)
+    ensure_metrics_collection(backend.db)
+    apply_indexes(backend.db)
+    return backend
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def storage(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteStorage(str(tmp_path / "conformance.db"))
+        backend.ensure_schema()
+        yield backend
+        backend.close()
+    else:
+        backend = mongo_storage()
+        yield backend
+        backend.client.drop_database(backend.db.name)
+        backend.close()
+
+
+def make_post(post_id, sentiment=5.0, upvotes=10):
+    return {
+        "id": post_id, "title": f"Post {post_id}", "author": "someone", "subreddit": "python",
+        "upvotes": upvotes, "url": "https://example.com", "comments": 3, "created_utc": 1700000000.0,
+        "permalink": f"https://reddit.com/r/python/{post_id}", "body": None,
+        "sentiment_score": sentiment, "summary": None,
+    }
+
+
+def save_search(storage, user_id, keyword, posts, timestamp=None):
+    search = {
+        "id": str(uuid.uuid4()), "user_id": user_id, "keyword": keyword, "subreddit": "all",
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
+        "post_count": len(posts), "avg_sentiment": 5.0,
+    }
+    asyncio.run(storage.save_search_results(search, posts))
+    return search
+
+
+def test_users(storage):
+    user = {"id": "u1", "email": "a@example.com", "password": "hash", "full_name": "A",
+            "created_at": "2024-01-01T00:00:00+00:00", "is_active": True}
+    storage.create_user(user)
+
+    assert storage.get_user_by_email("a@example.com")["password"] == "hash"
+    profile = storage.get_user_by_id("u1")
+    assert profile["email"] == "a@example.com" and profile["is_active"] is True
+    assert "password" not in profile
+    assert storage.get_user_by_id("missing") is None
+
+    with pytest.raises(DuplicateEmailError):
+        storage.create_user({**user, "id": "u2"})
+
+    storage.update_password_hash("u1", "rehashed")
+    assert storage.get_user_by_email("a@example.com")["password"] == "rehashed"
+
+
+def test_keywords(storage):
+    keyword = {"id": "k1", "user_id": "u1", "keyword": "python", "subreddit": "all",
+               "created_at": "2024-01-01T00:00:00+00:00", "active": True}
+    storage.add_keyword(keyword)
+
+    assert [k["id"] for k in storage.list_active_keywords("u1")] == ["k1"]
+    assert storage.deactivate_keyword("u2", "k1") is False
+    assert storage.deactivate_keyword("u1", "k1") is True
+    assert storage.list_active_keywords("u1") == []
+
+
+def test_posts_are_stored_once_per_user(storage):
+    save_search(storage, "u1", "python", [make_post("p1"), make_post("p2")])
+    save_search(storage, "u1", "python", [make_post("p1")])
+    # A later observation of the same post updates its content for everyone
+    save_search(storage, "u2", "python", [make_post("p1", upvotes=99)])
+
+    assert storage.count_user_posts("u1") == 2
+    assert storage.count_user_posts("u2") == 1
+
+    rows = list(storage.iter_export_rows("u2"))
+    assert [row["id"] for row in rows] == ["p1"]
+    assert rows[0]["keyword_searched"] == "python"
+    assert rows[0]["upvotes"] == 99
+
+
+def test_export_filters(storage):
+    save_search(storage, "u1", "python", [make_post("p1")], "2024-01-01T10:00:00+00:00")
+    save_search(storage, "u1", "rust", [make_post("p2")], "2024-02-01T10:00:00+00:00")
+
+    assert [r["id"] for r in storage.iter_export_rows("u1", keyword="rust")] == ["p2"]
+    assert [r["id"] for r in storage.iter_export_rows("u1", start_date="2024-01-15")] == ["p2"]
+    assert [r["id"] for r in storage.iter_export_rows("u1", end_date="2024-01-15")] == ["p1"]
+    # A date-only end covers that whole day
+    assert [r["id"] for r in storage.iter_export_rows("u1", end_date="2024-02-01")] == ["p2", "p1"]
+    assert [r["id"] for r in storage.iter_export_rows("u1", end_date="2024-02-01T09:00:00+00:00")] == ["p1"]
+
+
+def test_search_history_keyset_pages(storage):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        save_search(storage, "u1", "python" if i % 2 else "rust", [], (start + timedelta(minutes=i)).isoformat())
+
+    seen = []
+    after = None
+    while True:
+        page = storage.search_history("u1", 3, after=after)
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1]["timestamp"], page[-1]["id"])
+
+    timestamps = [search["timestamp"] for search in seen]
+    assert len(seen) == 7 and timestamps == sorted(timestamps, reverse=True)
+    assert len(storage.search_history("u1", 10, keyword="python")) == 3
+    assert storage.count_searches("u1") == 7
+
+
+def test_keyword_stats(storage):
+    save_search(storage, "u1", "python", [make_post("p1")])
+    save_search(storage, "u1", "python", [make_post("p2")])
+    save_search(storage, "u1", "rust", [make_post("p3")])
+
+    stats = storage.keyword_stats("u1")
+    assert [(s["_id"], s["search_count"], s["total_posts"]) for s in stats] == [("python", 2, 2), ("rust", 1, 1)]
+
+
+def test_sentiment_trends(storage):
+    save_search(storage, "u1", "python", [make_post(f"a{i}", sentiment=float(i)) for i in range(1, 6)],
+                "2024-03-01T12:00:00+00:00")
+    save_search(storage, "u1", "python", [make_post("b1", sentiment=8.0)], "2024-03-02T12:00:00+00:00")
+
+    trends = storage.sentiment_trends("u1", "2024-03-01", "2024-03-02")
+    assert [t["_id"] for t in trends] == ["2024-03-02", "2024-03-01"]
+    first_day = trends[1]
+    assert first_day["post_count"] == 5 and first_day["avg_sentiment"] == 3.0
+    assert first_day["sentiment_sum"] == pytest.approx(15.0)
+    assert first_day["median"] == 3.0
+
+    assert [t["_id"] for t in storage.sentiment_trends("u1", "2024-03-02")] == ["2024-03-02"]
+
+
+def test_data_versions(storage):
+    assert storage.get_versions("u1") == {}
+    storage.bump_versions("u1", "searches", "posts")
+    storage.bump_versions("u1", "searches")
+    versions = storage.get_versions("u1")
+    assert versions["searches"] == 2 and versions["posts"] == 1
+
+
+def test_query_posts_pushes_filters_down(storage):
+    posts = [make_post(f"p{i}", sentiment=float(i), upvotes=i * 10) for i in range(10)]
+    posts[3]["subreddit"] = "learnpython"
+    posts[4]["subreddit"] = "rust"
+    save_search(storage, "u1", "python", posts, "2024-01-01T10:00:00+00:00")
+    save_search(storage, "u1", "rust", [make_post("r1", sentiment=9.5)], "2024-01-02T10:00:00+00:00")
+
+    rows = storage.query_posts("u1", {"min_upvotes": 20, "max_sentiment": 6.0, "subreddit": "PYTHON"}, keyword="python")
+    assert sorted(row["id"] for row in rows) == ["p2", "p3", "p5", "p6"]
+    assert all(row["keyword_searched"] == "python" for row in rows)
+
+    seen = []
+    after = None
+    while True:
+        page = storage.query_posts("u1", {}, sort="sentiment", limit=4, after=after)
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1]["sentiment_score"], page[-1]["id"], page[-1]["keyword_searched"])
+    assert [row["id"] for row in seen] == ["r1"] + [f"p{i}" for i in range(9, -1, -1)]
+
+    recent = storage.query_posts("u1", {}, limit=2)
+    assert [row["id"] for row in recent] == ["r1", "p9"]
+    assert storage.query_posts("u2", {}) == []
+
+
+def test_query_posts_pages_posts_stored_under_two_keywords(storage):
+    posts = [make_post(f"p{i}", sentiment=5.0) for i in range(3)]
+    for keyword in ("python", "django", "flask"):
+        save_search(storage, "u1", keyword, posts, "2024-01-01T10:00:00+00:00")
+
+    for sort in ("recent", "sentiment"):
+        seen = []
+        after = None
+        while True:
+            page = storage.query_posts("u1", {"subreddit": "python"}, sort=sort, limit=2, after=after)
+            if not page:
+                break
+            seen.extend((row["id"], row["keyword_searched"]) for row in page)
+            sort_value = page[-1]["search_timestamp" if sort == "recent" else "sentiment_score"]
+            after = (sort_value, page[-1]["id"], page[-1]["keyword_searched"])
+        assert sorted(seen) == sorted((f"p{i}", keyword) for i in range(3) for keyword in ("python", "django", "flask"))
+        assert len(seen) == 9
+
+
+def test_post_facets(storage):
+    posts = [make_post(f"p{i}", sentiment=score) for i, score in enumerate([1.0, 3.9, 5.0, 7.5, 9.0, None])]
+    posts[1]["subreddit"] = "learnpython"
+    posts[5]["created_utc"] = 1700100000.0
+    save_search(storage, "u1", "python", posts)
+    save_search(storage, "u1", "rust", [make_post("p0"), make_post("r1", upvotes=1)])
+
+    facets = storage.post_facets("u1", {"min_upvotes": 5}, keyword="python")
+    assert facets["subreddit"] == [{"value": "python", "count": 5}, {"value": "learnpython", "count": 1}]
+    assert facets["sentiment"] == [{"value": "negative", "count": 2}, {"value": "neutral", "count": 1},
+                                   {"value": "positive", "count": 2}, {"value": "unscored", "count": 1}]
+    assert facets["day"] == [{"value": "2023-11-14", "count": 5}, {"value": "2023-11-16", "count": 1}]
+
+    # Without a keyword every membership counts, including a post stored under two keywords
+    assert sum(row["count"] for row in storage.post_facets("u1", {})["subreddit"]) == 8
+
+
+def test_mongo_recent_pages_reach_unmigrated_memberships():
+    storage = mongo_storage()
+    try:
+        save_search(storage, "u1", "python", [make_post(f"p{i}") for i in range(3)], "2024-01-02T10:00:00+00:00")
+        save_search(storage, "u1", "rust", [make_post(f"r{i}") for i in range(3)], "2024-01-01T10:00:00+00:00")
+        # Memberships written before migrate-datetimes kept search_ts as an ISO string
+        storage.user_posts.update_many({"keyword": "rust"}, {"$set": {"search_ts": "2024-01-01T10:00:00+00:00"}})
+
+        seen = []
+        after = None
+        while True:
+            page = storage.query_posts("u1", {}, limit=2, after=after)
+            if not page:
+                break
+            seen.extend(row["id"] for row in page)
+            after = (page[-1]["search_timestamp"], page[-1]["id"], page[-1]["keyword_searched"])
+        assert seen == ["p2", "p1", "p0", "r2", "r1", "r0"]
+    finally:
+        storage.client.drop_database(storage.db.name)
+        storage.close()
+
+
+def test_mongo_archived_posts_are_counted_once(tmp_path):
+    pytest.importorskip("pyarrow")
+    from archive import archive_user_posts
+
+    storage = mongo_storage()
+    try:
+        save_search(storage, "u1", "python", [make_post("p1"), make_post("p2")], "2024-01-01T10:00:00+00:00")
+        save_search(storage, "u1", "rust", [make_post("p2")], "2024-03-01T10:00:00+00:00")
+        # p1 is only in the archive now; p2 still has its rust membership
+        archive_user_posts(storage.db, "2024-02-01", str(tmp_path))
+        assert storage.count_user_posts("u1") == 2
+        archive_user_posts(storage.db, "2024-04-01", str(tmp_path))
+        assert storage.count_user_posts("u1") == 2
+        # Finding an archived post again makes it live, and it still counts once
+        save_search(storage, "u1", "django", [make_post("p1")], "2024-05-01T10:00:00+00:00")
+        assert storage.count_user_posts("u1") == 2
+        assert storage.count_user_posts("u2") == 0
+    finally:
+        storage.client.drop_database(storage.db.name)
+        storage.close()
+
+
+def test_mongo_trending_rankings_are_per_user():
+    from trending import update_trending
+
+    storage = mongo_storage()
+    try:
+        for user_id, post_id in (("u1", "p1"), ("u2", "p2")):
+            storage.add_keyword({"id": f"k-{user_id}", "user_id": user_id, "keyword": "python", "subreddit": "all",
+                                 "active": True})
+            save_search(storage, user_id, "python", [make_post(post_id)])
+        update_trending(storage.db)
+
+        for user_id, post_id in (("u1", "p1"), ("u2", "p2")):
+            rankings = storage.trending_rankings(user_id, ["python"])
+            assert [ranking["keyword"] for ranking in rankings] == ["python"]
+            assert [post["id"] for post in rankings[0]["posts"]] == [post_id]
+    finally:
+        storage.client.drop_database(storage.db.name)
+        storage.close()
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+from write_buffer import BulkWriteBuffer
+
+
+class FakeCollection:
+    """Records bulk_write batches; batches after the first wait for `release`"""
+
+    name = "posts"
+
+    def __init__(self, errors=None):
+        self.batches = []
+        self.release = threading.Event()
+        self.errors = errors
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(list(operations))
+        if len(self.batches) > 1:
+            self.release.wait(5)
+        if self.errors:
+            raise BulkWriteError({"writeErrors": self.errors, "upserted": [{"index": 0, "_id": "x"}]})
+        return SimpleNamespace(upserted_ids={0: "x"})
+
+
+def test_full_batch_caller_does_not_wait_for_later_batches():
+    collection = FakeCollection()
+    buffer = BulkWriteBuffer(collection, max_ops=2, flush_interval=10)
+
+    async def scenario():
+        first = asyncio.create_task(buffer.submit(["a", "b"]))
+        await asyncio.sleep(0)
+        # Arrives while the first batch is being written, and is held by the fake
+        second = asyncio.create_task(buffer.submit(["c", "d"]))
+        outcomes = await asyncio.wait_for(first, 1)
+        assert [outcome.ok for outcome in outcomes] == [True, True]
+        assert not second.done()
+        collection.release.set()
+        await second
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    assert collection.batches == [["a", "b"], ["c", "d"]]
+
+
+def test_outcomes_are_per_operation():
+    collection = FakeCollection(errors=[{"index": 1, "errmsg": "duplicate key"}])
+    buffer = BulkWriteBuffer(collection, max_ops=10, flush_interval=0.001)
+
+    outcomes = asyncio.run(buffer.submit(["a", "b", "c"]))
+    assert [(outcome.ok, outcome.upserted) for outcome in outcomes] == [(True, True), (False, False), (True, False)]
+    assert outcomes[1].error == "duplicate key"